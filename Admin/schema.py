@@ -1,9 +1,10 @@
 from time import timezone
 import graphene
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from Admin.models import Banner, BannerGroup
 from Api import relay
+from Api.cache import instance_tag, model_tag, response_cache
+from Api.fields import DjangoFilterConnectionField
 from Common.schema import BannerGroupObject, BannerObject
 from Common.tools import ImageHandler
 from Admin.types import BannerGroupInput, BannerGroupUpdateInput, BannerInput, BannerUpdateInput, PageInput, PageUpdateInput
@@ -46,6 +47,7 @@ class CreateBanner(graphene.Mutation):
             small_image = ImageHandler(small_image_data).auto_image()
             input['small_image'] = small_image
         banner = Banner.objects.create(image=image, **input)
+        response_cache.invalidate(model_tag(Banner))
         return CreateBanner(banner=banner, success=True, message='Banner created successfully.')
 
 class UpdateBanner(graphene.Mutation):
@@ -79,6 +81,7 @@ class UpdateBanner(graphene.Mutation):
         banner.is_active = input.get('is_active', banner.is_active)
         banner.updated_at = timezone.now()
         banner.save()
+        response_cache.invalidate(instance_tag(banner))
         return UpdateBanner(banner=banner, success=True, message='Banner updated successfully.')
     
 class CreateBannerGroup(graphene.Mutation):
@@ -104,6 +107,7 @@ class CreateBannerGroup(graphene.Mutation):
             except Banner.DoesNotExist:
                 raise Exception(f'Banner with ID {banner_id} does not exist.')
         banner_group = BannerGroup.objects.create(**input)
+        response_cache.invalidate(model_tag(BannerGroup))
         return CreateBannerGroup(banner_group=banner_group, success=True, message='Banner group created successfully.')
 
 class UpdateBannerGroup(graphene.Mutation):
@@ -137,6 +141,7 @@ class UpdateBannerGroup(graphene.Mutation):
                 if value:
                     setattr(banner_group, key, value)
             banner_group.save()
+            response_cache.invalidate(instance_tag(banner_group))
             return UpdateBannerGroup(banner_group=banner_group, success=True, message='Banner group updated successfully.')
 
 class CreatePage(graphene.Mutation):
@@ -159,6 +164,8 @@ class CreatePage(graphene.Mutation):
                 raise Exception('Parent page does not exist.')
         image = ImageHandler(input.pop('image')).auto_image()
         page = Page.objects.create(**input, image=image, parent=parent)
+        # Pages are not among the cached root fields today, tagged alike for when they are
+        response_cache.invalidate(model_tag(Page))
         return CreatePage(page=page, success=True, message='Page created successfully.')
     
 class UpdatePage(graphene.Mutation):
@@ -189,8 +196,10 @@ class UpdatePage(graphene.Mutation):
         for key, value in input.items():
             if value:
                 setattr(page, key, value)
+        moved = page.parent_id != getattr(parent, 'pk', None)
         page.parent = parent
         page.save()
+        response_cache.invalidate(instance_tag(page), *([model_tag(Page)] if moved else []))
         return UpdatePage(page=page, success=True, message='Page updated successfully.')
 
 class Query(graphene.ObjectType):
@@ -1,3 +1,10 @@
 from django.contrib import admin
-
+from .models import PersistedQuery
 # Register your models here.
+
+class PersistedQueryAdmin(admin.ModelAdmin):
+    list_display = ('hash', 'allowed', 'created_at')
+    list_editable = ('allowed',)
+    list_filter = ('allowed',)
+
+admin.site.register(PersistedQuery, PersistedQueryAdmin)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Api'
+
+    def ready(self):
+        from Api.cache import check_response_cache
+        checks.register(check_response_cache)
@@ -0,0 +1,202 @@
+# Description: Shared cache of anonymous catalog responses, invalidated through dependency tags.
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import models, transaction
+from graphene.relay import Connection
+from graphql import FieldNode, OperationType, get_named_type, get_nullable_type, is_list_type
+
+
+# Backends whose entries live in one process, which other workers never see
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_config():
+    config = {
+        'CACHE': 'default',
+        'TIMEOUT': 300,
+        'ROOT_FIELDS': [],
+        # Cache on a process-local backend, only right with a single worker
+        'ALLOW_LOCAL': False,
+    }
+    config.update(getattr(settings, 'RESPONSE_CACHE', {}))
+    return config
+
+
+def is_shared(alias='default'):
+    """Whether the entries of the cache `alias` are seen by every worker."""
+    backend = type(caches[alias])
+    return f'{backend.__module__}.{backend.__name__}' not in LOCAL_BACKENDS
+
+
+def model_tag(model):
+    """Tag of every list of `model`, bumped when rows are added or removed."""
+    return model._meta.label
+
+
+def instance_tag(instance):
+    """Tag of every response that rendered `instance`."""
+    return f'{instance._meta.label}:{instance.pk}'
+
+
+def _list_model(graphql_type, root_field):
+    graphene_type = getattr(get_named_type(graphql_type), 'graphene_type', None)
+    if graphene_type is None:
+        return None
+    if issubclass(graphene_type, Connection):
+        return getattr(graphene_type._meta.node._meta, 'model', None)
+    if root_field or is_list_type(get_nullable_type(graphql_type)):
+        # A list, or a root lookup that found nothing, changes when a row is created or moved
+        return getattr(getattr(graphene_type, '_meta', None), 'model', None)
+    return None
+
+
+class CacheTagMiddleware:
+    """
+    Graphene middleware recording the dependency tags of a response while it
+    executes: every model instance a field is resolved on, and the model of
+    every connection, list and root field, whose result changes when
+    instances are created, deleted or moved.
+    """
+
+    def __init__(self, tags):
+        self.tags = tags
+
+    def resolve(self, next, root, info, **args):
+        if isinstance(root, models.Model):
+            self.tags.add(instance_tag(root))
+        model = _list_model(info.return_type, info.path.prev is None)
+        if model is not None:
+            self.tags.add(model_tag(model))
+        return next(root, info, **args)
+
+
+class ResponseCache:
+    """
+    Responses are stored with the version of each of their tags. Invalidating
+    a tag bumps its version, so every entry depending on it stops matching
+    without having to know which entries those are. A version bump has to
+    reach every worker, so nothing is cached on a process-local backend
+    unless ALLOW_LOCAL says there is a single one.
+
+    Versions are readings of one shared clock, advanced by every bump. A
+    response reads the clock before it is computed and is only stored when
+    none of its tags moved past that reading, so a change committed while it
+    was computed can not be stored under the version that announced it.
+    """
+
+    clock_key = 'gql:clock'
+
+    @property
+    def config(self):
+        return get_config()
+
+    @property
+    def cache(self):
+        return caches[self.config['CACHE']]
+
+    @property
+    def enabled(self):
+        config = self.config
+        return config['ALLOW_LOCAL'] or is_shared(config['CACHE'])
+
+    def tag_key(self, tag):
+        return f'gql:tag:{tag}'
+
+    def get_key(self, query_hash, operation_name, variables):
+        payload = json.dumps([query_hash, operation_name, variables or {}], sort_keys=True, default=str)
+        return 'gql:response:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, operation_ast, user):
+        if not self.enabled:
+            return False
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return False
+        if user is not None and user.is_authenticated:
+            return False
+        root_fields = self.config['ROOT_FIELDS']
+        return all(
+            isinstance(selection, FieldNode) and selection.name.value in root_fields
+            for selection in operation_ast.selection_set.selections
+        )
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        data, versions = entry
+        current = self.cache.get_many([self.tag_key(tag) for tag in versions])
+        for tag, version in versions.items():
+            if current.get(self.tag_key(tag)) != version:
+                return None
+        return data
+
+    def _start_clock(self):
+        # A new or lost clock starts past every version handed out before it
+        self.cache.add(self.clock_key, time.time_ns() // 1000, timeout=None)
+
+    def clock(self):
+        """Reading to pass to set() for a response computed from here on."""
+        if not self.enabled:
+            return None
+        reading = self.cache.get(self.clock_key)
+        if reading is None:
+            self._start_clock()
+            reading = self.cache.get(self.clock_key)
+        return reading
+
+    def set(self, key, data, tags, clock):
+        if not self.enabled:
+            return
+        keys = [self.tag_key(tag) for tag in tags]
+        current = self.cache.get_many(keys)
+        missing = [tag_key for tag_key in keys if tag_key not in current]
+        if missing:
+            # A tag never bumped, or whose version was evicted, starts at the reading
+            for tag_key in missing:
+                self.cache.add(tag_key, clock, timeout=None)
+            current.update(self.cache.get_many(missing))
+        versions = {tag: current.get(self.tag_key(tag)) for tag in tags}
+        if any(version is None or version > clock for version in versions.values()):
+            # A tag was invalidated while the response was computed, it may hold the old rows
+            return
+        self.cache.set(key, (data, versions), timeout=self.config['TIMEOUT'])
+
+    def _tick(self):
+        try:
+            return self.cache.incr(self.clock_key)
+        except ValueError:
+            self._start_clock()
+            return self.cache.incr(self.clock_key)
+
+    def _bump(self, tags):
+        version = self._tick()
+        # Tag versions outlive the entries depending on them
+        self.cache.set_many({self.tag_key(tag): version for tag in tags}, timeout=None)
+
+    def invalidate(self, *tags):
+        """Expires every entry depending on `tags` once the current transaction commits."""
+        tags = set(tags)
+        transaction.on_commit(lambda: self._bump(tags))
+
+
+response_cache = ResponseCache()
+
+
+def check_response_cache(app_configs, **kwargs):
+    if response_cache.enabled or not response_cache.config['ROOT_FIELDS']:
+        return []
+    return [checks.Warning(
+        'The response cache is off, its cache is local to each process.',
+        hint='Set REDIS_URL to share the default cache between workers, or RESPONSE_CACHE_ALLOW_LOCAL with a single process.',
+        id='Api.W001',
+    )]
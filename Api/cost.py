@@ -0,0 +1,152 @@
+# Description: Static cost and depth analysis of GraphQL operations, run before execution.
+from django.conf import settings
+from graphene.relay import Connection
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, OperationType,
+    get_named_type, is_composite_type, is_list_type, is_non_null_type, value_from_ast_untyped,
+)
+
+ROOT_TYPES = {
+    OperationType.QUERY: 'query_type',
+    OperationType.MUTATION: 'mutation_type',
+    OperationType.SUBSCRIPTION: 'subscription_type',
+}
+
+
+def get_config():
+    config = {
+        'MAX_COST': 10000,
+        'MAX_DEPTH': 10,
+        'DEFAULT_LIST_SIZE': 10,
+        'LIST_SIZES': {},
+        'FIELD_WEIGHTS': {},
+    }
+    config.update(getattr(settings, 'QUERY_COST', {}))
+    return config
+
+
+class QueryTooComplex(GraphQLError):
+    def __init__(self, message, cost):
+        super().__init__(message, extensions={'code': 'QUERY_TOO_COMPLEX', 'cost': cost})
+
+
+def _is_connection(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    return graphene_type is not None and issubclass(graphene_type, Connection)
+
+
+def _is_list(graphql_type):
+    if is_non_null_type(graphql_type):
+        graphql_type = graphql_type.of_type
+    return is_list_type(graphql_type)
+
+
+class CostAnalysis:
+    """
+    Estimates the work of an operation from its document alone. Every object
+    field costs its weight (1 unless configured, scalars are free) plus the
+    cost of its selection. Connections and lists multiply one unit per row and
+    the cost of the row's selection by the rows they can return: `first` or
+    `last` for connections, else their configured size or the relay max
+    limit, and the configured size for plain lists. Connection plumbing (`edges`, `node`,
+    `pageInfo`) adds neither cost nor depth.
+    """
+
+    def __init__(self, schema, fragments, variables, config=None):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.config = config or get_config()
+        self.max_depth = 0
+
+    def weight(self, parent_type, field_name, field_type):
+        weights = self.config['FIELD_WEIGHTS']
+        for key in (f'{parent_type.name}.{field_name}', parent_type.name):
+            if key in weights:
+                return weights[key]
+        return 1 if is_composite_type(get_named_type(field_type)) else 0
+
+    def argument(self, node, name):
+        for argument in node.arguments:
+            if argument.name.value == name:
+                value = value_from_ast_untyped(argument.value, self.variables)
+                return value if isinstance(value, int) else None
+        return None
+
+    def rows(self, parent_type, field_def, node):
+        size = self.config['LIST_SIZES'].get(f'{parent_type.name}.{node.name.value}')
+        if _is_connection(get_named_type(field_def.type)):
+            count = self.argument(node, 'first')
+            if count is None:
+                count = self.argument(node, 'last')
+            if count is None:
+                count = size or graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+            return max(count, 0)
+        if _is_list(field_def.type):
+            return size or self.config['DEFAULT_LIST_SIZE']
+        return None
+
+    def selection_cost(self, parent_type, selection_set, depth):
+        if selection_set is None:
+            return 0
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost += self.field_cost(parent_type, selection, depth)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = self.schema.get_type(condition.name.value) if condition else parent_type
+                cost += self.selection_cost(fragment_type, selection.selection_set, depth)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                    cost += self.selection_cost(fragment_type, fragment.selection_set, depth)
+        return cost
+
+    def field_cost(self, parent_type, node, depth):
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', None)
+        if name.startswith('__') or not fields or name not in fields:
+            return 0
+        field_def = fields[name]
+        named_type = get_named_type(field_def.type)
+
+        plumbing = _is_connection(parent_type) or (parent_type.name.endswith('Edge') and name == 'node')
+        if plumbing:
+            # Extra fields on a connection (e.g. facets) only cost what is configured for them
+            weight = self.config['FIELD_WEIGHTS'].get(f'{parent_type.name}.{name}', 0)
+            return weight + self.selection_cost(named_type, node.selection_set, depth)
+
+        depth += 1
+        self.max_depth = max(self.max_depth, depth)
+        children = self.selection_cost(named_type, node.selection_set, depth)
+        weight = self.weight(parent_type, name, field_def.type)
+        rows = self.rows(parent_type, field_def, node)
+        if rows is None:
+            return weight + children
+        # Every row of a list is fetched, whatever is selected on it
+        unit = 1 if is_composite_type(named_type) else 0
+        return weight + rows * (unit + children)
+
+    def analyse(self, operation):
+        root_type = getattr(self.schema, ROOT_TYPES[operation.operation])
+        cost = self.selection_cost(root_type, operation.selection_set, 0)
+        return {'cost': cost, 'depth': self.max_depth}
+
+
+def check_cost(schema, document, operation, variables):
+    """
+    Returns `{'cost', 'depth', 'maxCost', 'maxDepth'}` for `operation`, raising
+    QueryTooComplex when it is over the configured budget.
+    """
+    config = get_config()
+    fragments = {definition.name.value: definition for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)}
+    result = CostAnalysis(schema, fragments, variables, config).analyse(operation)
+    report = {**result, 'maxCost': config['MAX_COST'], 'maxDepth': config['MAX_DEPTH']}
+    if config['MAX_DEPTH'] and result['depth'] > config['MAX_DEPTH']:
+        raise QueryTooComplex(f"Query depth {result['depth']} exceeds the maximum of {config['MAX_DEPTH']}", report)
+    if config['MAX_COST'] and result['cost'] > config['MAX_COST']:
+        raise QueryTooComplex(f"Query cost {result['cost']} exceeds the maximum of {config['MAX_COST']}", report)
+    return report
@@ -0,0 +1,54 @@
+# Description: In-process LRU cache of parsed and validated GraphQL documents.
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+
+class DocumentCache:
+    """
+    Bounded LRU of `hash -> (document, validation errors)`. Documents are
+    immutable once parsed, so a cached entry can be executed by any request.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or getattr(settings, 'DOCUMENT_CACHE', {}).get('MAX_SIZE', 1000)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, hash):
+        with self._lock:
+            entry = self._entries.get(hash)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(hash)
+            self.hits += 1
+            return entry
+
+    def set(self, hash, entry):
+        with self._lock:
+            self._entries[hash] = entry
+            self._entries.move_to_end(hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+document_cache = DocumentCache()
@@ -0,0 +1,36 @@
+# Description: Execution context that lets coroutine root fields run on the event loop next to the sync ORM.
+from asyncio import get_running_loop
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from graphql import ExecutionContext
+
+
+def is_async_resolver(resolve):
+    while hasattr(resolve, 'func'):
+        resolve = resolve.func
+    return iscoroutinefunction(resolve)
+
+
+def in_event_loop():
+    try:
+        get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class AsyncExecutionContext(ExecutionContext):
+    """
+    Root fields written as coroutines are awaited on the event loop, and the
+    object each of them returns is completed, with every field nested under
+    it, in one hop to the request's worker thread. The object types of the
+    schema resolve through the sync ORM, so they never run on the loop.
+    Outside of an event loop it executes like the default context.
+    """
+
+    def complete_value(self, return_type, field_nodes, info, path, result):
+        complete_value = super().complete_value
+        if path.prev is not None or not in_event_loop():
+            return complete_value(return_type, field_nodes, info, path, result)
+        return sync_to_async(complete_value)(return_type, field_nodes, info, path, result)
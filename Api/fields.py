@@ -0,0 +1,154 @@
+# Description: Connection fields shared by the app schemas.
+import base64
+import json
+from functools import partial
+
+import graphene
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from graphene.relay.connection import PageInfo
+from graphene_django.filter import DjangoFilterConnectionField as BaseDjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+
+from Api.loaders import get_loaders
+from Api.optimizer import optimize
+
+
+def ordering_keys(ordering):
+    """ORDER BY of an `ordering` enum value, with the primary key breaking ties in the same direction."""
+    ordering = getattr(ordering, 'value', ordering)
+    return [ordering, '-pk' if ordering.startswith('-') else 'pk']
+
+
+class DjangoFilterConnectionField(BaseDjangoFilterConnectionField):
+    """
+    Filter connection field whose queryset is shaped by the client's selection
+    and whose page nodes are handed to the request's loaders, so related fields
+    selected on them resolve in batches. With `ordering`, a graphene Enum of
+    model field names (prefixed with `-` for descending order), it takes an
+    `orderBy` argument limited to those values, which should all be backed by
+    an index.
+    """
+
+    def __init__(self, type_, *args, ordering=None, **kwargs):
+        super().__init__(type_, *args, **kwargs)
+        if ordering is not None:
+            self.args = {**self._base_args, 'order_by': graphene.Argument(ordering)}
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        # Relations served from a loader come back as plain lists
+        if not isinstance(maybe_queryset(iterable), QuerySet):
+            return iterable
+        queryset = super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+        if args.get('order_by'):
+            queryset = queryset.order_by(*ordering_keys(args['order_by']))
+        return optimize(queryset, info)
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver, max_limit, enforce_first_or_last, root, info, **args):
+        resolved = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver, max_limit, enforce_first_or_last, root, info, **args
+        )
+        edges = getattr(resolved, 'edges', None)
+        if edges:
+            get_loaders(info).prime(edge.node for edge in edges)
+        return resolved
+
+
+def encode_keyset_cursor(value, pk):
+    payload = json.dumps([str(value) if value is not None else None, pk])
+    return base64.b64encode(f'keyset:{payload}'.encode('utf-8')).decode('ascii')
+
+
+def decode_keyset_cursor(cursor):
+    try:
+        prefix, payload = base64.b64decode(cursor).decode('utf-8').split(':', 1)
+        value, pk = json.loads(payload)
+    except (ValueError, TypeError):
+        raise GraphQLError('Invalid cursor')
+    if prefix != 'keyset':
+        raise GraphQLError('Invalid cursor')
+    return value, pk
+
+
+class KeysetConnectionField(DjangoFilterConnectionField):
+    """
+    Filter connection paginated by keyset instead of offset. Cursors carry the
+    sort value and primary key of a row, so every page is an index range scan
+    that starts right after the previous one, however deep it is. `ordering` is
+    a graphene Enum whose values are model field names, prefixed with `-` for
+    descending order.
+    """
+
+    def __init__(self, type_, ordering, default_ordering='-created_at', *args, **kwargs):
+        self.default_ordering = default_ordering
+        super().__init__(type_, *args, ordering=ordering, **kwargs)
+        base_args = dict(self._base_args)
+        base_args.pop('offset', None)
+        self.args = base_args
+
+    @staticmethod
+    def keyset_filter(key, descending, cursor, forward):
+        value, pk = cursor
+        after = forward != descending
+        lookup = 'gt' if after else 'lt'
+        return Q(**{f'{key}__{lookup}': value}) | Q(**{key: value, f'pk__{lookup}': pk})
+
+    @classmethod
+    def keyset_resolver(cls, resolver, connection, default_manager, queryset_resolver, max_limit, default_ordering, root, info, **args):
+        first = args.get('first')
+        last = args.get('last')
+        for name, count in (('first', first), ('last', last)):
+            if count is not None and (count < 0 or (max_limit and count > max_limit)):
+                raise GraphQLError(f'`{name}` on the `{info.field_name}` connection must be between 0 and {max_limit}.')
+
+        ordering = args.pop('order_by', None)
+        ordering = getattr(ordering, 'value', ordering) or default_ordering
+        key = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+
+        iterable = resolver(root, info, **args)
+        if iterable is None:
+            iterable = default_manager
+        queryset = queryset_resolver(connection, iterable, info, args)
+
+        if args.get('after'):
+            queryset = queryset.filter(cls.keyset_filter(key, descending, decode_keyset_cursor(args['after']), True))
+        if args.get('before'):
+            queryset = queryset.filter(cls.keyset_filter(key, descending, decode_keyset_cursor(args['before']), False))
+
+        backward = last is not None and first is None
+        limit = last if backward else (first if first is not None else max_limit)
+        order = ordering_keys(ordering)
+        if backward:
+            order = [field[1:] if field.startswith('-') else f'-{field}' for field in order]
+        rows = list(queryset.order_by(*order)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+
+        get_loaders(info).prime(rows)
+        edges = [connection.Edge(node=row, cursor=encode_keyset_cursor(getattr(row, key), row.pk)) for row in rows]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_more if backward else bool(args.get('after')),
+            has_next_page=bool(args.get('before')) if backward else has_more,
+        )
+        resolved = connection(edges=edges, page_info=page_info)
+        resolved.iterable = queryset
+        return resolved
+
+    def wrap_resolve(self, parent_resolver):
+        return partial(
+            self.keyset_resolver,
+            parent_resolver,
+            self.connection_type,
+            self.get_manager(),
+            self.get_queryset_resolver(),
+            self.max_limit,
+            self.default_ordering,
+        )
@@ -0,0 +1,148 @@
+# Description: Request scoped loaders that batch the related lookups of GraphQL nodes.
+from collections import defaultdict
+
+
+PAGINATION_ARGS = ('first', 'last', 'before', 'after', 'offset')
+
+
+def get_relation_field(model, name):
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        accessor = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if accessor == name:
+            return field
+    raise ValueError(f'{model.__name__} has no relation named "{name}"')
+
+
+class RelatedLoader:
+    """
+    Loads one relation of a model for every instance of that model seen in the
+    current request, so that resolving it for a whole page costs one query.
+    """
+
+    def __init__(self, registry, model, name):
+        self.registry = registry
+        self.model = model
+        self.name = name
+        self.field = get_relation_field(model, name)
+        self.many = self.field.one_to_many or self.field.many_to_many
+        self.forward = self.field.concrete and not self.many
+        self._cache = {}
+
+    def _key(self, instance):
+        if self.forward:
+            return getattr(instance, self.field.attname)
+        return instance.pk
+
+    def _is_cached(self, instance):
+        if self.many:
+            if self.field.concrete:
+                cache_name = self.field.name
+            elif self.field.many_to_many:
+                cache_name = self.field.field.related_query_name()
+            else:
+                cache_name = self.field.get_accessor_name()
+            return cache_name in getattr(instance, '_prefetched_objects_cache', {})
+        return self.field.is_cached(instance)
+
+    def load(self, instance):
+        if self._is_cached(instance):
+            value = getattr(instance, self.name)
+            value = list(value.all()) if self.many else value
+            self.registry.prime(value if self.many else [value])
+            return value
+        key = self._key(instance)
+        if key is None:
+            return [] if self.many else None
+        if key not in self._cache:
+            self.registry.prime([instance])
+            keys = {self._key(obj) for obj in self.registry.seen(self.model).values()}
+            keys.add(key)
+            self._fetch({k for k in keys if k is not None and k not in self._cache})
+        return self._cache[key]
+
+    def _fetch(self, keys):
+        field = self.field
+        if self.forward:
+            if field.target_field.primary_key:
+                # Rows this request already holds need no query
+                seen = self.registry.seen(field.related_model)
+                self._cache.update({key: seen[key] for key in keys if key in seen})
+                keys = {key for key in keys if key not in seen}
+                if not keys:
+                    return
+            found = field.related_model._default_manager.in_bulk(keys, field_name=field.target_field.attname)
+            self._cache.update({key: found.get(key) for key in keys})
+            self.registry.prime(found.values())
+            return
+
+        if field.many_to_many:
+            if field.concrete:
+                through = field.remote_field.through
+                source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            else:
+                through = field.through
+                source, target = field.field.m2m_reverse_field_name(), field.field.m2m_field_name()
+            rows = through._default_manager.filter(**{f'{source}__in': keys}).select_related(target)
+            pairs = [(getattr(row, f'{source}_id'), getattr(row, target)) for row in rows]
+        else:
+            rows = field.related_model._default_manager.filter(**{f'{field.field.name}__in': keys})
+            pairs = [(getattr(row, field.field.attname), row) for row in rows]
+
+        grouped = defaultdict(list)
+        for key, obj in pairs:
+            grouped[key].append(obj)
+        for key in keys:
+            if self.many:
+                self._cache[key] = grouped.get(key, [])
+            else:
+                self._cache[key] = grouped[key][0] if grouped.get(key) else None
+        self.registry.prime(obj for _, obj in pairs)
+
+
+class LoaderRegistry:
+    def __init__(self):
+        self._instances = defaultdict(dict)
+        self._loaders = {}
+
+    def prime(self, instances):
+        for obj in instances:
+            if obj is not None:
+                self._instances[obj._meta.concrete_model].setdefault(obj.pk, obj)
+
+    def seen(self, model):
+        return self._instances[model._meta.concrete_model]
+
+    def loader(self, model, name) -> RelatedLoader:
+        model = model._meta.concrete_model
+        if (model, name) not in self._loaders:
+            self._loaders[(model, name)] = RelatedLoader(self, model, name)
+        return self._loaders[(model, name)]
+
+    def load(self, instance, name):
+        return self.loader(type(instance), name).load(instance)
+
+
+def get_loaders(info) -> LoaderRegistry:
+    context = info.context
+    if context is None:
+        return LoaderRegistry()
+    loaders = getattr(context, '_loaders', None)
+    if loaders is None:
+        loaders = LoaderRegistry()
+        context._loaders = loaders
+    return loaders
+
+
+def related_resolver(name):
+    """
+    Resolver for the relation `name` of a node that goes through the request's
+    loaders. Filtered connections fall back to the related manager so that the
+    filterset still applies.
+    """
+    def resolver(root, info, **kwargs):
+        if any(value is not None for key, value in kwargs.items() if key not in PAGINATION_ARGS):
+            return getattr(root, name).all()
+        return get_loaders(info).load(root, name)
+    return resolver
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersistedQuery',
+            fields=[
+                ('hash', models.CharField(editable=False, max_length=64, primary_key=True, serialize=False, unique=True)),
+                ('query', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Persisted Query',
+                'verbose_name_plural': 'Persisted Queries',
+                'db_table': 'persisted_query',
+            },
+        ),
+    ]
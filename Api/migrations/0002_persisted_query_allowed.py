@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Api', '0001_initial'),
+    ]
+
+    operations = [
+        # Existing rows may have been registered by any client, they are allowed again through the admin
+        migrations.AddField(
+            model_name='persistedquery',
+            name='allowed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='persistedquery',
+            name='allowed',
+            field=models.BooleanField(default=True),
+        ),
+    ]
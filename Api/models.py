@@ -1,3 +1,30 @@
+import hashlib
+from django.core.cache import cache
 from django.db import models
 
 # Create your models here.
+
+class PersistedQuery(models.Model):
+    hash = models.CharField(max_length=64, unique=True, editable=False, primary_key=True)
+    query = models.TextField()
+    # Only allowed queries run in strict mode, the ones clients register through APQ are not
+    allowed = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        if not self.pk:
+            self.hash = hashlib.sha256(self.query.encode('utf-8')).hexdigest()
+        super().save(*args, **kwargs)
+        cache.delete(self.allowed_key(self.hash))
+
+    @staticmethod
+    def allowed_key(hash):
+        return f'apq:allowed:{hash}'
+
+    def __str__(self):
+        return self.hash
+
+    class Meta:
+        db_table = 'persisted_query'
+        verbose_name = 'Persisted Query'
+        verbose_name_plural = 'Persisted Queries'
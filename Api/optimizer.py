@@ -0,0 +1,123 @@
+# Description: Rewrites root querysets from the GraphQL selection set of the field being resolved.
+from django.db import models
+from django.db.models import Prefetch
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_camel_case
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, get_named_type
+
+from Api.loaders import PAGINATION_ARGS
+
+# Columns that are only loaded when the client selects them
+HEAVY_FIELDS = (models.TextField, models.JSONField)
+
+
+def _collect(selection_set, info, fields):
+    if selection_set is None:
+        return fields
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            fields.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            _collect(selection.selection_set, info, fields)
+        elif isinstance(selection, FragmentSpreadNode):
+            _collect(info.fragments[selection.name.value].selection_set, info, fields)
+    return fields
+
+
+def selected_fields(nodes, info):
+    """Merges the sub selections of `nodes` into {field name: [FieldNode]}, expanding fragments."""
+    fields = {}
+    for node in nodes:
+        _collect(node.selection_set, info, fields)
+    return fields
+
+
+def node_selection(graphql_type, nodes, info):
+    """
+    Returns the object type a field resolves to and its selected fields,
+    looking through `edges { node }` when the field is a Relay connection.
+    """
+    graphql_type = get_named_type(graphql_type)
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    if graphene_type is not None and issubclass(graphene_type, Connection):
+        edges = selected_fields(nodes, info).get('edges', [])
+        edge_type = get_named_type(graphql_type.fields['edges'].type)
+        return node_selection(edge_type.fields['node'].type, selected_fields(edges, info).get('node', []), info)
+    return graphql_type, selected_fields(nodes, info)
+
+
+def _model_fields(model):
+    fields = {}
+    for field in model._meta.get_fields():
+        if field.auto_created and not field.concrete:
+            fields[field.get_accessor_name()] = field
+        else:
+            fields[field.name] = field
+    return fields
+
+
+def _field_names(graphene_type):
+    return {getattr(field, 'name', None) or to_camel_case(name): name for name, field in graphene_type._meta.fields.items()}
+
+
+class QueryPlan:
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = []
+        self.deferred = []
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.deferred:
+            queryset = queryset.defer(*self.deferred)
+        return queryset
+
+
+def _plan(model, graphql_type, fields, info, plan, prefix=''):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    if getattr(getattr(graphene_type, '_meta', None), 'model', None) is not model:
+        return plan
+
+    names = _field_names(graphene_type)
+    model_fields = _model_fields(model)
+    selected = set()
+    for graphql_name, nodes in fields.items():
+        name = names.get(graphql_name)
+        field = model_fields.get(name)
+        if field is None:
+            continue
+        selected.add(field.name)
+        if not field.is_relation:
+            continue
+
+        child_type, child_fields = node_selection(graphql_type.fields[graphql_name].type, nodes, info)
+        if field.one_to_one or field.many_to_one:
+            plan.select_related.append(prefix + name)
+            _plan(field.related_model, child_type, child_fields, info, plan, f'{prefix}{name}__')
+        elif not any(arg.name.value not in PAGINATION_ARGS for node in nodes for arg in node.arguments):
+            # Filtered nested connections are left to their own resolver
+            queryset = optimize_selection(field.related_model._default_manager.all(), child_type, child_fields, info)
+            plan.prefetch_related.append(Prefetch(prefix + name, queryset=queryset))
+
+    for field in model._meta.concrete_fields:
+        if isinstance(field, HEAVY_FIELDS) and not field.primary_key and field.name not in selected:
+            plan.deferred.append(prefix + field.name)
+    return plan
+
+
+def optimize_selection(queryset, graphql_type, fields, info):
+    return _plan(queryset.model, graphql_type, fields, info, QueryPlan()).apply(queryset)
+
+
+def optimize(queryset, info):
+    """
+    Adds the joins, prefetches and deferred columns needed by the selection of
+    the field being resolved to `queryset`. Works for object and connection fields.
+    """
+    graphql_type, fields = node_selection(info.return_type, info.field_nodes, info)
+    if not fields:
+        return queryset
+    return optimize_selection(queryset, graphql_type, fields, info)
@@ -0,0 +1,159 @@
+# Description: Persisted queries and automatic persisted queries (APQ) for the GraphQL endpoint.
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from graphql import GraphQLError
+
+from Api.documents import DocumentCache
+from Api.models import PersistedQuery
+
+
+def get_config():
+    config = {
+        'STRICT': False,
+        'AUTO_REGISTER': True,
+        # Documents a client may register per minute, None for no limit
+        'REGISTER_RATE': 30,
+        'MAX_SIZE': 1000,
+        # Seconds an `allowed` flag read from the database is trusted in the shared cache
+        'ALLOWED_TIMEOUT': 60,
+        # META key of the client address set by the proxy in front, e.g. HTTP_X_FORWARDED_FOR
+        'CLIENT_IP_HEADER': None,
+    }
+    config.update(getattr(settings, 'PERSISTED_QUERIES', {}))
+    return config
+
+
+# hash -> query text of the persisted queries this process served last. The
+# text of a hash never changes, whether it is allowed is read from the shared cache
+_queries = DocumentCache(max_size=get_config()['MAX_SIZE'])
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def is_strict():
+    return get_config()['STRICT']
+
+
+class PersistedQueryNotFound(GraphQLError):
+    def __init__(self):
+        super().__init__('PersistedQueryNotFound', extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'})
+
+
+class PersistedQueryNotAllowed(GraphQLError):
+    def __init__(self):
+        super().__init__('Only registered queries are allowed', extensions={'code': 'PERSISTED_QUERY_NOT_ALLOWED'})
+
+
+class PersistedQueryHashMismatch(GraphQLError):
+    def __init__(self):
+        super().__init__('Provided sha does not match query', extensions={'code': 'INVALID_PERSISTED_QUERY'})
+
+
+def get_persisted_extension(request, data):
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try: extensions = json.loads(extensions)
+        except ValueError: return None
+    if not isinstance(extensions, dict):
+        return None
+    return extensions.get('persistedQuery')
+
+
+def is_allowed(hash):
+    """
+    Whether the persisted query `hash` may run in strict mode. The flag is
+    shared between workers and dropped when the query is saved, so revoking
+    a query takes effect at once, or after ALLOWED_TIMEOUT when it was
+    changed without `save` or the cache is local to each process.
+    """
+    key = PersistedQuery.allowed_key(hash)
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = PersistedQuery.objects.filter(hash=hash, allowed=True).exists()
+        cache.set(key, allowed, timeout=get_config()['ALLOWED_TIMEOUT'])
+    return allowed
+
+
+def lookup(hash, allowed=False):
+    """Text of the persisted query `hash`, None when there is none or, with `allowed`, when it is not allowed."""
+    if allowed and not is_allowed(hash):
+        return None
+    query = _queries.get(hash)
+    if query is None:
+        query = PersistedQuery.objects.filter(hash=hash).values_list('query', flat=True).first()
+        if query is None:
+            return None
+        _queries.set(hash, query)
+    return query
+
+
+def client_ip(request):
+    header = get_config()['CLIENT_IP_HEADER']
+    forwarded = request.META.get(header) if header else None
+    if forwarded:
+        # The proxy appends the address it received the request from, the rest may be forged
+        return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def may_register(request):
+    config = get_config()
+    if not config['AUTO_REGISTER']:
+        return False
+    if not config['REGISTER_RATE']:
+        return True
+    key = f"apq:register:{client_ip(request)}"
+    cache.add(key, 0, timeout=60)
+    try: count = cache.incr(key)
+    except ValueError: count = 1
+    return count <= config['REGISTER_RATE']
+
+
+def register(request, query):
+    """
+    Stores a document a client sent with its hash, once it parsed and
+    validated, unless auto registration is off or the client went over its
+    rate. Registered documents are not allowed for strict mode.
+    """
+    if not may_register(request):
+        return None
+    persisted, new = PersistedQuery.objects.get_or_create(hash=query_hash(query), defaults={'query': query, 'allowed': False})
+    _queries.set(persisted.hash, persisted.query)
+    return persisted.hash
+
+
+def resolve_query(request, data, query):
+    """
+    Returns the query text to run, its persisted hash (None for ad hoc
+    queries) and whether it is to be registered, following the APQ protocol:
+    a known hash runs the stored document, an unknown hash sent with its
+    query runs it and registers it once it is valid (see `register`). In
+    strict mode only the documents allowed beforehand are accepted.
+    """
+    extension = get_persisted_extension(request, data)
+    hash = extension.get('sha256Hash') if extension else None
+    strict = is_strict()
+
+    if hash:
+        stored = lookup(hash, allowed=strict)
+        if stored is not None:
+            return stored, hash, False
+        if strict:
+            raise PersistedQueryNotAllowed()
+        if not query:
+            raise PersistedQueryNotFound()
+        if query_hash(query) != hash:
+            raise PersistedQueryHashMismatch()
+        return query, hash, True
+
+    if query and strict:
+        hash = query_hash(query)
+        if lookup(hash, allowed=True) is None:
+            raise PersistedQueryNotAllowed()
+        return query, hash, False
+    return query, None, False
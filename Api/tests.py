@@ -1,3 +1,155 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from Api import persisted, views
+from Api.cache import response_cache
+from Api.documents import DocumentCache, document_cache
+from Api.models import PersistedQuery
+from Api.persisted import query_hash
+
+QUERY = '{ categories(first: 1) { edges { node { id } } } }'
+
+
+class GraphQLTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        document_cache.clear()
+        persisted._queries.clear()
+
+    def post(self, body):
+        response = self.client.post('/api/v1/', json.dumps(body), content_type='application/json')
+        return response.json()
+
+
+class PersistedQueryTests(GraphQLTestCase):
+    def apq(self, query, hash=None):
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': hash or query_hash(query)}}
+        body = {'extensions': extensions}
+        if query is not None:
+            body['query'] = query
+        return self.post(body)
+
+    def test_valid_document_is_registered_not_allowed(self):
+        result = self.apq(QUERY)
+        self.assertNotIn('errors', result)
+        self.assertFalse(PersistedQuery.objects.get(hash=query_hash(QUERY)).allowed)
+        self.assertNotIn('errors', self.apq(None, query_hash(QUERY)))
+
+    def test_invalid_documents_are_not_registered(self):
+        for query in ('{ notAField }', '{ categories('):
+            result = self.apq(query)
+            self.assertIn('errors', result)
+        self.assertFalse(PersistedQuery.objects.exists())
+        self.assertEqual(self.apq(None, query_hash('{ notAField }'))['errors'][0]['message'], 'PersistedQueryNotFound')
+
+    @override_settings(PERSISTED_QUERIES={'AUTO_REGISTER': False})
+    def test_auto_registration_can_be_disabled(self):
+        self.assertNotIn('errors', self.apq(QUERY))
+        self.assertFalse(PersistedQuery.objects.exists())
+
+    @override_settings(PERSISTED_QUERIES={'REGISTER_RATE': 2})
+    def test_registrations_are_rate_limited_per_client(self):
+        for first in range(1, 5):
+            self.assertNotIn('errors', self.apq(QUERY.replace('first: 1', f'first: {first}')))
+        self.assertEqual(PersistedQuery.objects.count(), 2)
+
+    def test_auto_registered_queries_are_not_allowed_in_strict_mode(self):
+        self.apq(QUERY)
+        with override_settings(PERSISTED_QUERIES={'STRICT': True}):
+            self.assertEqual(self.apq(None, query_hash(QUERY))['errors'][0]['message'], 'Only registered queries are allowed')
+            self.assertIn('errors', self.post({'query': QUERY}))
+            query = PersistedQuery.objects.get(hash=query_hash(QUERY))
+            query.allowed = True
+            query.save()
+            self.assertNotIn('errors', self.apq(None, query_hash(QUERY)))
+            self.assertNotIn('errors', self.post({'query': QUERY}))
+
+    @override_settings(PERSISTED_QUERIES={'STRICT': True})
+    def test_revoked_query_is_refused_by_every_worker(self):
+        query = PersistedQuery.objects.create(query=QUERY)
+        self.assertNotIn('errors', self.apq(None, query.hash))
+        query.allowed = False
+        query.save()
+        # The text stays in process, whether it may run is not cached there
+        self.assertEqual(persisted._queries.get(query.hash), QUERY)
+        self.assertEqual(self.apq(None, query.hash)['errors'][0]['message'], 'Only registered queries are allowed')
+
+    @override_settings(PERSISTED_QUERIES={'REGISTER_RATE': 1, 'CLIENT_IP_HEADER': 'HTTP_X_FORWARDED_FOR'})
+    def test_registrations_are_counted_per_forwarded_client(self):
+        for first, client in ((1, '10.0.0.1'), (2, '10.0.0.2'), (3, '10.0.0.1')):
+            body = {'query': QUERY.replace('first: 1', f'first: {first}')}
+            body['extensions'] = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(body['query'])}}
+            self.client.post('/api/v1/', json.dumps(body), content_type='application/json', HTTP_X_FORWARDED_FOR=f'1.2.3.4, {client}')
+        self.assertEqual(PersistedQuery.objects.count(), 2)
+
+    def test_served_queries_are_bounded(self):
+        with mock.patch.object(persisted, '_queries', DocumentCache(max_size=2)):
+            for first in range(1, 5):
+                self.apq(QUERY.replace('first: 1', f'first: {first}'))
+            self.assertEqual(persisted._queries.stats()['size'], 2)
+
+
+class DocumentCacheTests(GraphQLTestCase):
+    def test_least_recently_used_document_is_evicted(self):
+        documents = DocumentCache(max_size=2)
+        documents.set('a', 'A')
+        documents.set('b', 'B')
+        documents.get('a')
+        documents.set('c', 'C')
+        self.assertIsNone(documents.get('b'))
+        self.assertEqual((documents.get('a'), documents.get('c')), ('A', 'C'))
+        self.assertEqual(documents.stats(), {'size': 2, 'max_size': 2, 'hits': 3, 'misses': 1, 'hit_rate': 0.75})
+
+    def test_query_text_is_parsed_and_validated_once(self):
+        with mock.patch('Api.views.parse', wraps=views.parse) as parse, mock.patch('Api.views.validate', wraps=views.validate) as validate:
+            for _ in range(3):
+                self.assertNotIn('errors', self.post({'query': QUERY}))
+                self.assertIn('errors', self.post({'query': '{ notAField }'}))
+        self.assertEqual((parse.call_count, validate.call_count), (2, 2))
+        self.assertEqual(document_cache.stats()['size'], 2)
+
+
+@override_settings(RESPONSE_CACHE={'ALLOW_LOCAL': True})
+class ResponseCacheTests(GraphQLTestCase):
+    def test_tag_bumped_after_the_clock_reading_is_not_stored(self):
+        clock = response_cache.clock()
+        response_cache._bump({'tag'})
+        response_cache.set('key', 'stale', {'tag'}, clock)
+        self.assertIsNone(response_cache.get('key'))
+        response_cache.set('key', 'fresh', {'tag'}, response_cache.clock())
+        self.assertEqual(response_cache.get('key'), 'fresh')
+
+    def test_evicted_tag_does_not_revive_entries(self):
+        response_cache.set('key', 'old', {'tag'}, response_cache.clock())
+        response_cache._bump({'tag'})
+        cache.delete(response_cache.tag_key('tag'))
+        response_cache.set('other', 'new', {'tag'}, response_cache.clock())
+        self.assertIsNone(response_cache.get('key'))
+        self.assertEqual(response_cache.get('other'), 'new')
+
+
+class QueryCostTests(GraphQLTestCase):
+    def test_whole_category_tree_is_within_budget(self):
+        query = '{ categoryTree { name children { name children { name children { name children { name } } } } } }'
+        result = self.post({'query': query})
+        self.assertNotIn('errors', result)
+        self.assertEqual(result['extensions']['cost']['cost'], 9371)
+
+    def test_expensive_page_is_rejected_before_execution(self):
+        query = 'query($first: Int) { items(first: $first) { edges { node { name tags(first: $first) { edges { node { name } } } } } } }'
+        self.assertNotIn('errors', self.post({'query': query, 'variables': {'first': 10}}))
+        with self.assertNumQueries(0):
+            result = self.post({'query': query, 'variables': {'first': 200}})
+        error, = result['errors']
+        self.assertEqual(error['extensions']['code'], 'QUERY_TOO_COMPLEX')
+        self.assertGreater(error['extensions']['cost']['cost'], error['extensions']['cost']['maxCost'])
+        self.assertNotIn('data', result)
+
+    @override_settings(QUERY_COST={'MAX_DEPTH': 4})
+    def test_deep_query_is_rejected(self):
+        self.assertNotIn('errors', self.post({'query': '{ categoryTree { children { children { name } } } }'}))
+        result = self.post({'query': '{ categoryTree { children { children { children { name } } } } }'})
+        self.assertEqual(result['errors'][0]['message'], 'Query depth 5 exceeds the maximum of 4')
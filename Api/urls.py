@@ -1,7 +1,11 @@
 # Description: This file is used to define the URL patterns for the API application.
 from django.urls import path
-from graphene_django.views import GraphQLView
+from Api.views import AsyncGraphQLView, document_cache_stats
+from Inventory.views import catalog_import, order_export
 
 version_1 = [
-    path('', GraphQLView.as_view(graphiql=True)),
+    path('', AsyncGraphQLView.as_view(graphiql=True)),
+    path('stats/documents/', document_cache_stats, name='document_cache_stats'),
+    path('catalog/import/', catalog_import, name='catalog_import'),
+    path('orders/export/', order_export, name='order_export'),
 ]
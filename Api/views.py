@@ -1,7 +1,28 @@
+from inspect import isawaitable
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection, transaction
 from django.shortcuts import render
 from cloudinary.uploader import upload_image
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import ensure_csrf_cookie
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView as BaseGraphQLView, HttpError
+from graphql import ExecutionResult, FieldNode, GraphQLError, OperationType, execute, get_operation_ast, parse, validate, validate_schema
+
+from Api.cache import CacheTagMiddleware, response_cache
+from Api.cost import check_cost
+from Api.documents import document_cache
+from Api.execution import AsyncExecutionContext, is_async_resolver
+from Api.persisted import query_hash, register, resolve_query
+
+async def _await(awaitable):
+    return await awaitable
 
 @login_required
 def image_upload(request):
@@ -20,4 +41,283 @@ def image_upload(request):
                 }
             except Exception as e:
                 context['error'] = 'Image upload failed'
-    return render(request, 'upload_image.html', context)
\ No newline at end of file
+    return render(request, 'upload_image.html', context)
+
+@staff_member_required
+def document_cache_stats(request):
+    return JsonResponse(document_cache.stats())
+
+class GraphQLView(BaseGraphQLView):
+    """
+    GraphQL endpoint that serves persisted queries and reuses the parsed and
+    validated document of any query text it has seen recently.
+    """
+
+    execution_context_class = AsyncExecutionContext
+
+    def get_document(self, query, hash=None):
+        hash = hash or query_hash(query)
+        entry = document_cache.get(hash)
+        if entry is None:
+            document = parse(query)
+            validation_errors = validate(
+                self.schema.graphql_schema,
+                document,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+            entry = (document, validation_errors)
+            document_cache.set(hash, entry)
+        return entry
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    def encode_result(self, request, execution_result, id=None, show_graphiql=False):
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if not execution_result:
+            return None, status_code
+
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(not getattr(e, "path", None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def prepare_operation(self, request, query, hash, operation_name, show_graphiql=False):
+        """
+        Returns the `(document, operation)` to execute, or the result to answer
+        with when the request can not be executed.
+        """
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema_validation_errors = validate_schema(self.schema.graphql_schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document, validation_errors = self.get_document(query, hash)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if request.method.lower() == "get" and operation_ast is not None and operation_ast.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(operation_ast.operation.value),
+                )
+            )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+        return document, operation_ast
+
+    def analyse_cost(self, document, operation_ast, variables):
+        """Cost report of the operation, raises QueryTooComplex when it is over budget."""
+        if operation_ast is None:
+            return None
+        return check_cost(self.schema.graphql_schema, document, operation_ast, variables)
+
+    def with_cost(self, result, cost):
+        if result is not None and cost is not None:
+            result.extensions = {**(result.extensions or {}), "cost": cost}
+        return result
+
+    def get_cache_key(self, user, query, hash, operation_ast, operation_name, variables):
+        """Key of the shared response cache entry for this request, None when it must not be cached."""
+        if not response_cache.is_cacheable(operation_ast, user):
+            return None
+        return response_cache.get_key(hash or query_hash(query), operation_name, variables)
+
+    def collect_tags(self, execute_options):
+        tags = set()
+        execute_options["middleware"] = [*(execute_options["middleware"] or []), CacheTagMiddleware(tags)]
+        return tags
+
+    def cache_result(self, cache_key, result, tags, clock):
+        if cache_key and not result.errors:
+            response_cache.set(cache_key, result.data, tags, clock)
+
+    def get_execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def is_atomic_mutation(self, operation_ast):
+        return (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.MUTATION
+            and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+            )
+        )
+
+    def execute_sync(self, document, execute_options):
+        result = execute(self.schema.graphql_schema, document, **execute_options)
+        if isawaitable(result):
+            # Coroutine mutations that reach the sync path (batches, stored queries sent by hash) run on a loop of their own
+            result = async_to_sync(_await)(result)
+        return result
+
+    def execute_atomic(self, request, document, execute_options):
+        with transaction.atomic():
+            result = self.execute_sync(document, execute_options)
+            if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                transaction.set_rollback(True)
+        return result
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        try:
+            query, hash, new = resolve_query(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        prepared = self.prepare_operation(request, query, hash, operation_name, show_graphiql)
+        if not isinstance(prepared, tuple):
+            return prepared
+        document, operation_ast = prepared
+        if new:
+            register(request, query)
+
+        try:
+            cost = self.analyse_cost(document, operation_ast, variables)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        cache_key = self.get_cache_key(request.user, query, hash, operation_ast, operation_name, variables)
+        if cache_key:
+            data = response_cache.get(cache_key)
+            if data is not None:
+                return self.with_cost(ExecutionResult(data=data), cost)
+
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+            if self.is_atomic_mutation(operation_ast):
+                return self.with_cost(self.execute_atomic(request, document, execute_options), cost)
+            tags = self.collect_tags(execute_options) if cache_key else None
+            clock = response_cache.clock() if cache_key else None
+            result = self.execute_sync(document, execute_options)
+            self.cache_result(cache_key, result, tags, clock)
+            return self.with_cost(result, cost)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+class AsyncGraphQLView(GraphQLView):
+    """
+    GraphQL endpoint that runs as a coroutine under ASGI. A mutation whose root
+    fields are all coroutines (the OTP mail mutations) executes on the event
+    loop, awaiting the async ORM and the mail server without holding a worker
+    thread. Every other operation reads through graphene-django's connection
+    and filter machinery, which is built on the sync ORM, so the sync view
+    serves it whole in one hop to the worker thread.
+    """
+
+    view_is_async = True
+
+    @method_decorator(ensure_csrf_cookie)
+    async def dispatch(self, request, *args, **kwargs):
+        data = self.get_async_operation(request)
+        if data is None:
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+        try:
+            result, status_code = await self.aget_response(request, data)
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    def get_async_operation(self, request):
+        """
+        Body of a request that can execute on the event loop, None when it has
+        to go through the sync view.
+        """
+        if self.batch or request.method.lower() != "post":
+            return None
+        try:
+            data = self.parse_body(request)
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+            if not query:
+                return None
+            document, validation_errors = self.get_document(query)
+        except Exception:
+            return None
+        operation_ast = get_operation_ast(document, operation_name)
+        if validation_errors or operation_ast is None or operation_ast.operation != OperationType.MUTATION:
+            return None
+        if self.is_atomic_mutation(operation_ast):
+            # The transaction would belong to the worker thread
+            return None
+        fields = self.schema.graphql_schema.mutation_type.fields
+        for selection in operation_ast.selection_set.selections:
+            field = fields.get(selection.name.value) if isinstance(selection, FieldNode) else None
+            if field is None or not is_async_resolver(field.resolve):
+                return None
+        return data
+
+    async def aget_response(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = await self.aexecute_graphql_request(request, data, query, variables, operation_name)
+        return await sync_to_async(self.encode_result)(request, execution_result, id)
+
+    async def aexecute_graphql_request(self, request, data, query, variables, operation_name):
+        try:
+            query, hash, new = await sync_to_async(resolve_query)(request, data, query)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        prepared = self.prepare_operation(request, query, hash, operation_name)
+        if not isinstance(prepared, tuple):
+            return prepared
+        document, operation_ast = prepared
+        if new:
+            await sync_to_async(register)(request, query)
+
+        try:
+            cost = self.analyse_cost(document, operation_ast, variables)
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+            result = execute(self.schema.graphql_schema, document, **execute_options)
+            if isawaitable(result):
+                result = await result
+            return self.with_cost(result, cost)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
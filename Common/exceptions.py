@@ -17,4 +17,9 @@ class InvalidModelIdException(Exception):
 class InvalidImageException(Exception):
     def __init__(self, message = "Invalid image input"):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class OutOfStockException(Exception):
+    def __init__(self, message = "Not enough stock available"):
+        self.message = message
+        super().__init__(self.message)
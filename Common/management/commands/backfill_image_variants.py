@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from Common.models import Image
+from Common.tools import set_derived_urls
+
+
+class Command(BaseCommand):
+    help = 'Stores the blur placeholder and responsive variant URLs of images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Recompute images that already have variants')
+        parser.add_argument('--inline', action='store_true', help='Also download each blur placeholder and store it as a data URI')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['blur_url', 'variants', 'placeholder'] if options['inline'] else ['blur_url', 'variants']
+
+        images = Image.objects.filter(provider='cloudinary').exclude(url='').only('id', 'url', 'provider', *fields).order_by('pk')
+        if not options['all']:
+            missing = Q(blur_url__isnull=True) | Q(variants__isnull=True)
+            if options['inline']:
+                missing |= Q(placeholder__isnull=True)
+            images = images.filter(missing)
+
+        started = time.monotonic()
+        total = 0
+        last_pk = None
+        while True:
+            # Pages by primary key so rows updated by earlier batches are not skipped or revisited
+            batch = list((images.filter(pk__gt=last_pk) if last_pk else images)[:batch_size])
+            if not batch:
+                break
+            for image in batch:
+                set_derived_urls(image, inline=options['inline'])
+            Image.objects.bulk_update(batch, fields)
+            total += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'{total} images updated')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} images in {elapsed:.1f}s'))
@@ -11,6 +11,10 @@ class Image(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     provider = models.CharField(max_length=255, default='cloudinary')
+    # Derived from `url` when the image is stored, see Common.tools.set_derived_urls
+    blur_url = models.CharField(max_length=500, blank=True, null=True)
+    variants = models.JSONField(blank=True, null=True)
+    placeholder = models.TextField(blank=True, null=True)
 
     has_url = False
     _url = None
@@ -1,11 +1,13 @@
 import graphene
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
 from Admin.models import Banner, BannerGroup
 from Api import relay
+from Api.fields import DjangoFilterConnectionField
+from Api.loaders import related_resolver
+from Api.optimizer import optimize
 from Common.models import Image
-from Common.tools import ImageUrlBuilder
-from Common.types import BannerButtonObject
+from Common.tools import ImageUrlBuilder, fallback_blur_url, set_derived_urls
+from Common.types import BannerButtonObject, ImageVariantObject
 
 class ImageCropEnum(graphene.Enum):
     SCALE = 'scale'
@@ -14,6 +16,8 @@ class ImageCropEnum(graphene.Enum):
 class ImageObject(DjangoObjectType):
     public_id = graphene.String()
     blur_url = graphene.String()
+    variants = graphene.List(graphene.NonNull(ImageVariantObject), required=True)
+    placeholder = graphene.String()
     has_image = graphene.Boolean()
     url = graphene.String(
         width=graphene.Int(),
@@ -29,8 +33,6 @@ class ImageObject(DjangoObjectType):
         fields = ('url', 'id', 'alt', 'caption', 'provider')
 
     def resolve_url(self, info, width=None, height=None, crop=None, quality=None, format=None, **kwargs):
-        if isinstance(self, Image) and self.has_url:
-            return self._url
         return ImageUrlBuilder(self).build_url(
             width=width, height=height, crop=crop.value if crop else None, quality=quality, format=format
         )
@@ -43,12 +45,14 @@ class ImageObject(DjangoObjectType):
     
     def resolve_blur_url(self, info):
         if self.provider == 'cloudinary' and self.url:
-            return ImageUrlBuilder(self).build_url(
-                width=10, height=10, crop='fill', quality=10, format='webp', effect={'blur': 200}
-            )
-        return ImageUrlBuilder(Image(url="74f98fbe6a8ada2db6ec26feb98f994e")).build_url(
-            width=10, height=10, crop='fill', quality=10, format='webp', effect={'blur': 200}
-        )
+            return self.blur_url or set_derived_urls(self).blur_url
+        return fallback_blur_url()
+
+    def resolve_variants(self, info):
+        # Rows stored before variants existed are derived on the fly until backfilled
+        if self.variants is None:
+            set_derived_urls(self)
+        return [ImageVariantObject(**variant) for variant in self.variants or []]
     
 class BannerObject(DjangoObjectType):
     button = graphene.Field(BannerButtonObject)
@@ -69,6 +73,8 @@ class BannerObject(DjangoObjectType):
         use_connection = True
 
 class BannerGroupObject(DjangoObjectType):
+    banners = DjangoFilterConnectionField(BannerObject, required=True)
+
     class Meta:
         model = BannerGroup
         fields = '__all__'
@@ -82,8 +88,11 @@ class BannerGroupObject(DjangoObjectType):
         interfaces = (relay.Node, )
         use_connection = True
 
-    def resolve_banners(self, info):
-        return self.banners.order_by('priority')
+    def resolve_banners(self, info, **kwargs):
+        banners = related_resolver('banners')(self, info, **kwargs)
+        if isinstance(banners, list):
+            return sorted(banners, key=lambda banner: banner.priority)
+        return banners.order_by('priority')
 
 
 class Query(graphene.ObjectType):
@@ -94,14 +103,14 @@ class Query(graphene.ObjectType):
 
     def resolve_banner(self, info, id=None):
         if id:
-            return Banner.objects.get(id=id)
+            return optimize(Banner.objects.all(), info).get(id=id)
         return None
     
     def resolve_banner_group(self, info, id=None, location=None):
         if id:
-            return BannerGroup.objects.get(id=id)
+            return optimize(BannerGroup.objects.all(), info).get(id=id)
         if location:
-            return BannerGroup.objects.get(location=location)
+            return optimize(BannerGroup.objects.all(), info).get(location=location)
         return None
 
 class Mutation(graphene.ObjectType):
@@ -1,3 +1,44 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
 
-# Create your tests here.
+from Common.models import Image
+from Common.schema import ImageObject
+from Common.tools import BLUR_TRANSFORMATION, ImageUrlBuilder, cloudinary_url, set_derived_urls
+
+
+class CloudinaryUrlTests(SimpleTestCase):
+    def setUp(self):
+        cloudinary_url.cache_clear()
+
+    def test_urls_are_memoized_up_to_the_configured_size(self):
+        self.assertEqual(cloudinary_url.cache_info().maxsize, settings.IMAGE_VARIANTS['URL_CACHE_SIZE'])
+        image = Image(url='sample', provider='cloudinary')
+        first = ImageUrlBuilder(image).build_url(width=320)
+        self.assertEqual(ImageUrlBuilder(Image(url='sample', provider='cloudinary')).build_url(width=320), first)
+        self.assertEqual(cloudinary_url.cache_info().hits, 1)
+        self.assertNotEqual(ImageUrlBuilder(image).build_url(width=640), first)
+
+    def test_default_url_is_kept_on_the_image(self):
+        image = Image(url='sample', provider='cloudinary')
+        url = ImageUrlBuilder(image).build_url()
+        cloudinary_url.cache_clear()
+        self.assertEqual(ImageUrlBuilder(image).build_url(), url)
+        self.assertEqual(cloudinary_url.cache_info().misses, 0)
+        self.assertEqual(ImageUrlBuilder(Image(url='https://example.com/a.png', provider='local')).build_url(width=320), 'https://example.com/a.png')
+
+
+class DerivedUrlTests(SimpleTestCase):
+    def test_cloudinary_images_store_their_variants(self):
+        image = set_derived_urls(Image(url='sample', provider='cloudinary'))
+        self.assertEqual(image.blur_url, cloudinary_url('sample', **BLUR_TRANSFORMATION))
+        self.assertEqual([variant['width'] for variant in image.variants], settings.IMAGE_VARIANTS['WIDTHS'])
+        self.assertEqual(image.variants[0]['url'], cloudinary_url('sample', width=320))
+        local = set_derived_urls(Image(url='https://example.com/a.png', provider='local'))
+        self.assertEqual((local.blur_url, local.variants), (None, None))
+
+    def test_other_images_blur_the_configured_fallback(self):
+        image = Image(url='https://example.com/a.png', provider='local')
+        with override_settings(IMAGE_VARIANTS={'FALLBACK_PUBLIC_ID': 'fallback'}):
+            self.assertEqual(ImageObject.resolve_blur_url(image, None), cloudinary_url('fallback', **BLUR_TRANSFORMATION))
+        with override_settings(IMAGE_VARIANTS={'FALLBACK_PUBLIC_ID': None}):
+            self.assertIsNone(ImageObject.resolve_blur_url(image, None))
@@ -2,8 +2,33 @@ import cloudinary.uploader
 from Common.models import Image
 from Common.types import ImageInput
 from cloudinary import CloudinaryImage
+import base64
 import cloudinary
-from django.db import router
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from django.conf import settings
+from django.db import router, transaction
+from nanoid import generate
+
+# Deleting a remote asset does not change the response, so it runs in the
+# background once the transaction that dropped the image has committed
+_remote_deletes = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cloudinary')
+
+
+def destroy_remote_image(public_id):
+    transaction.on_commit(lambda: _remote_deletes.submit(cloudinary.uploader.destroy, public_id))
+
+
+def get_variants_config():
+    config = {
+        'WIDTHS': [320, 640, 960, 1280],
+        'INLINE_PLACEHOLDER': False,
+        'URL_CACHE_SIZE': 4096,
+        'FALLBACK_PUBLIC_ID': None,
+    }
+    config.update(getattr(settings, 'IMAGE_VARIANTS', {}))
+    return config
 
 
 class ImageHandler():
@@ -14,23 +39,27 @@ class ImageHandler():
         if not self.image_input.url or not self.image_input.provider:
             return None
         db = router.db_for_write(Image)
-        img = Image.objects.create(
+        img = Image(
             url=self.image_input.url,
             provider=self.image_input.provider,
             alt=self.image_input.alt,
             caption=self.image_input.caption
         )
+        set_derived_urls(img, inline=get_variants_config()['INLINE_PLACEHOLDER'])
         img.save(using=db)
         return img
 
     def update_image(self, image: Image) -> Image | None:
         if not self.image_input.url and not self.image_input.provider:
             return None
+        source = (image.url, image.provider)
         if self.image_input.url and image.url:
             if self.image_input.url != image.url:
-                cloudinary.uploader.destroy(image.url)
+                destroy_remote_image(image.url)
                 image.url = self.image_input.url
         image.provider = self.image_input.provider if self.image_input.provider else image.provider
+        if (image.url, image.provider) != source:
+            set_derived_urls(image, inline=get_variants_config()['INLINE_PLACEHOLDER'])
         image.alt = self.image_input.alt if self.image_input.alt else image.alt
         image.caption = self.image_input.caption if self.image_input.caption else image.caption
         image.save()
@@ -40,7 +69,7 @@ class ImageHandler():
         if not image:
             return False
         if image.provider == 'cloudinary':
-            cloudinary.uploader.destroy(image.url)
+            destroy_remote_image(image.url)
         image.delete()
         return True
     
@@ -63,20 +92,102 @@ class ImageHandler():
             return None
         
 
+def resolve_images(image_inputs) -> list[Image]:
+    """
+    Images of a list of `ImageInput`, in order. New images are inserted with
+    one bulk insert and referenced ones are loaded with one query; updates and
+    deletes still go through ImageHandler one at a time.
+    """
+    inline = get_variants_config()['INLINE_PLACEHOLDER']
+    resolved, new, referenced = [], [], []
+    for image_input in image_inputs or []:
+        if image_input is None:
+            continue
+        if image_input.action == 'create':
+            if not image_input.url or not image_input.provider:
+                continue
+            image = Image(
+                id=generate(size=40),
+                url=image_input.url,
+                provider=image_input.provider,
+                alt=image_input.alt,
+                caption=image_input.caption
+            )
+            new.append(set_derived_urls(image, inline=inline))
+            resolved.append(image)
+        elif image_input.action == 'none':
+            if image_input.id:
+                referenced.append(image_input.id)
+                resolved.append(image_input.id)
+        else:
+            resolved.append(ImageHandler(image_input).auto_image())
+    Image.objects.bulk_create(new)
+    existing = Image.objects.in_bulk(referenced) if referenced else {}
+    resolved = [existing.get(image) if isinstance(image, str) else image for image in resolved]
+    return [image for image in resolved if isinstance(image, Image)]
+
+
+@lru_cache(maxsize=get_variants_config()['URL_CACHE_SIZE'])
+def cloudinary_url(public_id, width=None, height=None, crop=None, quality=None, format=None, effect=()) -> str:
+    """Delivery URL of a Cloudinary asset, memoized per public id and transformation."""
+    transformation = [
+        {'width': width} if width else None,
+        {'height': height} if height else None,
+        {'crop': crop or 'scale'},
+        {'fetch_format': format or 'auto'},
+        {'quality': quality or 'auto'},
+        {'effect': dict(effect)} if effect else None
+    ]
+    return CloudinaryImage(public_id).build_url(transformation=transformation)
+
+
+BLUR_TRANSFORMATION = {'width': 10, 'height': 10, 'crop': 'fill', 'quality': 10, 'format': 'webp', 'effect': (('blur', 200),)}
+
+
+def set_derived_urls(image: Image, inline=False) -> Image:
+    """
+    Stores the blur placeholder and responsive variant URLs of `image` on it,
+    and with `inline` the blur placeholder itself as a data URI. Only
+    Cloudinary images have derived URLs.
+    """
+    if image.provider != 'cloudinary' or not image.url:
+        image.blur_url = image.variants = image.placeholder = None
+        return image
+    image.blur_url = cloudinary_url(image.url, **BLUR_TRANSFORMATION)
+    image.variants = [{'width': width, 'url': cloudinary_url(image.url, width=width)} for width in get_variants_config()['WIDTHS']]
+    if inline:
+        image.placeholder = fetch_data_uri(image.blur_url) or image.placeholder
+    return image
+
+
+def fallback_blur_url() -> str | None:
+    """Blur placeholder of the image shown for images that are not on Cloudinary, None without one."""
+    public_id = get_variants_config()['FALLBACK_PUBLIC_ID']
+    return cloudinary_url(public_id, **BLUR_TRANSFORMATION) if public_id else None
+
+
+def fetch_data_uri(url, timeout=5) -> str | None:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            content_type = response.headers.get_content_type()
+            data = response.read()
+    except (OSError, ValueError):
+        return None
+    return f'data:{content_type};base64,{base64.b64encode(data).decode("ascii")}'
+
+
 class ImageUrlBuilder:
     def __init__(self, image: Image):
         self.image = image
 
     def build_url(self, width=None, height=None, crop=None, quality=None, format=None, effect={}) -> str:
-        if self.image.provider == 'cloudinary':
-            transformation = [
-                {'width': width} if width else None,
-                {'height': height} if height else None,
-                {'crop': crop or 'scale'},
-                {'fetch_format': format or 'auto'},
-                {'quality': quality or 'auto'},
-                {'effect': effect} if effect else None
-            ]
-            url = CloudinaryImage(self.image.url).build_url(transformation=transformation)
-            return url
-        return self.image.url
\ No newline at end of file
+        if self.image.provider != 'cloudinary':
+            return self.image.url
+        default = not any((width, height, crop, quality, format, effect))
+        if default and self.image.has_url:
+            return self.image._url
+        url = cloudinary_url(self.image.url, width, height, crop, quality, format, tuple(sorted(effect.items())))
+        if default:
+            self.image._url = url
+            self.image.has_url = True
+        return url
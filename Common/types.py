@@ -14,6 +14,10 @@ class ImageInput(graphene.InputObjectType):
     caption  = graphene.String()
     action = ImageActionEnum(required=True)
 
+class ImageVariantObject(graphene.ObjectType):
+    width = graphene.Int(required=True)
+    url = graphene.String(required=True)
+
 class BannerButtonObject(graphene.ObjectType):
     text = graphene.String(required=True)
     href = graphene.String()
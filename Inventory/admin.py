@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Inventory, Item, Category, ItemReview, Order, OrderItem, Tag, ItemVariation
+from .models import DailySales, Inventory, Item, Category, ItemReview, Order, OrderItem, StockReservation, Tag, ItemVariation
 # Register your models here.
 
 admin.site.register(Inventory)
@@ -9,4 +9,6 @@ admin.site.register(ItemReview)
 admin.site.register(Order)
 admin.site.register(OrderItem)
 admin.site.register(Tag)
-admin.site.register(ItemVariation)
\ No newline at end of file
+admin.site.register(ItemVariation)
+admin.site.register(StockReservation)
+admin.site.register(DailySales)
@@ -0,0 +1,106 @@
+# Description: In-process snapshot of the category tree, shared by every request of a worker.
+from collections import defaultdict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from nanoid import generate
+
+from Api.cache import is_shared
+from Inventory.models import Category
+
+# Shared version of the tree, so every worker reloads after a change made by any of them
+VERSION_KEY = 'category_tree:version'
+
+
+class CategoryTree:
+    """
+    Every category row, indexed by id and by parent. Rows are kept as plain
+    values and turned into fresh Category instances on the way out, so the
+    snapshot can be shared between threads.
+    """
+
+    def __init__(self, rows):
+        self.rows = {row['id']: row for row in rows}
+        self._children = defaultdict(list)
+        for row in sorted(rows, key=lambda row: (row['priority'], row['name'])):
+            self._children[row['parent_id']].append(row['id'])
+
+    def category(self, id):
+        row = self.rows.get(id)
+        return Category(**row) if row else None
+
+    def path_of(self, id):
+        row = self.rows.get(id)
+        return row['path'] if row else None
+
+    def roots(self):
+        return [self.category(id) for id in self._children[None]]
+
+    def children(self, id):
+        return [self.category(child) for child in self._children[id]]
+
+    def ancestors(self, id):
+        """Categories from the root down to the parent of `id`."""
+        path = self.path_of(id)
+        if path is None:
+            return []
+        return [self.category(ancestor) for ancestor in path.strip('/').split('/')[:-1] if ancestor in self.rows]
+
+    def descendant_ids(self, id):
+        path = self.path_of(id)
+        if path is None:
+            return []
+        return [row['id'] for row in self.rows.values() if row['path'].startswith(path)]
+
+
+_tree = None
+_version = None
+_lock = Lock()
+
+
+def tree_version():
+    """
+    Version of the tree in the shared cache. Without a shared cache a bump
+    made by another worker never arrives, so the version is read from the
+    table instead: any save moves the last update time and any delete the
+    count.
+    """
+    if is_shared():
+        return cache.get_or_set(VERSION_KEY, generate, timeout=None)
+    stats = Category.objects.aggregate(count=Count('pk'), updated=Max('updated_at'))
+    return (stats['count'], stats['updated'])
+
+
+def get_category_tree(context=None):
+    """
+    The current tree, loaded in one query when it changed since this worker
+    last read it. Given the request as `context`, the version is checked once
+    for the whole request instead of once per node.
+    """
+    if context is not None:
+        tree = getattr(context, '_category_tree', None)
+        if tree is None:
+            tree = get_category_tree()
+            context._category_tree = tree
+        return tree
+    global _tree, _version
+    version = tree_version()
+    if _tree is None or _version != version:
+        with _lock:
+            if _tree is None or _version != version:
+                fields = [field.attname for field in Category._meta.concrete_fields]
+                _tree = CategoryTree(list(Category.objects.values(*fields)))
+                _version = version
+    return _tree
+
+
+def invalidate_category_tree(context=None):
+    if context is not None:
+        context._category_tree = None
+    def bump():
+        global _tree
+        cache.set(VERSION_KEY, generate(), timeout=None)
+        _tree = None
+    transaction.on_commit(bump)
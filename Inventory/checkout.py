@@ -0,0 +1,104 @@
+# Description: Checkout of a user's cart into an order, in one transaction with a fixed number of statements.
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from Common.exceptions import InvalidModelIdException, NotFoundException, OutOfStockException
+from Api.cache import instance_tag, response_cache
+from Inventory.models import Item, ItemVariation, Order, OrderItem
+from Inventory.stock import sell_reserved
+from User.models import Address, Cart, CartItem
+
+
+def get_config():
+    config = {
+        'CURRENCY': 'INR',
+    }
+    config.update(getattr(settings, 'CHECKOUT', {}))
+    return config
+
+
+def price_lines(lines):
+    """
+    Unit price, line total and the shipping and delivery time of the order for
+    `lines` (cart items with their item and variant loaded). Shipping is
+    charged once per item, delivery takes as long as the slowest item.
+    """
+    priced, subtotal, shipping, delivery_time, shipped = [], Decimal('0'), Decimal('0'), None, set()
+    for line in lines:
+        price = line.variant.price if line.variant_id else line.item.price
+        total = price * line.quantity
+        priced.append((line, price, total))
+        subtotal += total
+        if line.item_id not in shipped:
+            shipped.add(line.item_id)
+            shipping += line.item.shipping_cost or 0
+        if line.item.delivery_time is not None:
+            delivery_time = max(delivery_time or 0, line.item.delivery_time)
+    return priced, subtotal, shipping, delivery_time
+
+
+def place_order(user, shipping_address_id, billing_address_id=None):
+    """
+    Turns the cart of `user` into a pending order and returns it. In one
+    transaction the cart is locked and its lines read with one joined query,
+    the stock of its variations is sold out of the user's held reservations
+    first, the items sold without a variation are locked and checked to be
+    still available, the order and its items are inserted and the cart is
+    emptied, with the same statements whatever the number of lines. An item with variations
+    can only be bought as one of them. Raises NotFoundException,
+    InvalidModelIdException or OutOfStockException and changes nothing when
+    the order can not be placed.
+    """
+    billing_address_id = billing_address_id or shipping_address_id
+    addresses = set(Address.objects.filter(user=user, pk__in=[shipping_address_id, billing_address_id]).values_list('pk', flat=True))
+    if shipping_address_id not in addresses or billing_address_id not in addresses:
+        raise InvalidModelIdException(model="Address")
+
+    with transaction.atomic():
+        # A second checkout of the same cart waits here and then finds it empty
+        carts = list(Cart.objects.select_for_update().filter(user=user).values_list('pk', flat=True))
+        lines = list(CartItem.objects.filter(cart_id__in=carts).select_related('item', 'variant').order_by('pk'))
+        if not lines:
+            raise NotFoundException("Cart is empty")
+
+        for line in lines:
+            if not line.item.is_active or line.item.status != 'available':
+                raise OutOfStockException(f"{line.item.name} is not available")
+            if line.variant_id and line.variant.item_id != line.item_id:
+                raise InvalidModelIdException(model="Item Variation")
+        # Items without a variation have no stock count, only their status
+        plain = {line.item_id: line.item.name for line in lines if not line.variant_id}
+        if plain and ItemVariation.objects.filter(item_id__in=plain).exists():
+            raise InvalidModelIdException(model="Item Variation")
+
+        priced, subtotal, shipping, delivery_time = price_lines(lines)
+        if plain:
+            available = set(Item.objects.select_for_update().filter(pk__in=plain, is_active=True, status='available').values_list('pk', flat=True))
+            if len(available) < len(plain):
+                raise OutOfStockException(f"{', '.join(name for pk, name in plain.items() if pk not in available)} is not available")
+        variant_lines = [(line.variant_id, line.quantity) for line in lines if line.variant_id]
+        if variant_lines:
+            sell_reserved(variant_lines, user)
+        order = Order(
+            user=user,
+            total=subtotal + shipping,
+            shipping_cost=shipping,
+            currency=get_config()['CURRENCY'],
+            delivery_time=delivery_time,
+            shipping_address_id=shipping_address_id,
+            billing_address_id=billing_address_id,
+        )
+        order.save()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item_id=line.item_id, variant_id=line.variant_id, quantity=line.quantity, price=price, total=total)
+            for line, price, total in priced
+        ])
+        deleted = CartItem.objects.filter(pk__in=[line.pk for line in lines]).delete()[1].get(CartItem._meta.label, 0)
+        if deleted < len(lines):
+            # Lines removed by a writer that did not lock the cart were already sold or dropped
+            raise NotFoundException("Cart changed during checkout")
+        # Expires the cart summary, see User.cart
+        response_cache.invalidate(instance_tag(Cart(pk=lines[0].cart_id)))
+    return order
@@ -0,0 +1,113 @@
+# Description: Streaming export of a vendor's order lines as CSV or JSON lines, read in primary key windows.
+import csv
+import io
+import json
+
+from django.conf import settings
+
+from Inventory.models import OrderItem
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# (column, lookup) of each exported value
+COLUMNS = [
+    ('order', 'order__key'),
+    ('status', 'order__status'),
+    ('ordered_at', 'order__created_at'),
+    ('currency', 'order__currency'),
+    ('sku', 'item__sku'),
+    ('item', 'item__name'),
+    ('variation', 'variant__name'),
+    ('option', 'variant__value'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+    ('total', 'total'),
+    ('ship_to', 'order__shipping_address__name'),
+    ('address_line_1', 'order__shipping_address__address_line_1'),
+    ('address_line_2', 'order__shipping_address__address_line_2'),
+    ('city', 'order__shipping_address__city'),
+    ('state', 'order__shipping_address__state'),
+    ('zip_code', 'order__shipping_address__zip_code'),
+    ('country', 'order__shipping_address__country'),
+    ('phone', 'order__shipping_address__phone'),
+]
+
+
+def get_config():
+    config = {
+        'CHUNK_SIZE': 2000,
+    }
+    config.update(getattr(settings, 'ORDER_EXPORTS', {}))
+    return config
+
+
+def order_lines(vendor, status=None, since=None):
+    """Order lines of the items of `vendor`, optionally of one order status or placed from `since` (a datetime) on."""
+    lines = OrderItem.objects.filter(item__vendor=vendor)
+    if status:
+        lines = lines.filter(order__status=status)
+    if since:
+        lines = lines.filter(order__created_at__gte=since)
+    return lines
+
+
+def iter_rows(lines, chunk_size=None):
+    """
+    Value tuples of `lines` in `COLUMNS` order, read one page of `chunk_size`
+    lines at a time, each page starting after the last primary key of the
+    previous one. Every query returns a full page but the last, so a vendor
+    with few lines in a large table costs few queries; memory stays flat
+    however many lines there are and no backend has to hold a cursor open
+    (MySQL drivers buffer a whole result set otherwise).
+    """
+    chunk_size = chunk_size or get_config()['CHUNK_SIZE']
+    values = lines.order_by('pk').values_list('pk', *[lookup for _, lookup in COLUMNS])
+    last_pk = None
+    while True:
+        page = list((values.filter(pk__gt=last_pk) if last_pk is not None else values)[:chunk_size])
+        for row in page:
+            yield row[1:]
+        if len(page) < chunk_size:
+            return
+        last_pk = page[-1][0]
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def render(rows, format, chunk_size=None):
+    """Text blocks of `rows` written as `format`, a header first for CSV, one block per chunk of rows."""
+    chunk_size = chunk_size or get_config()['CHUNK_SIZE']
+    names = [name for name, _ in COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == 'csv':
+        writer.writerow(names)
+        yield buffer.getvalue()
+    for chunk in _chunks(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        if format == 'csv':
+            writer.writerows([[_text(value) for value in row] for row in chunk])
+        else:
+            for row in chunk:
+                buffer.write(json.dumps(dict(zip(names, row)), default=_text))
+                buffer.write('\n')
+        yield buffer.getvalue()
@@ -0,0 +1,78 @@
+# Description: Facet counts of a filtered item queryset.
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.query import QuerySet
+
+from Inventory.models import Item
+
+
+def get_price_buckets():
+    """Ascending lower bounds of the price buckets, the last one is open ended."""
+    return getattr(settings, 'ITEM_FACETS', {}).get('PRICE_BUCKETS', [0, 500, 1000, 5000, 10000])
+
+
+def price_bucket(bounds):
+    whens = [When(min_price__lt=upper, then=Value(index)) for index, upper in enumerate(bounds[1:])]
+    return Case(*whens, default=Value(len(bounds) - 1), output_field=IntegerField())
+
+
+def _sorted(counts, labels):
+    return [
+        {'value': value, 'label': labels.get(value, value), 'count': count}
+        for value, count in sorted(counts.items(), key=lambda entry: (-entry[1], str(labels.get(entry[0], entry[0]))))
+    ]
+
+
+def item_facets(items):
+    """
+    Counts per category, brand, tag, status and price bucket of `items`, a
+    filtered queryset or a list. The item columns are counted in one grouped
+    query over every (category, brand, status, bucket) combination, which is
+    then summed per facet; tags come from one grouped query on the join table.
+    """
+    if not isinstance(items, QuerySet):
+        items = Item.objects.filter(pk__in=[item.pk for item in items])
+    items = items.order_by()
+    bounds = get_price_buckets()
+
+    categories, brands, statuses, prices = defaultdict(int), defaultdict(int), defaultdict(int), defaultdict(int)
+    # Ids of categories, brands and tags come from separate tables, so each has its own labels
+    category_labels, brand_labels, tag_labels = {}, {}, {}
+    rows = (
+        items.annotate(price_bucket=price_bucket(bounds))
+        .values('category_id', 'category__name', 'brand_id', 'brand__name', 'status', 'price_bucket')
+        .annotate(count=Count('pk'))
+    )
+    for row in rows:
+        count = row['count']
+        categories[row['category_id']] += count
+        category_labels[row['category_id']] = row['category__name']
+        if row['brand_id'] is not None:
+            brands[row['brand_id']] += count
+            brand_labels[row['brand_id']] = row['brand__name']
+        statuses[row['status']] += count
+        prices[row['price_bucket']] += count
+
+    tags = defaultdict(int)
+    tag_rows = (
+        Item.tags.through.objects.filter(item__in=items.values('pk'))
+        .values('tag_id', 'tag__name')
+        .annotate(count=Count('item_id'))
+    )
+    for row in tag_rows:
+        tags[row['tag_id']] = row['count']
+        tag_labels[row['tag_id']] = row['tag__name']
+
+    status_labels = dict(Item._meta.get_field('status').choices)
+    return {
+        'categories': _sorted(categories, category_labels),
+        'brands': _sorted(brands, brand_labels),
+        'tags': _sorted(tags, tag_labels),
+        'statuses': _sorted(statuses, status_labels),
+        'prices': [
+            {'min': lower, 'max': bounds[index + 1] if index + 1 < len(bounds) else None, 'count': prices[index]}
+            for index, lower in enumerate(bounds) if prices[index]
+        ],
+    }
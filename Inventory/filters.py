@@ -0,0 +1,55 @@
+# Description: Filter sets of the inventory connections that need more than `filter_fields`.
+import django_filters
+from graphql_relay import from_global_id
+
+from Inventory.categories import get_category_tree
+from Inventory.models import Item
+
+
+def category_pk(value):
+    """Accepts a category's relay id or its primary key."""
+    try:
+        type_name, pk = from_global_id(value)
+    except Exception:
+        return value
+    return pk if type_name == 'CategoryObject' else value
+
+
+DESCRIPTION_DEPRECATED = 'Deprecated, use `searchItems`. Will be removed in the next release.'
+
+
+class ItemFilter(django_filters.FilterSet):
+    descendants_of = django_filters.CharFilter(method='filter_descendants_of')
+    # A price bound matches an item when one of its variations is within it
+    price__gt = django_filters.NumberFilter(field_name='max_price', lookup_expr='gt')
+    price__gte = django_filters.NumberFilter(field_name='max_price', lookup_expr='gte')
+    price__lt = django_filters.NumberFilter(field_name='min_price', lookup_expr='lt')
+    price__lte = django_filters.NumberFilter(field_name='min_price', lookup_expr='lte')
+    # Deprecated, they scan the description of every item; to be removed in the next release
+    description = django_filters.CharFilter(lookup_expr='exact', label=DESCRIPTION_DEPRECATED)
+    description__icontains = django_filters.CharFilter(field_name='description', lookup_expr='icontains', label=DESCRIPTION_DEPRECATED)
+    description__istartswith = django_filters.CharFilter(field_name='description', lookup_expr='istartswith', label=DESCRIPTION_DEPRECATED)
+
+    class Meta:
+        model = Item
+        fields = {
+            'name': ['exact', 'icontains', 'istartswith'],
+            'category': ['exact'],
+            'tags': ['exact'],
+            'price': ['exact'],
+            'rating_average': ['gte', 'lte'],
+            'rating_count': ['gte'],
+            'status': ['exact'],
+            'is_featured': ['exact'],
+            'vendor': ['exact'],
+            'brand': ['exact'],
+            'key': ['exact'],
+            'sku': ['exact'],
+        }
+
+    def filter_descendants_of(self, queryset, name, value):
+        # Items of the category and of every category below it
+        path = get_category_tree(self.request).path_of(category_pk(value))
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
@@ -0,0 +1,325 @@
+# Description: Streaming bulk import of vendor catalogs (items, variations, tags and images) from CSV or JSON lines.
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from nanoid import generate
+
+from Admin.models import Brand
+from Api.cache import model_tag, response_cache
+from Common.models import Image
+from Common.tools import set_derived_urls
+from Inventory.models import Category, Item, ItemVariation, Tag
+from Inventory.search import index_items
+from Inventory.tools import get_or_create_tags
+
+FORMATS = ('csv', 'jsonl')
+STATUSES = {choice for choice, label in Item._meta.get_field('status').choices}
+# Separator of list values (tags, images, bullet points) in CSV cells
+LIST_SEPARATOR = '|'
+# Row errors kept for the report, so a broken file does not grow memory
+MAX_ERRORS = 100
+# Column limits, checked per row so one long value does not fail a whole chunk
+MAX_LENGTHS = {
+    'sku': Item._meta.get_field('sku').max_length,
+    'name': Item._meta.get_field('name').max_length,
+    'teaser': Item._meta.get_field('teaser').max_length,
+    'image': Image._meta.get_field('url').max_length,
+    'images': Image._meta.get_field('url').max_length,
+    'variations.name': ItemVariation._meta.get_field('name').max_length,
+    'variations.value': ItemVariation._meta.get_field('value').max_length,
+}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def guess_format(name):
+    name = (name or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_rows(stream, format):
+    """Yields the rows of a binary or text `stream` one at a time, as dicts."""
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try: yield json.loads(line)
+            except ValueError: yield {'__error__': 'Invalid JSON'}
+
+
+def _list(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, list):
+        return [str(entry).strip() for entry in value if str(entry).strip()]
+    value = str(value).strip()
+    if value.startswith('['):
+        try: return _list(json.loads(value))
+        except ValueError: pass
+    return [entry.strip() for entry in value.split(LIST_SEPARATOR) if entry.strip()]
+
+
+def _length(value, field):
+    values = value if isinstance(value, list) else [value]
+    if any(entry and len(entry) > MAX_LENGTHS[field] for entry in values):
+        raise ImportRowError(f'`{field}` must be at most {MAX_LENGTHS[field]} characters')
+    return value
+
+
+def _decimal(value, field, required=False):
+    if value in (None, ''):
+        if required:
+            raise ImportRowError(f'`{field}` is required')
+        return None
+    try: return Decimal(str(value))
+    except InvalidOperation: raise ImportRowError(f'`{field}` must be a number')
+
+
+def _int(value, field):
+    if value in (None, ''):
+        return None
+    try: return int(value)
+    except (TypeError, ValueError): raise ImportRowError(f'`{field}` must be an integer')
+
+
+def _bool(value, default=True):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _variations(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        try: value = json.loads(value)
+        except ValueError: raise ImportRowError('`variations` must be a JSON list')
+    if not isinstance(value, list):
+        raise ImportRowError('`variations` must be a JSON list')
+    variations, seen = [], set()
+    for variation in value:
+        if not isinstance(variation, dict) or not variation.get('name') or not variation.get('value'):
+            raise ImportRowError('every variation needs a `name` and a `value`')
+        name = _length(str(variation['name']), 'variations.name')
+        value = _length(str(variation['value']), 'variations.value')
+        if (name, value) in seen:
+            raise ImportRowError(f'variation `{name}: {value}` is listed twice')
+        seen.add((name, value))
+        variations.append({
+            'name': name,
+            'value': value,
+            'price': _decimal(variation.get('price'), 'variations.price', required=True),
+            'quantity': _int(variation.get('quantity'), 'variations.quantity') or 0,
+        })
+    return variations
+
+
+def parse_row(row):
+    """Validates one catalog row and returns it normalized, raising ImportRowError."""
+    if '__error__' in row:
+        raise ImportRowError(row['__error__'])
+    for field in ('sku', 'name', 'description', 'category', 'image'):
+        if not str(row.get(field) or '').strip():
+            raise ImportRowError(f'`{field}` is required')
+    status = str(row.get('status') or 'available').strip()
+    if status not in STATUSES:
+        raise ImportRowError(f'`status` must be one of {", ".join(sorted(STATUSES))}')
+    extra_fields = row.get('extra_fields') or None
+    if isinstance(extra_fields, str):
+        try: extra_fields = json.loads(extra_fields)
+        except ValueError: raise ImportRowError('`extra_fields` must be JSON')
+    return {
+        'sku': _length(str(row['sku']).strip(), 'sku'),
+        'name': _length(str(row['name']).strip(), 'name'),
+        'teaser': _length(row.get('teaser') or None, 'teaser'),
+        'description': row['description'],
+        'bullet_points': _list(row.get('bullet_points')),
+        'status': status,
+        'price': _decimal(row.get('price'), 'price', required=True),
+        'delivery_time': _int(row.get('delivery_time'), 'delivery_time'),
+        'shipping_cost': _decimal(row.get('shipping_cost'), 'shipping_cost'),
+        'can_return': _bool(row.get('can_return')),
+        'return_time': _int(row.get('return_time'), 'return_time'),
+        'return_policy': row.get('return_policy') or None,
+        'extra_fields': extra_fields,
+        'category': str(row['category']).strip(),
+        'brand': str(row.get('brand') or '').strip() or None,
+        'tags': _list(row.get('tags')),
+        'image': _length(str(row['image']).strip(), 'image'),
+        'images': _length(_list(row.get('images')), 'images'),
+        'variations': _variations(row.get('variations')),
+    }
+
+
+class CatalogImport:
+    """
+    Imports a catalog for one vendor in chunks of `chunk_size` rows. Each
+    chunk is validated, its categories, brands, tags and existing SKUs are
+    resolved with one query each, and its images, items, variations and M2M
+    rows are written with bulk inserts inside one transaction. Rows whose SKU
+    already exists are skipped. A chunk the database refuses is rolled back
+    and its rows are reported as failed, and the import goes on with the next
+    chunk. Only the current chunk is held in memory.
+
+    Building the variant URLs of every image is most of the work of an
+    import; without `derive_urls` they are left to backfill_image_variants.
+    """
+
+    def __init__(self, vendor, chunk_size=500, image_provider='cloudinary', derive_urls=True):
+        self.vendor = vendor
+        self.chunk_size = chunk_size
+        self.image_provider = image_provider
+        self.derive_urls = derive_urls
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self.elapsed = 0.0
+        # Categories and brands are few, so they are remembered across chunks
+        self._categories = {}
+        self._brands = {}
+
+    def stats(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows / self.elapsed, 1) if self.elapsed else None,
+        }
+
+    def run(self, rows, progress=None):
+        started = time.monotonic()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk, first_row=self.rows + 1)
+            self.rows += len(chunk)
+            self.elapsed = time.monotonic() - started
+            if progress:
+                progress(self)
+        self.elapsed = time.monotonic() - started
+        response_cache.invalidate(model_tag(Item), model_tag(Tag))
+        return self.stats()
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': row_number, 'message': message})
+
+    def _lookup(self, cache, model, keys):
+        missing = {key for key in keys if key not in cache}
+        if missing:
+            for instance in model.objects.filter(Q(pk__in=missing) | Q(name__in=missing)).only('pk', 'name'):
+                cache.setdefault(instance.pk, instance.pk)
+                cache.setdefault(instance.name, instance.pk)
+        return cache
+
+    def _image(self, url):
+        image = Image(id=generate(size=40), url=url, provider=self.image_provider)
+        return set_derived_urls(image) if self.derive_urls else image
+
+    def import_chunk(self, chunk, first_row=1):
+        parsed = []
+        for number, row in enumerate(chunk, start=first_row):
+            try: parsed.append((number, parse_row(row)))
+            except ImportRowError as e: self.error(number, str(e))
+
+        categories = self._lookup(self._categories, Category, {row['category'] for _, row in parsed})
+        brands = self._lookup(self._brands, Brand, {row['brand'] for _, row in parsed if row['brand']})
+        existing = set(Item.objects.filter(sku__in=[row['sku'] for _, row in parsed]).values_list('sku', flat=True))
+
+        accepted, numbers, seen = [], [], set()
+        for number, row in parsed:
+            if row['sku'] in existing or row['sku'] in seen:
+                self.skipped += 1
+                continue
+            if row['category'] not in categories:
+                self.error(number, f"Unknown category `{row['category']}`")
+                continue
+            if row['brand'] and row['brand'] not in brands:
+                self.error(number, f"Unknown brand `{row['brand']}`")
+                continue
+            seen.add(row['sku'])
+            row['category_id'] = categories[row['category']]
+            row['brand_id'] = brands[row['brand']] if row['brand'] else None
+            accepted.append(row)
+            numbers.append(number)
+        if not accepted:
+            return
+
+        try:
+            self._write(accepted)
+        except DatabaseError as e:
+            for number in numbers:
+                self.error(number, f'Chunk not imported: {e}')
+            return
+        self.created += len(accepted)
+
+    def _write(self, accepted):
+        with transaction.atomic():
+            tags, _ = get_or_create_tags(name for row in accepted for name in row['tags'])
+            images, items = [], []
+            for row in accepted:
+                image = self._image(row['image'])
+                images.append(image)
+                row['gallery'] = [self._image(url) for url in row['images']]
+                images.extend(row['gallery'])
+                prices = [variation['price'] for variation in row['variations']] or [row['price']]
+                items.append(Item(
+                    key=generate(size=24),
+                    sku=row['sku'],
+                    name=row['name'],
+                    teaser=row['teaser'],
+                    description=row['description'],
+                    bullet_points=row['bullet_points'],
+                    image_id=image.pk,
+                    status=row['status'],
+                    price=row['price'],
+                    min_price=min(prices),
+                    max_price=max(prices),
+                    delivery_time=row['delivery_time'],
+                    shipping_cost=row['shipping_cost'],
+                    can_return=row['can_return'],
+                    return_time=row['return_time'],
+                    return_policy=row['return_policy'],
+                    category_id=row['category_id'],
+                    vendor=self.vendor,
+                    brand_id=row['brand_id'],
+                    extra_fields=row['extra_fields'],
+                ))
+            Image.objects.bulk_create(images, batch_size=1000)
+            Item.objects.bulk_create(items, batch_size=1000)
+            # Auto increment ids are not returned by every backend
+            pks = dict(Item.objects.filter(key__in=[item.key for item in items]).values_list('key', 'pk'))
+
+            item_tags, item_images, variations = [], [], []
+            for item, row in zip(items, accepted):
+                item_id = pks[item.key]
+                item_tags.extend(Item.tags.through(item_id=item_id, tag_id=tags[name].pk) for name in dict.fromkeys(row['tags']))
+                item_images.extend(Item.images.through(item_id=item_id, image_id=image.pk) for image in row['gallery'])
+                variations.extend(ItemVariation(id=generate(size=28), item_id=item_id, **variation) for variation in row['variations'])
+            Item.tags.through.objects.bulk_create(item_tags, batch_size=1000)
+            Item.images.through.objects.bulk_create(item_images, batch_size=1000, ignore_conflicts=True)
+            ItemVariation.objects.bulk_create(variations, batch_size=1000)
+            index_items(pks.values())
@@ -0,0 +1,100 @@
+# Description: Low stock and restock lookups over inventories, and the periodic scan flagging the ones newly low.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from Api.cache import instance_tag, model_tag, response_cache
+from Inventory.models import Inventory, Item
+
+
+def get_config():
+    config = {
+        'RESTOCK_WITHIN_DAYS': 7,
+        'BATCH_SIZE': 1000,
+    }
+    config.update(getattr(settings, 'LOW_STOCK', {}))
+    return config
+
+
+def threshold():
+    """Low stock threshold of an inventory: its item's when set, its vendor's otherwise."""
+    return Coalesce(F('item__low_stock_threshold'), F('item__vendor__low_stock_threshold'))
+
+
+def low_stock(vendor=None):
+    """
+    Inventories at or below their threshold, of the items of `vendor` when
+    given. The threshold is fixed per item, so each item's inventories are
+    one range of the (item, quantity) index.
+    """
+    inventories = Inventory.objects.filter(quantity__lte=threshold())
+    if vendor is not None:
+        inventories = inventories.filter(item__vendor=vendor)
+    return inventories.order_by('quantity', 'pk')
+
+
+def due_for_restock(vendor=None, within_days=None):
+    """Inventories restocking in the next `within_days` days or overdue, soonest first."""
+    if within_days is None:
+        within_days = get_config()['RESTOCK_WITHIN_DAYS']
+    inventories = Inventory.objects.filter(restock_date__lte=timezone.now() + timedelta(days=within_days))
+    if vendor is not None:
+        inventories = inventories.filter(item__vendor=vendor)
+    return inventories.order_by('restock_date', 'pk')
+
+
+def _mark_out_of_stock(batch_size, now):
+    # Available items with an empty flagged inventory and no stock left in any other
+    emptied = (
+        Item.objects.filter(status='available', inventory__low_stock_at__isnull=False, inventory__quantity__lte=0)
+        .exclude(inventory__quantity__gt=0)
+        .order_by('pk').values_list('pk', flat=True).distinct()
+    )
+    marked = 0
+    while True:
+        batch = list(emptied[:batch_size])
+        if not batch:
+            return marked
+        Item.objects.filter(pk__in=batch).update(status='out_of_stock', updated_at=now)
+        # Lists showing the items expire with them
+        response_cache.invalidate(*[instance_tag(Item(pk=pk)) for pk in batch])
+        marked += len(batch)
+
+
+def scan_low_stock(batch_size=None, now=None):
+    """
+    Compares every inventory with its threshold against what the previous
+    scan found: the ones newly at or below it get `low_stock_at` set, the
+    ones back above it get it cleared, a batch per UPDATE. Available items
+    with no stock left in any inventory are then marked out of stock, in
+    bulk as well. Returns `{'crossed', 'recovered', 'out_of_stock'}`
+    counts.
+    """
+    batch_size = batch_size or get_config()['BATCH_SIZE']
+    now = now or timezone.now()
+    counts = {'crossed': 0, 'recovered': 0, 'out_of_stock': 0}
+    crossed = Inventory.objects.filter(low_stock_at__isnull=True, quantity__lte=threshold())
+    recovered = Inventory.objects.filter(low_stock_at__isnull=False, quantity__gt=threshold())
+
+    while True:
+        batch = list(crossed.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        Inventory.objects.filter(pk__in=batch).update(low_stock_at=now)
+        counts['crossed'] += len(batch)
+
+    while True:
+        batch = list(recovered.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        Inventory.objects.filter(pk__in=batch).update(low_stock_at=None)
+        counts['recovered'] += len(batch)
+
+    # Every empty inventory is flagged by now, as no threshold is below zero
+    counts['out_of_stock'] = _mark_out_of_stock(batch_size, now)
+    if counts['crossed'] or counts['recovered']:
+        response_cache.invalidate(model_tag(Inventory))
+    return counts
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from Inventory.checkout import place_order
+from Inventory.models import ItemVariation
+from User.models import Address, Cart, CartItem
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Places orders of 1, 20 and 100 lines (or --lines) for a user and reports the checkout latency '
+        'and statement count. Every run is rolled back, so no stock, order or cart is changed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('address', help='Id of an address of the user placing the orders')
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 20, 100])
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try: address = Address.objects.select_related('user').get(pk=options['address'])
+        except Address.DoesNotExist: raise CommandError(f"Address {options['address']} not found")
+        user = address.user
+        variants = list(
+            ItemVariation.objects.filter(quantity__gte=options['runs'], item__is_active=True, item__status='available')
+            .values_list('pk', 'item_id')[:max(options['lines'])]
+        )
+        if len(variants) < max(options['lines']):
+            raise CommandError(f"Only {len(variants)} variations have stock for {options['runs']} runs")
+
+        for size in options['lines']:
+            timings, statements = [], set()
+            for _ in range(options['runs']):
+                with transaction.atomic():
+                    cart, _ = Cart.objects.get_or_create(user=user)
+                    CartItem.objects.filter(cart=cart).delete()
+                    CartItem.objects.bulk_create([
+                        CartItem(cart=cart, item_id=item_id, variant_id=variant_id, quantity=1) for variant_id, item_id in variants[:size]
+                    ])
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        place_order(user, address.pk)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    statements.add(len(queries.captured_queries))
+                    transaction.set_rollback(True)
+            self.stdout.write(
+                f"{size} lines: p50 {percentile(timings, 0.5):.1f}ms, p99 {percentile(timings, 0.99):.1f}ms, "
+                f"{', '.join(map(str, sorted(statements)))} statements"
+            )
@@ -0,0 +1,75 @@
+import math
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from nanoid import generate
+
+from Inventory import exports
+from Inventory.models import Item, Order, OrderItem
+from User.models import Address
+from Vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports the order lines of a vendor with 1k, 10k and 100k synthetic lines added (or --lines) and reports '
+        'the throughput and peak memory of each export. Every run is rolled back, so no order is left behind.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', required=True, help='Key of the vendor whose lines are exported')
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--chunk-size', type=int)
+
+    def seed(self, items, address, count):
+        orders = [
+            Order(key=generate(size=40), user_id=address.user_id, total=0, currency='INR', shipping_address=address, billing_address=address)
+            for _ in range(math.ceil(count / len(items)))
+        ]
+        Order.objects.bulk_create(orders, batch_size=1000)
+        pks = Order.objects.filter(key__in=[order.key for order in orders]).values_list('pk', flat=True)
+        lines = (OrderItem(order_id=order_id, item_id=item_id, quantity=1, price=1, total=1) for order_id in pks for item_id in items)
+        OrderItem.objects.bulk_create([line for line, _ in zip(lines, range(count))], batch_size=1000)
+
+    def export(self, vendor, format, chunk_size):
+        rows, size = [0], 0
+
+        def counted(values):
+            for row in values:
+                rows[0] += 1
+                yield row
+
+        for block in exports.render(counted(exports.iter_rows(exports.order_lines(vendor), chunk_size)), format, chunk_size):
+            size += len(block)
+        return rows[0], size
+
+    def handle(self, *args, **options):
+        try: vendor = Vendor.objects.get(key=options['vendor'])
+        except Vendor.DoesNotExist: raise CommandError(f"Vendor {options['vendor']} not found")
+        items = list(Item.objects.filter(vendor=vendor).values_list('pk', flat=True))
+        address = Address.objects.order_by('pk').first()
+        if not items or address is None:
+            raise CommandError('The vendor needs an item and some user an address to seed order lines')
+
+        for count in options['lines']:
+            with transaction.atomic():
+                self.seed(items, address, count)
+                if connection.vendor == 'sqlite':
+                    # SQLite only plans with statistics it was told to gather
+                    connection.cursor().execute('ANALYZE')
+                started = time.perf_counter()
+                rows, size = self.export(vendor, options['format'], options['chunk_size'])
+                elapsed = time.perf_counter() - started
+                # Memory is traced in a second run, tracing slows the export down
+                tracemalloc.start()
+                self.export(vendor, options['format'], options['chunk_size'])
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{count} lines added: {rows} rows, {size / 1e6:.1f}MB in {elapsed:.2f}s '
+                f'({rows / elapsed:.0f} rows/s), peak memory {peak / 1e6:.1f}MB'
+            )
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+
+from Common.exceptions import OutOfStockException
+from Inventory.models import ItemVariation, StockReservation
+from Inventory.stock import reserve
+
+
+class Command(BaseCommand):
+    help = (
+        'Reserves one unit at a time of a single variation from many parallel workers until it sells out, '
+        'then reports reservations/sec and checks nothing was oversold. The variation is restored afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('variant', help='Id of the variation to reserve')
+        parser.add_argument('--stock', type=int, default=1000, help='Units to sell during the run')
+        parser.add_argument('--workers', type=int, default=16)
+
+    def handle(self, *args, **options):
+        try: variant = ItemVariation.objects.get(pk=options['variant'])
+        except ItemVariation.DoesNotExist: raise CommandError(f"Variation {options['variant']} not found")
+        original, stock = variant.quantity, options['stock']
+        ItemVariation.objects.filter(pk=variant.pk).update(quantity=stock)
+
+        counts = {'reserved': 0, 'rejected': 0, 'retried': 0}
+        reservations = []
+        lock = threading.Lock()
+
+        def work():
+            reserved, rejected, retried, ids = 0, 0, 0, []
+            try:
+                while True:
+                    try:
+                        reservation, = reserve([(variant.pk, 1)])
+                        ids.append(reservation.pk)
+                        reserved += 1
+                    except OutOfStockException:
+                        rejected += 1
+                        break
+                    except OperationalError:
+                        # Backends without row locks (SQLite) report write contention instead of waiting
+                        retried += 1
+            finally:
+                connection.close()
+            with lock:
+                counts['reserved'] += reserved
+                counts['rejected'] += rejected
+                counts['retried'] += retried
+                reservations.extend(ids)
+
+        close_old_connections()
+        workers = [threading.Thread(target=work) for _ in range(options['workers'])]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+
+        remaining = ItemVariation.objects.get(pk=variant.pk).quantity
+        StockReservation.objects.filter(pk__in=reservations).delete()
+        ItemVariation.objects.filter(pk=variant.pk).update(quantity=original)
+
+        self.stdout.write(
+            f"{counts['reserved']} reservations by {options['workers']} workers in {elapsed:.2f}s "
+            f"({counts['reserved'] / elapsed:.0f} reservations/s), {counts['retried']} retried after contention"
+        )
+        if counts['reserved'] + remaining != stock or remaining < 0:
+            raise CommandError(f"Stock mismatch: {counts['reserved']} reserved and {remaining} left of {stock}")
+        self.stdout.write(self.style.SUCCESS(f'No oversell: {counts["reserved"]} reserved, {remaining} left of {stock}'))
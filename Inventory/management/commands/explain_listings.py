@@ -0,0 +1,125 @@
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import to_global_id
+
+from Api.schema import schema
+from Inventory.models import Item, Order
+
+# How a full table scan, a walk of a whole index and a sort outside of an index show in each backend's plan
+PROBLEMS = {
+    'mysql': {
+        'full scan': re.compile(r'"access_type":\s*"ALL"'),
+        'full index scan': re.compile(r'"access_type":\s*"index"'),
+        'filesort': re.compile(r'"using_filesort":\s*true'),
+    },
+    'sqlite': {
+        'full scan': re.compile(r'\bSCAN \w+\b(?! USING)'),
+        'full index scan': re.compile(r'\bSCAN \w+ USING'),
+        'filesort': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    },
+    'postgresql': {
+        'full scan': re.compile(r'Seq Scan'),
+        'filesort': re.compile(r'(?<!Incremental )Sort\b'),
+    },
+}
+
+# Statement prefix asking each backend for the plan, the last column of its rows holds the plan text
+EXPLAIN = {
+    'mysql': 'EXPLAIN FORMAT=JSON ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+PAGE = '{ edges { node { id } } }'
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the common item and order listings through the GraphQL schema, explains the page queries they '
+        'issue and reports those doing a full scan or a filesort'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan')
+
+    def listings(self):
+        """`(name, query, variables, filtered)` of each listing, filled in with the values of a real item and order."""
+        item = Item.objects.order_by('pk').first()
+        order = Order.objects.order_by('pk').first()
+        if item is None or order is None:
+            raise CommandError('Listings are explained on real values, create an item and an order first')
+        # Filtered listings must seek into an index; top-N ones may walk one since they stop at the limit
+        listings = [
+            (
+                'items in a category by price',
+                f'query($category: ID, $status: InventoryItemStatusChoices) {{ items(category: $category, status: $status, orderBy: PRICE, first: 20) {PAGE} }}',
+                {'category': to_global_id('CategoryObject', item.category_id), 'status': item.status.upper()},
+                True,
+            ),
+            (
+                'items of a vendor, newest first',
+                f'query($vendor: ID) {{ items(vendor: $vendor, orderBy: CREATED_AT_DESC, first: 20) {PAGE} }}',
+                {'vendor': to_global_id('VendorObject', item.vendor_id)},
+                True,
+            ),
+            (
+                'featured items, newest first',
+                f'{{ items(isFeatured: true, orderBy: CREATED_AT_DESC, first: 20) {PAGE} }}',
+                {},
+                True,
+            ),
+            (
+                'orders of a user by status, newest first',
+                f'query($user: ID, $status: InventoryOrderStatusChoices) {{ orders(user: $user, status: $status, orderBy: CREATED_AT_DESC, first: 20) {PAGE} }}',
+                {'user': to_global_id('UserObject', order.user_id), 'status': order.status.upper()},
+                True,
+            ),
+        ]
+        for ordering in ('CREATED_AT', 'PRICE', 'NAME', 'RATING', 'REVIEWS'):
+            query = f'query($orderBy: ItemOrderingEnum) {{ items(orderBy: $orderBy, first: 20) {PAGE} }}'
+            listings.append((f'items by {ordering.lower()}', query, {'orderBy': f'{ordering}_DESC'}, False))
+        for ordering in ('CREATED_AT', 'TOTAL'):
+            query = f'query($orderBy: OrderOrderingEnum) {{ orders(orderBy: $orderBy, first: 20) {PAGE} }}'
+            listings.append((f'orders by {ordering.lower()}', query, {'orderBy': f'{ordering}_DESC'}, False))
+        return listings
+
+    def page_queries(self, query, variables):
+        """SQL of the sorted queries the API runs for `query`, i.e. the page, not its count."""
+        request = RequestFactory().post('/api/v1/')
+        request.user = AnonymousUser()
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(query, variables=variables, context_value=request)
+        if result.errors:
+            raise CommandError(f'{query} failed: {result.errors[0]}')
+        return [captured['sql'] for captured in context.captured_queries if 'ORDER BY' in captured['sql']]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(EXPLAIN[connection.vendor] + sql)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def handle(self, *args, **options):
+        problems = PROBLEMS.get(connection.vendor)
+        if problems is None:
+            raise CommandError(f'Plans of {connection.vendor} are not understood')
+
+        failing = 0
+        for name, query, variables, filtered in self.listings():
+            plans = [self.explain(sql) for sql in self.page_queries(query, variables)]
+            found = sorted({
+                problem for plan in plans for problem, pattern in problems.items()
+                if pattern.search(plan) and (filtered or problem != 'full index scan')
+            })
+            failing += bool(found)
+            status = self.style.ERROR(', '.join(found)) if found else self.style.SUCCESS('index')
+            self.stdout.write(f'{name}: {status}')
+            if options['verbose_plans'] or found:
+                for plan in plans:
+                    self.stdout.write(f'    {plan}'.replace('\n', '\n    '))
+        if failing:
+            raise CommandError(f'{failing} listings are not served by an index')
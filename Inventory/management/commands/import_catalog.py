@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Inventory.importer import FORMATS, CatalogImport, guess_format, read_rows
+from Vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    help = 'Imports items, variations, tags and images of a vendor from a CSV or JSON lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--vendor', required=True, help='Key of the vendor owning the items')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--skip-image-variants', action='store_true',
+            help='Leave the image variant URLs to a later backfill_image_variants run',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            vendor = Vendor.objects.get(key=options['vendor'])
+        except Vendor.DoesNotExist:
+            raise CommandError(f"Vendor {options['vendor']} not found")
+        format = options['format'] or guess_format(options['path'])
+
+        def progress(run):
+            self.stdout.write(f'{run.rows} rows read, {run.created} items created ({run.rows / run.elapsed:.0f} rows/s)')
+
+        run = CatalogImport(vendor, chunk_size=options['chunk_size'], derive_urls=not options['skip_image_variants'])
+        with open(options['path'], 'rb') as stream:
+            stats = run.run(read_rows(stream, format), progress=progress)
+
+        for error in run.errors:
+            self.stderr.write(f"Row {error['row']}: {error['message']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} of {stats['rows']} rows in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']} rows/s), {stats['skipped']} existing skipped, {stats['failed']} failed"
+        ))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Inventory.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the rating aggregates of items and variations from their reviews, fixing any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        items, variations = rebuild_ratings(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Fixed {items} items and {variations} variations in {elapsed:.1f}s'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Inventory.models import Item
+from Inventory.search import index_items
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search postings of every item'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        pks = Item.objects.order_by('pk').values_list('pk', flat=True)
+
+        total = postings = 0
+        last_pk = None
+        while True:
+            batch = list((pks.filter(pk__gt=last_pk) if last_pk else pks)[:batch_size])
+            if not batch:
+                break
+            postings += index_items(batch)
+            total += len(batch)
+            last_pk = batch[-1]
+            self.stdout.write(f'{total} items indexed')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} items ({postings} postings) in {elapsed:.1f}s'))
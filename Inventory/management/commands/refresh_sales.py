@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Inventory.sales import refresh_sales
+
+
+class Command(BaseCommand):
+    help = 'Rolls up the daily sales of the days with orders placed or changed since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Roll up every day again')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        days, rows = refresh_sales(rebuild=options['rebuild'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {days} days into {rows} rows in {elapsed:.1f}s'))
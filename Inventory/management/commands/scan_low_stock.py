@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Inventory.low_stock import scan_low_stock
+
+
+class Command(BaseCommand):
+    help = (
+        'Flags the inventories newly at or below their low stock threshold since the last scan, clears the ones '
+        'restocked and marks the items left without stock out of stock'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = scan_low_stock(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['crossed']} inventories newly low, {counts['recovered']} restocked, "
+            f"{counts['out_of_stock']} items out of stock in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Inventory.stock import sweep_expired
+
+
+class Command(BaseCommand):
+    help = 'Expires held stock reservations past their expiry and gives their stock back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        expired = sweep_expired(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} reservations in {elapsed:.1f}s'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Admin', '0003_page'),
+        ('Common', '0001_initial'),
+        ('Inventory', '0003_alter_item_can_return_alter_item_delivery_time_and_more'),
+        ('User', '0003_cart_cartitem_cart__items_wishlist'),
+        ('Vendor', '0002_alter_vendor_options_alter_vendor_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['created_at', 'id'], name='item_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['price', 'id'], name='item_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemreview',
+            index=models.Index(fields=['created_at', 'id'], name='item_review_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemreview',
+            index=models.Index(fields=['rating', 'id'], name='item_review_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['total', 'id'], name='order_total_id_idx'),
+        ),
+    ]
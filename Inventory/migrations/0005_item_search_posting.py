@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventory', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='Inventory.item')),
+            ],
+            options={
+                'verbose_name': 'Item Search Posting',
+                'verbose_name_plural': 'Item Search Postings',
+                'db_table': 'item_search_posting',
+                'unique_together': {('term', 'item')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    Category = apps.get_model('Inventory', 'Category')
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def path_of(id):
+        if id not in paths:
+            parent = parents[id]
+            paths[id] = (path_of(parent) if parent else '/') + id + '/'
+        return paths[id]
+
+    categories = list(Category.objects.only('id'))
+    for category in categories:
+        category.path = path_of(category.id)
+        category.depth = category.path.count('/') - 2
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventory', '0005_item_search_posting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=700),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
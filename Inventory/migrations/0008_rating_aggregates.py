@@ -0,0 +1,121 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:29
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_ratings(apps, schema_editor):
+    ItemReview = apps.get_model('Inventory', 'ItemReview')
+    for model_name, key in (('Item', 'item_id'), ('ItemVariation', 'variant_id')):
+        model = apps.get_model('Inventory', model_name)
+        rows = ItemReview.objects.exclude(**{key: None}).order_by().values(key).annotate(
+            rating_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in range(1, 6)},
+        )
+        for row in rows:
+            pk = row.pop(key)
+            row['rating_average'] = round(row['rating_sum'] / row['rating_count'], 2)
+            model.objects.filter(pk=pk).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Admin', '0003_page'),
+        ('Common', '0002_image_variants'),
+        ('Inventory', '0007_stock_reservation'),
+        ('Vendor', '0002_alter_vendor_options_alter_vendor_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_average',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_average',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='itemvariation',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['rating_average', 'id'], name='item_rating_average_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['rating_count', 'id'], name='item_rating_count_id_idx'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Admin', '0003_page'),
+        ('Common', '0002_image_variants'),
+        ('Inventory', '0008_rating_aggregates'),
+        ('User', '0004_cartitem_variant'),
+        ('Vendor', '0002_alter_vendor_options_alter_vendor_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'status', 'is_active', 'price'], name='item_category_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['vendor', 'created_at'], name='item_vendor_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['is_featured', 'created_at'], name='item_featured_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='order_user_status_created_idx'),
+        ),
+    ]
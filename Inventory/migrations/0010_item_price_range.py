@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:35
+
+from django.db import migrations, models
+from django.db.models import F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_price_ranges(apps, schema_editor):
+    Item = apps.get_model('Inventory', 'Item')
+    ItemVariation = apps.get_model('Inventory', 'ItemVariation')
+    variations = ItemVariation.objects.filter(item=OuterRef('pk')).order_by().values('item')
+    Item.objects.update(
+        min_price=Coalesce(Subquery(variations.annotate(lowest=Min('price')).values('lowest')), F('price')),
+        max_price=Coalesce(Subquery(variations.annotate(highest=Max('price')).values('highest')), F('price')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Admin', '0003_page'),
+        ('Common', '0002_image_variants'),
+        ('Inventory', '0009_listing_indexes'),
+        ('Vendor', '0002_alter_vendor_options_alter_vendor_table'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_price_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_category_listing_idx',
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='max_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='min_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(fill_price_ranges, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['min_price', 'id'], name='item_min_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['max_price'], name='item_max_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'status', 'is_active', 'min_price'], name='item_category_listing_idx'),
+        ),
+    ]
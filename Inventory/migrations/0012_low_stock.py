@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventory', '0011_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='low_stock_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['item', 'quantity'], name='inventory_item_quantity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['item', 'restock_date'], name='inventory_item_restock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['low_stock_at'], name='inventory_low_stock_at_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Admin', '0003_page'),
+        ('Common', '0002_image_variants'),
+        ('Inventory', '0012_low_stock'),
+        ('Vendor', '0003_vendor_low_stock_threshold'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_category_listing_idx',
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'status', 'min_price', 'id'], name='item_category_price_idx'),
+        ),
+    ]
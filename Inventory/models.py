@@ -1,14 +1,33 @@
 from django.db import models
+from django.db.models import F, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 from nanoid import generate
 
 # Create your models here.
 
+class RatingAggregates(models.Model):
+    """Review rating aggregates, kept up to date by Inventory.ratings as reviews change."""
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # Number of reviews of each star rating
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
 class Inventory(models.Model):
     id = models.CharField(max_length=100, unique=True, editable=False, primary_key=True)
     item = models.ForeignKey('Item', on_delete=models.CASCADE)
     variant = models.ForeignKey('ItemVariation', on_delete=models.CASCADE)
     quantity = models.IntegerField()
     restock_date = models.DateTimeField(null=True, blank=True)
+    # When the last low stock scan found it at or below its threshold, None while above
+    low_stock_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
@@ -24,8 +43,14 @@ class Inventory(models.Model):
         verbose_name = 'Inventory'
         verbose_name_plural = 'Inventories'
         unique_together = ['item', 'variant']
+        # Low stock and restock lookups seek into the inventories of each item of a vendor
+        indexes = [
+            models.Index(fields=['item', 'quantity'], name='inventory_item_quantity_idx'),
+            models.Index(fields=['item', 'restock_date'], name='inventory_item_restock_idx'),
+            models.Index(fields=['low_stock_at'], name='inventory_low_stock_at_idx'),
+        ]
 
-class Item(models.Model):
+class Item(RatingAggregates):
     key = models.CharField(max_length=100, unique=True, editable=False)
     sku = models.CharField(max_length=100, unique=True)
     name = models.CharField(max_length=250)
@@ -43,6 +68,9 @@ class Item(models.Model):
     ], default='available')
 
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Lowest and highest price of the variations, the item's own price without any
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     delivery_time = models.IntegerField(null=True, blank=True)
     shipping_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     can_return = models.BooleanField(default=True, null=True, blank=True)
@@ -57,13 +85,30 @@ class Item(models.Model):
     updated_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # Overrides the vendor's low stock threshold when set
+    low_stock_threshold = models.PositiveIntegerField(null=True, blank=True)
     
     extra_fields = models.JSONField(null=True, blank=True)
 
     def save(self, *args, **kwargs):
-        if not self.pk:
+        created = not self.pk
+        if created:
             self.key = generate(size=24)
+            # A new item has no variations yet
+            self.min_price = self.max_price = self.price
         super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if not created and (update_fields is None or 'price' in update_fields):
+            Item.update_price_ranges([self.pk])
+
+    @classmethod
+    def update_price_ranges(cls, item_ids):
+        """Recomputes the price range of `item_ids` from their variations in one UPDATE."""
+        variations = ItemVariation.objects.filter(item=OuterRef('pk')).order_by().values('item')
+        cls.objects.filter(pk__in=item_ids).update(
+            min_price=Coalesce(Subquery(variations.annotate(lowest=Min('price')).values('lowest')), F('price')),
+            max_price=Coalesce(Subquery(variations.annotate(highest=Max('price')).values('highest')), F('price')),
+        )
     
     def __str__(self):
         return self.name
@@ -72,9 +117,37 @@ class Item(models.Model):
         db_table = 'item'
         verbose_name = 'Item'
         verbose_name_plural = 'Items'
+        # (sort key, pk) pairs back the keyset connections
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='item_created_at_id_idx'),
+            models.Index(fields=['min_price', 'id'], name='item_min_price_id_idx'),
+            models.Index(fields=['max_price'], name='item_max_price_idx'),
+            models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+            models.Index(fields=['rating_average', 'id'], name='item_rating_average_id_idx'),
+            models.Index(fields=['rating_count', 'id'], name='item_rating_count_id_idx'),
+            # Listing predicates as ItemFilter writes them, then the ORDER BY of the listing
+            models.Index(fields=['category', 'status', 'min_price', 'id'], name='item_category_price_idx'),
+            models.Index(fields=['vendor', 'created_at'], name='item_vendor_created_at_idx'),
+            models.Index(fields=['is_featured', 'created_at'], name='item_featured_created_at_idx'),
+        ]
     
 
-class ItemVariation(models.Model):
+class ItemSearchPosting(models.Model):
+    term = models.CharField(max_length=64)
+    item = models.ForeignKey('Item', on_delete=models.CASCADE, related_name='search_postings')
+    weight = models.FloatField()
+
+    def __str__(self):
+        return self.term
+
+    class Meta:
+        db_table = 'item_search_posting'
+        verbose_name = 'Item Search Posting'
+        verbose_name_plural = 'Item Search Postings'
+        unique_together = ['term', 'item']
+
+
+class ItemVariation(RatingAggregates):
     id = models.CharField(max_length=100, unique=True, editable=False, primary_key=True)
     item = models.ForeignKey('Item', on_delete=models.CASCADE, related_name='variations')
     name = models.CharField(max_length=100)
@@ -88,6 +161,12 @@ class ItemVariation(models.Model):
         if not self.pk:
             self.id = generate(size=28)
         super().save(*args, **kwargs)
+        Item.update_price_ranges([self.item_id])
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Item.update_price_ranges([self.item_id])
+        return result
 
     def __str__(self):
         return self.name
@@ -104,6 +183,9 @@ class Category(models.Model):
     description = models.TextField()
     image = models.ForeignKey('Common.Image', on_delete=models.CASCADE)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True)
+    # Materialized path of ids from the root, "/<root id>/.../<own id>/"
+    path = models.CharField(max_length=700, editable=False, default='', db_index=True)
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     priority = models.IntegerField(default=0)
@@ -111,7 +193,18 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.pk:
             self.id = generate(size=28)
+        old_path, old_depth = self.path, self.depth
+        self.path = (self.parent.path if self.parent_id else '/') + self.id + '/'
+        if old_path and self.path != old_path and self.path.startswith(old_path):
+            raise ValueError('A category can not be moved under one of its descendants')
+        self.depth = self.path.count('/') - 2
         super().save(*args, **kwargs)
+        if old_path and self.path != old_path:
+            # Moving a category moves its whole subtree
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (self.depth - old_depth),
+            )
 
     def __str__(self):
         return self.name
@@ -165,6 +258,10 @@ class ItemReview(models.Model):
         verbose_name = 'Item Review'
         verbose_name_plural = 'Item Reviews'
         unique_together = ['item', 'user']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='item_review_created_at_id_idx'),
+            models.Index(fields=['rating', 'id'], name='item_review_rating_id_idx'),
+        ]
     
 
 class Order(models.Model):
@@ -198,6 +295,13 @@ class Order(models.Model):
         db_table = 'order'
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='order_created_at_id_idx'),
+            models.Index(fields=['total', 'id'], name='order_total_id_idx'),
+            models.Index(fields=['user', 'status', 'created_at'], name='order_user_status_created_idx'),
+            # Sales rollups pick up the orders changed since their watermark
+            models.Index(fields=['updated_at'], name='order_updated_at_idx'),
+        ]
     
 
 class OrderItem(models.Model):
@@ -217,4 +321,87 @@ class OrderItem(models.Model):
         db_table = 'order_item'
         verbose_name = 'Order Item'
         verbose_name_plural = 'Order Items'
-        unique_together = ['order', 'item', 'variant']
\ No newline at end of file
+        unique_together = ['order', 'item', 'variant']
+
+class StockReservation(models.Model):
+    id = models.CharField(max_length=100, unique=True, editable=False, primary_key=True)
+    variant = models.ForeignKey('ItemVariation', on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey('User.User', on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=[
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ], default='held')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        if not self.pk:
+            self.id = generate(size=28)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f'{self.quantity} x {self.variant_id} ({self.status})'
+
+    class Meta:
+        db_table = 'stock_reservation'
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        # The sweep looks up held reservations past their expiry
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='stock_reservation_expiry_idx'),
+        ]
+
+
+class DailySales(models.Model):
+    """
+    Sales of one day, rolled up by Inventory.sales from the order lines of
+    the orders placed that day. Each row totals one `dimension`: a whole
+    vendor, one of its categories, one item or one variation of an item.
+    """
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=[
+        ('vendor', 'Vendor'),
+        ('category', 'Category'),
+        ('item', 'Item'),
+        ('variation', 'Variation'),
+    ])
+    vendor = models.ForeignKey('Vendor.Vendor', on_delete=models.CASCADE)
+    category = models.ForeignKey('Category', on_delete=models.CASCADE, null=True, blank=True)
+    item = models.ForeignKey('Item', on_delete=models.CASCADE, null=True, blank=True)
+    variant = models.ForeignKey('ItemVariation', on_delete=models.CASCADE, null=True, blank=True)
+    units = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Order shipping shared between the lines in proportion to their totals
+    shipping = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.dimension} sales of {self.date}'
+
+    class Meta:
+        db_table = 'daily_sales'
+        verbose_name = 'Daily Sales'
+        verbose_name_plural = 'Daily Sales'
+        indexes = [
+            models.Index(fields=['vendor', 'dimension', 'date'], name='daily_sales_vendor_idx'),
+            models.Index(fields=['date'], name='daily_sales_date_idx'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup has read its source rows, by their update time."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} at {self.value}'
+
+    class Meta:
+        db_table = 'rollup_watermark'
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
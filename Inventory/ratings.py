@@ -0,0 +1,110 @@
+# Description: Incremental maintenance and rebuild of the review rating aggregates of items and variations.
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from Api.cache import instance_tag, model_tag, response_cache
+from Inventory.models import Item, ItemReview, ItemVariation
+
+RATINGS = range(1, 6)
+AGGREGATE_FIELDS = ['rating_average', 'rating_count', 'rating_sum', *[f'rating_{rating}' for rating in RATINGS]]
+
+
+def rating_changes(added=None, removed=None):
+    """
+    UPDATE assignments applying a review rated `added` and dropping one rated
+    `removed` (either may be None). The average comes first and is computed
+    from the old sum and count, since MySQL evaluates later assignments
+    against the values set by earlier ones.
+    """
+    count = (added is not None) - (removed is not None)
+    total = (added or 0) - (removed or 0)
+    new_count = F('rating_count') + count
+    changes = {
+        'rating_average': Case(
+            When(Q(rating_count__lte=-count), then=Value(0.0)),
+            default=Cast(F('rating_sum') + total, FloatField()) / new_count,
+            output_field=FloatField(),
+        ),
+        'rating_count': new_count,
+        'rating_sum': F('rating_sum') + total,
+    }
+    for rating, delta in ((added, 1), (removed, -1)):
+        if rating is not None:
+            field = f'rating_{rating}'
+            changes[field] = changes.get(field, F(field)) + delta
+    return changes
+
+
+def apply_rating(item_id, variant_id=None, added=None, removed=None):
+    """Updates the aggregates of an item and its variation for one review change, one UPDATE each."""
+    if added == removed:
+        return
+    changes = rating_changes(added, removed)
+    Item.objects.filter(pk=item_id).update(**changes)
+    if variant_id:
+        ItemVariation.objects.filter(pk=variant_id).update(**changes)
+    # Lists showing the item expire with it, the ones it moves into by rating within the cache TIMEOUT
+    response_cache.invalidate(instance_tag(Item(pk=item_id)))
+
+
+def review_changed(review=None, old=None):
+    """
+    Applies a created (no `old`), updated or deleted (no `review`) review to
+    the aggregates, `old` being its `(item id, variant id, rating)` before.
+    """
+    if old is not None and (review is None or old[:2] != (review.item_id, review.variant_id)):
+        apply_rating(old[0], old[1], removed=old[2])
+        old = None
+    if review is not None:
+        apply_rating(review.item_id, review.variant_id, added=review.rating, removed=old[2] if old else None)
+
+
+def aggregate_ratings(reviews, key):
+    """`{key value: {field: value}}` of the aggregates of `reviews`, grouped by `key`, in one query."""
+    rows = reviews.order_by().values(key).annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in RATINGS},
+    )
+    aggregates = {}
+    for row in rows:
+        pk = row.pop(key)
+        row['rating_average'] = (Decimal(row['rating_sum']) / row['rating_count']).quantize(Decimal('0.01'))
+        aggregates[pk] = row
+    return aggregates
+
+
+def _rebuild(model, key, batch_size):
+    empty = {field: 0 for field in AGGREGATE_FIELDS}
+    pks = model.objects.order_by('pk').values_list('pk', flat=True)
+    fixed = 0
+    last_pk = None
+    while True:
+        batch = list((pks.filter(pk__gt=last_pk) if last_pk is not None else pks)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1]
+        aggregates = aggregate_ratings(ItemReview.objects.filter(**{f'{key}__in': batch}), key)
+        rows = list(model.objects.filter(pk__in=batch).only('pk', *AGGREGATE_FIELDS))
+        drifted = []
+        for row in rows:
+            expected = aggregates.get(row.pk, empty)
+            if any(getattr(row, field) != expected[field] for field in AGGREGATE_FIELDS):
+                for field in AGGREGATE_FIELDS:
+                    setattr(row, field, expected[field])
+                drifted.append(row)
+        with transaction.atomic():
+            model.objects.bulk_update(drifted, AGGREGATE_FIELDS)
+        fixed += len(drifted)
+
+
+def rebuild_ratings(batch_size=500):
+    """Recomputes every item and variation aggregate from the reviews, returning `(items, variations)` fixed."""
+    items = _rebuild(Item, 'item_id', batch_size)
+    variations = _rebuild(ItemVariation, 'variant_id', batch_size)
+    if items:
+        response_cache.invalidate(model_tag(Item))
+    return items, variations
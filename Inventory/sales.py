@@ -0,0 +1,139 @@
+# Description: Daily sales rollups per vendor, category, item and variation, refreshed from the orders changed since a watermark.
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, TruncDate, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from Inventory.models import DailySales, Order, OrderItem, RollupWatermark
+
+WATERMARK = 'daily_sales'
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+ZEROS = {'gross': Decimal('0'), 'shipping': Decimal('0')}
+
+# Order line fields each dimension is grouped by, as (line lookup, rollup field)
+DIMENSIONS = {
+    'vendor': [('item__vendor', 'vendor_id')],
+    'category': [('item__vendor', 'vendor_id'), ('item__category', 'category_id')],
+    'item': [('item__vendor', 'vendor_id'), ('item__category', 'category_id'), ('item', 'item_id')],
+    'variation': [('item__vendor', 'vendor_id'), ('item__category', 'category_id'), ('item', 'item_id'), ('variant', 'variant_id')],
+}
+
+GRANULARITIES = {
+    'day': F('date'),
+    'week': TruncWeek('date'),
+    'month': TruncMonth('date'),
+    'year': TruncYear('date'),
+}
+
+
+def get_config():
+    config = {
+        # Seconds an order may still be committing with an earlier update time
+        'LAG': 300,
+        'DAYS_PER_BATCH': 31,
+        'EXCLUDED_STATUSES': ['cancelled'],
+    }
+    config.update(getattr(settings, 'SALES_ROLLUPS', {}))
+    return config
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return Q(order__created_at__gte=start, order__created_at__lt=start + timedelta(days=1))
+
+
+def _lines(days):
+    """Order lines of the orders placed on `days`, each day an index range on the order creation time."""
+    placed = Q()
+    for day in days:
+        placed |= _day_range(day)
+    return OrderItem.objects.filter(placed).exclude(order__status__in=get_config()['EXCLUDED_STATUSES'])
+
+
+def _totals():
+    line_total = Coalesce(F('total'), F('price') * F('quantity'), output_field=MONEY)
+    shipping = Coalesce(F('order__shipping_cost'), Value(Decimal('0')), output_field=MONEY)
+    subtotal = NullIf(F('order__total') - shipping, Value(Decimal('0')), output_field=MONEY)
+    return {
+        'units': Sum('quantity'),
+        'gross': Sum(line_total),
+        # In floating point, as SQLite stores whole decimals as integers and would divide them as such
+        'shipping': Coalesce(Sum(Cast(line_total * shipping, FloatField()) / subtotal, output_field=FloatField()), Value(0.0)),
+        'orders': Count('order', distinct=True),
+    }
+
+
+def rollup_days(days):
+    """Replaces the rollups of `days` with ones computed from their order lines, one grouped query per dimension."""
+    days = sorted(set(days))
+    if not days:
+        return 0
+    lines = _lines(days)
+    rows = []
+    for dimension, keys in DIMENSIONS.items():
+        grouped = lines.filter(variant__isnull=False) if dimension == 'variation' else lines
+        grouped = grouped.annotate(day=TruncDate('order__created_at')).order_by().values('day', *[lookup for lookup, _ in keys])
+        for row in grouped.annotate(**_totals()):
+            rows.append(DailySales(
+                date=row['day'],
+                dimension=dimension,
+                units=row['units'] or 0,
+                gross=row['gross'] or 0,
+                shipping=Decimal(row['shipping']).quantize(Decimal('0.01')),
+                orders=row['orders'],
+                **{field: row[lookup] for lookup, field in keys},
+            ))
+    DailySales.objects.filter(date__in=days).delete()
+    DailySales.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_sales(rebuild=False, now=None):
+    """
+    Rolls up again every day with an order changed since the watermark, then
+    moves the watermark up to `now` less the configured lag, and returns
+    `(days, rows)` written. With `rebuild`, as on the first refresh, every day
+    with an order is rolled up. The watermark row is locked for the run, so
+    refreshes never overlap.
+    """
+    config = get_config()
+    upper = (now or timezone.now()) - timedelta(seconds=config['LAG'])
+    with transaction.atomic():
+        watermark, created = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK, defaults={'value': upper})
+        orders = Order.objects.filter(updated_at__lte=upper)
+        # The first refresh rolls up every day
+        if rebuild or created:
+            DailySales.objects.all().delete()
+        else:
+            orders = orders.filter(updated_at__gt=watermark.value)
+        days = sorted(set(orders.annotate(day=TruncDate('created_at')).order_by().values_list('day', flat=True)))
+        rows = 0
+        for index in range(0, len(days), config['DAYS_PER_BATCH']):
+            rows += rollup_days(days[index:index + config['DAYS_PER_BATCH']])
+        watermark.value = upper
+        watermark.save(update_fields=['value', 'updated_at'])
+    return len(days), rows
+
+
+def sales_report(vendor, start, end, granularity='day', item=None, category=None):
+    """
+    Sales of `vendor` from `start` to `end` (dates, both included) per
+    `granularity` period, of one item or category when given, read from the
+    rollups only. Returns the periods in order and the totals.
+    """
+    rollups = DailySales.objects.filter(vendor=vendor, date__gte=start, date__lte=end)
+    if item is not None:
+        rollups = rollups.filter(dimension='item', item=item)
+    elif category is not None:
+        rollups = rollups.filter(dimension='category', category=category)
+    else:
+        rollups = rollups.filter(dimension='vendor')
+    sums = {field: Sum(field) for field in ('units', 'gross', 'shipping', 'orders')}
+    periods = list(rollups.annotate(period=GRANULARITIES[granularity]).order_by().values('period').annotate(**sums).order_by('period'))
+    # Money totals stay decimals when there is no period to add up
+    totals = {field: sum((period[field] for period in periods), ZEROS.get(field, 0)) for field in sums}
+    return {'periods': periods, **totals}
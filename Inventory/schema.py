@@ -1,50 +1,114 @@
-from time import timezone
 import graphene
-from graphene_django.filter import DjangoFilterConnectionField
+from django.db import transaction
+from django.utils import timezone
+from graphene.relay.connection import PageInfo
+from graphene_django.settings import graphene_settings
 from graphene_django.types import DjangoObjectType
+from graphql import GraphQLError
+from graphql_relay import cursor_to_offset, offset_to_cursor
 
 from Admin.models import Brand
 from Api import relay
-from Common.exceptions import InvalidImageException, InvalidModelIdException, UnAuthorizedException
+from Api.cache import instance_tag, model_tag, response_cache
+from Api.fields import DjangoFilterConnectionField, KeysetConnectionField
+from Api.loaders import get_loaders, related_resolver
+from Api.optimizer import optimize
+from Common.exceptions import InvalidImageException, InvalidModelIdException, NotFoundException, OutOfStockException, UnAuthorizedException
 from Common.models import Image
-from Common.tools import ImageHandler
-from Inventory.models import Item, Category, Order, OrderItem, Inventory, ItemVariation, ItemReview, Tag
-from Inventory.types import CategoryInput, CategoryUpdateInput, ItemExtraFieldObject, NewItemInput, UpdateItemInput
+from Common.tools import ImageHandler, resolve_images
+from Inventory.models import Item, Category, Order, OrderItem, Inventory, ItemVariation, ItemReview, StockReservation, Tag
+from Inventory.types import CategoryInput, CategoryUpdateInput, ItemExtraFieldObject, ItemFacetsObject, ItemOrderingEnum, ItemReviewOrderingEnum, NewItemInput, OrderOrderingEnum, RatingObject, SalesGranularityEnum, SalesReportObject, UpdateItemInput
+from Inventory.categories import get_category_tree, invalidate_category_tree
+from Inventory.checkout import place_order
+from Inventory.facets import item_facets
+from Inventory.filters import ItemFilter, category_pk
+from Inventory.low_stock import due_for_restock, low_stock
+from Inventory.ratings import AGGREGATE_FIELDS, RATINGS, review_changed
+from Inventory.sales import sales_report
+from Inventory.search import index_item, index_items, search, search_count
+from Inventory.stock import release, reserve
+from Inventory.tools import add_item_relations, get_or_create_tags, item_dependencies, tag_dependencies
+from User.viewer import get_viewer_items
 from Vendor.models import Vendor
 
+class ItemConnection(graphene.relay.Connection):
+    facets = graphene.Field(ItemFacetsObject)
+
+    class Meta:
+        abstract = True
+
+    def resolve_facets(self, info):
+        # Counted over the filtered rows, before pagination
+        iterable = getattr(self, 'iterable', None)
+        if iterable is None:
+            return None
+        return item_facets(iterable)
+
+
+def resolve_rating(root, info):
+    return RatingObject(
+        average=root.rating_average,
+        count=root.rating_count,
+        histogram=[getattr(root, f'rating_{rating}') for rating in RATINGS],
+    )
+
+
 class ItemObject(DjangoObjectType):
     bullet_points = graphene.List(graphene.String)
     extra_fields = graphene.List(ItemExtraFieldObject)
+    tags = DjangoFilterConnectionField('Inventory.schema.TagObject', required=True)
+    rating = graphene.Field(RatingObject, required=True)
+    in_wishlist = graphene.Boolean(required=True)
+    in_cart = graphene.Boolean(required=True)
+    cart_quantity = graphene.Int(required=True)
 
     class Meta:
         model = Item
-        exclude = ('created_at', 'updated_at')
-        filter_fields = {
-            'name': ['exact', 'icontains', 'istartswith'],
-            'description': ['exact', 'icontains', 'istartswith'],
-            'category': ['exact'],
-            'tags': ['exact'],
-            'price': ['exact', 'gt', 'gte', 'lt', 'lte'],
-            'status': ['exact'],
-            'vendor': ['exact'],
-            'brand': ['exact'],
-            'key': ['exact'],
-            'sku': ['exact'],
-        }
+        exclude = ('created_at', 'updated_at', *AGGREGATE_FIELDS)
+        filterset_class = ItemFilter
         interfaces= (relay.Node, )
         use_connection = True
+        connection_class = ItemConnection
+
+    resolve_image = related_resolver('image')
+    resolve_images = related_resolver('images')
+    resolve_tags = related_resolver('tags')
+    resolve_category = related_resolver('category')
+    resolve_variations = related_resolver('variations')
+    resolve_rating = resolve_rating
+
+    def resolve_in_wishlist(self, info):
+        return get_viewer_items(info).in_wishlist(self)
+
+    def resolve_in_cart(self, info):
+        return get_viewer_items(info).cart_quantity(self) > 0
+
+    def resolve_cart_quantity(self, info):
+        return get_viewer_items(info).cart_quantity(self)
 
 
 class CategoryObject(DjangoObjectType):
+    ancestors = graphene.List(graphene.NonNull('Inventory.schema.CategoryObject'), required=True)
+    children = graphene.List(graphene.NonNull('Inventory.schema.CategoryObject'), required=True)
+
     class Meta:
         model = Category
-        exclude = ('created_at', 'updated_at')
+        exclude = ('created_at', 'updated_at', 'path')
         filter_fields = {
             'name': ['exact', 'icontains', 'istartswith'],
         }
         interfaces= (relay.Node, )
         use_connection = True
 
+    resolve_image = related_resolver('image')
+    resolve_parent = related_resolver('parent')
+
+    def resolve_ancestors(self, info):
+        return get_category_tree(info.context).ancestors(self.pk)
+
+    def resolve_children(self, info):
+        return get_category_tree(info.context).children(self.pk)
+
 
 class OrderObject(DjangoObjectType):
     class Meta:
@@ -58,6 +122,10 @@ class OrderObject(DjangoObjectType):
         interfaces= (relay.Node, )
         use_connection = True
 
+    resolve_user = related_resolver('user')
+    resolve_shipping_address = related_resolver('shipping_address')
+    resolve_billing_address = related_resolver('billing_address')
+
 class OrderItemObject(DjangoObjectType):
     class Meta:
         model = OrderItem
@@ -70,6 +138,10 @@ class OrderItemObject(DjangoObjectType):
         interfaces= (relay.Node, )
         use_connection = True
 
+    resolve_order = related_resolver('order')
+    resolve_item = related_resolver('item')
+    resolve_variant = related_resolver('variant')
+
 class InventoryObject(DjangoObjectType):
     class Meta:
         model = Inventory
@@ -81,13 +153,21 @@ class InventoryObject(DjangoObjectType):
         interfaces= (relay.Node, )
         use_connection = True
 
+    resolve_item = related_resolver('item')
+    resolve_variant = related_resolver('variant')
+
 class ItemVariationObject(DjangoObjectType):
+    rating = graphene.Field(RatingObject, required=True)
+
     class Meta:
         model = ItemVariation
-        fields = '__all__'
+        exclude = AGGREGATE_FIELDS
         # interfaces= (relay.Node, )
         # use_connection = True
 
+    resolve_item = related_resolver('item')
+    resolve_rating = resolve_rating
+
 class ItemReviewObject(DjangoObjectType):
     
     class Meta:
@@ -102,6 +182,10 @@ class ItemReviewObject(DjangoObjectType):
         interfaces= (relay.Node, )
         use_connection = True 
 
+    resolve_item = related_resolver('item')
+    resolve_variant = related_resolver('variant')
+    resolve_user = related_resolver('user')
+
 class TagObject(DjangoObjectType):
     class Meta:
         model = Tag
@@ -112,6 +196,13 @@ class TagObject(DjangoObjectType):
         interfaces= (relay.Node, )
         use_connection = True
 
+class StockReservationObject(DjangoObjectType):
+    class Meta:
+        model = StockReservation
+        exclude = ('user', 'updated_at')
+
+    resolve_variant = related_resolver('variant')
+
 '''********** Mutations **********'''
 
 class CreateItem(graphene.Mutation):
@@ -122,7 +213,8 @@ class CreateItem(graphene.Mutation):
     success = graphene.Boolean()
     message = graphene.String()
 
-    def mutate(self, info, input: NewItemInput):
+    @classmethod
+    def mutate(cls, root, info, input: NewItemInput):
         if not info.context.user.is_authenticated:
             raise UnAuthorizedException()
         elif not info.context.user.type.lower() == 'vendor':
@@ -141,6 +233,12 @@ class CreateItem(graphene.Mutation):
 
         if not vendor or not category: raise InvalidModelIdException(model="Vendor or Category")
 
+        with transaction.atomic():
+            item = cls.create_item(input, vendor, category, brand)
+        return CreateItem(item=item, success=True, message="Item created successfully")
+
+    @staticmethod
+    def create_item(input, vendor, category, brand):
         image = ImageHandler(input.image).auto_image()
 
         if not image or not isinstance(image, Image): raise InvalidImageException()
@@ -162,22 +260,16 @@ class CreateItem(graphene.Mutation):
             category=category,
             vendor=vendor,
             brand=brand,
+            low_stock_threshold=max(input.low_stock_threshold, 0) if input.low_stock_threshold is not None else None,
             extra_fields=input.extra_fields
         )
 
-        if input.tags:
-            for tag in input.tags:
-                tag, new = Tag.objects.get_or_create(name=tag)
-                item.tags.add(tag)
-
-        if input.images:
-            for image in input.images:
-                image = ImageHandler(image).auto_image()
-                if image and isinstance(image, Image):
-                    item.images.add(image)
-
         item.save()
-        return CreateItem(item=item, success=True, message="Item created successfully")
+        tags, created = get_or_create_tags(input.tags)
+        add_item_relations(item.pk, tags=tags.values(), images=resolve_images(input.images))
+        index_item(item)
+        response_cache.invalidate(model_tag(Item), *tag_dependencies(tags, created))
+        return item
 
 class UpdateItem(graphene.Mutation):
 
@@ -198,39 +290,42 @@ class UpdateItem(graphene.Mutation):
         try: item = Item.objects.get(key=key)
         except Item.DoesNotExist: raise InvalidModelIdException(model="Item")
         try: 
-            if input.sku: item.sku = input.sku
-            if input.name: item.name = input.name
-            if input.teaser: item.teaser = input.teaser
-            if input.description: item.description = input.description
-            if input.bullet_points: item.bullet_points = input.bullet_points
-            if input.image:
-                item.image = ImageHandler(input.image).auto_image()
-            if input.price: item.price = input.price
-            if input.category:
-                try: item.category = Category.objects.get(id=input.category)
-                except Category.DoesNotExist: raise InvalidModelIdException(model="Category")
-            if input.vendor:
-                pass
-            if input.brand:
-                try: item.brand = Brand.objects.get(id=input.brand)
-                except Brand.DoesNotExist: raise InvalidModelIdException(model="Brand")
-            if input.status: item.status = input.status
-            if input.delivery_time: item.delivery_time = input.delivery_time
-            if input.shipping_cost: item.shipping_cost = input.shipping_cost
-            if type(input.can_return) == bool: item.can_return = input.can_return
-            if input.return_time: item.return_time = input.return_time
-            if input.return_policy: item.return_policy = input.return_policy
-            if input.extra_fields: item.extra_fields = input.extra_fields
-            if input.tags:
-                for tag in input.tags:
-                    tag, new = Tag.objects.get_or_create(name=tag)
-                    item.tags.add(tag)
-            if input.images:
-                for image in input.images:
-                    image = ImageHandler(image).auto_image()
-                    if image and isinstance(image, Image):
-                        item.images.add(image)
-            item.save()
+            with transaction.atomic():
+                changes = {}
+                if input.sku: changes['sku'] = input.sku
+                if input.name: changes['name'] = input.name
+                if input.teaser: changes['teaser'] = input.teaser
+                if input.description: changes['description'] = input.description
+                if input.bullet_points: changes['bullet_points'] = input.bullet_points
+                if input.image:
+                    changes['image'] = ImageHandler(input.image).auto_image()
+                if input.price: changes['price'] = input.price
+                if input.category:
+                    try: changes['category'] = Category.objects.get(id=input.category)
+                    except Category.DoesNotExist: raise InvalidModelIdException(model="Category")
+                if input.vendor:
+                    pass
+                if input.brand:
+                    try: changes['brand'] = Brand.objects.get(id=input.brand)
+                    except Brand.DoesNotExist: raise InvalidModelIdException(model="Brand")
+                if input.status: changes['status'] = input.status
+                if input.delivery_time: changes['delivery_time'] = input.delivery_time
+                if input.shipping_cost: changes['shipping_cost'] = input.shipping_cost
+                if type(input.can_return) == bool: changes['can_return'] = input.can_return
+                if input.return_time: changes['return_time'] = input.return_time
+                if input.return_policy: changes['return_policy'] = input.return_policy
+                if input.low_stock_threshold is not None: changes['low_stock_threshold'] = max(input.low_stock_threshold, 0)
+                if input.extra_fields: changes['extra_fields'] = input.extra_fields
+                if changes:
+                    for field, value in changes.items():
+                        setattr(item, field, value)
+                    # Only the edited columns, the rating and price range ones are kept by concurrent UPDATEs
+                    item.updated_at = timezone.now()
+                    item.save(update_fields=[*changes, 'updated_at'])
+                tags, created = get_or_create_tags(input.tags)
+                add_item_relations(item.pk, tags=tags.values(), images=resolve_images(input.images))
+                index_item(item)
+                response_cache.invalidate(*item_dependencies(item, changes, tags), *tag_dependencies(tags, created))
             return UpdateItem(item=item, success=True, message="Item updated successfully")
         except Exception as e:
             return UpdateItem(item=None, success=False, message="An error occurred while updating item")
@@ -251,6 +346,7 @@ class DeleteItem(graphene.Mutation):
         try: item = Item.objects.get(key=key)
         except Item.DoesNotExist: raise InvalidModelIdException(model="Item")
         
+        response_cache.invalidate(instance_tag(item), model_tag(Item))
         item.delete()
         return DeleteItem(success=True, message="Item deleted successfully")
     
@@ -283,6 +379,8 @@ class CreateCategory(graphene.Mutation):
                 priority=input.priority
             )
             category.save()
+            invalidate_category_tree(info.context)
+            response_cache.invalidate(model_tag(Category))
             return CreateCategory(category=category, success=True, message="Category created successfully")
         except:
             return CreateCategory(category=None, success=False, message="An error occurred while creating category")
@@ -311,11 +409,20 @@ class UpdateCategory(graphene.Mutation):
                 image = ImageHandler(input.image).auto_image()
                 if not image or not isinstance(image, Image): raise InvalidImageException()
                 category.image = image
+            moved = False
             if input.parent:
-                try: category.parent = Category.objects.get(id=input.parent)
+                try: parent = Category.objects.get(id=input.parent)
                 except Category.DoesNotExist: raise InvalidModelIdException(model="Parent Category")
+                moved = parent.pk != category.parent_id
+                category.parent = parent
             if input.priority: category.priority = input.priority
             category.save()
+            invalidate_category_tree(info.context)
+            if moved:
+                # The new parent's children and the items below it were cached without the category
+                response_cache.invalidate(instance_tag(category), model_tag(Category), model_tag(Item))
+            else:
+                response_cache.invalidate(instance_tag(category))
             return UpdateCategory(category=category, success=True, message="Category updated successfully")
         except:
             return UpdateCategory(category=None, success=False, message="An error occurred while updating category")
@@ -335,7 +442,10 @@ class DeleteCategory(graphene.Mutation):
         try: category = Category.objects.get(id=id)
         except Category.DoesNotExist: raise InvalidModelIdException(model="Category")
         
+        # Child categories and their items are deleted with it
+        response_cache.invalidate(instance_tag(category), model_tag(Category), model_tag(Item))
         category.delete()
+        invalidate_category_tree(info.context)
         return DeleteCategory(success=True, message="Category deleted successfully")
 
 
@@ -354,6 +464,7 @@ class CreateTag(graphene.Mutation):
 
         try:
             tag, new = Tag.objects.get_or_create(name=name)
+            if new: response_cache.invalidate(model_tag(Tag))
             return CreateTag(tag=tag, success=True, message="Tag created successfully")
         except:
             return CreateTag(tag=None, success=False, message="An error occurred while creating tag")
@@ -378,6 +489,8 @@ class UpdateTag(graphene.Mutation):
         try:
             tag.name = name
             tag.save()
+            index_items(tag.item_tags.values_list('pk', flat=True))
+            response_cache.invalidate(instance_tag(tag))
             return UpdateTag(tag=tag, success=True, message="Tag updated successfully")
         except:
             return UpdateTag(tag=None, success=False, message="An error occurred while updating tag")
@@ -397,7 +510,10 @@ class DeleteTag(graphene.Mutation):
         try: tag = Tag.objects.get(id=id)
         except Tag.DoesNotExist: raise InvalidModelIdException(model="Tag")
         
+        response_cache.invalidate(instance_tag(tag), model_tag(Tag))
+        items = list(tag.item_tags.values_list('pk', flat=True))
         tag.delete()
+        index_items(items)
         return DeleteTag(success=True, message="Tag deleted successfully")
     
 
@@ -422,18 +538,23 @@ class CreateItemReview(graphene.Mutation):
 
         _variant = None
         if variant:
-            try: _variant = ItemVariation.objects.get(id=variant)
+            try: _variant = ItemVariation.objects.get(id=variant, item=item)
             except ItemVariation.DoesNotExist: raise InvalidModelIdException(model="Item Variation")
+
+        if rating not in RATINGS:
+            return CreateItemReview(review=None, success=False, message="Rating must be between 1 and 5")
         
         try:
-            review = ItemReview(
-                item=item,
-                user=user,
-                rating=rating,
-                review=review,
-                variant=_variant
-            )
-            review.save()
+            with transaction.atomic():
+                review = ItemReview(
+                    item=item,
+                    user=user,
+                    rating=rating,
+                    review=review,
+                    variant=_variant
+                )
+                review.save()
+                review_changed(review)
             return CreateItemReview(review=review, success=True, message="Review created successfully")
         except:
             return CreateItemReview(review=None, success=False, message="An error occurred while creating review")
@@ -454,14 +575,21 @@ class UpdateItemReview(graphene.Mutation):
         if not user.is_authenticated:
             raise UnAuthorizedException()
 
+        if rating is not None and rating not in RATINGS:
+            return UpdateItemReview(review=None, success=False, message="Rating must be between 1 and 5")
+
+        text = review
         try: review = ItemReview.objects.get(id=id)
         except ItemReview.DoesNotExist: raise InvalidModelIdException(model="Item Review")
         
         try:
-            if rating: review.rating = rating
-            if review: review.review = review
-            review.updated_at = timezone.now()
-            review.save()
+            with transaction.atomic():
+                old = (review.item_id, review.variant_id, review.rating)
+                if rating: review.rating = rating
+                if text: review.review = text
+                review.updated_at = timezone.now()
+                review.save()
+                review_changed(review, old)
             return UpdateItemReview(review=review, success=True, message="Review updated successfully")
         except:
             return UpdateItemReview(review=None, success=False, message="An error occurred while updating review")
@@ -481,23 +609,114 @@ class DeleteItemReview(graphene.Mutation):
         try: review = ItemReview.objects.get(id=id)
         except ItemReview.DoesNotExist: raise InvalidModelIdException(model="Item Review")
         
-        review.delete()
+        with transaction.atomic():
+            old = (review.item_id, review.variant_id, review.rating)
+            review.delete()
+            review_changed(None, old)
         return DeleteItemReview(success=True, message="Review deleted successfully")
     
 
+class ReserveStock(graphene.Mutation):
+    class Arguments:
+        variant = graphene.String(required=True)
+        quantity = graphene.Int(required=True)
+
+    reservation = graphene.Field(StockReservationObject)
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    def mutate(self, info, variant, quantity):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise UnAuthorizedException()
+        if quantity <= 0:
+            return ReserveStock(reservation=None, success=False, message="Quantity must be positive")
+
+        try: reservation, = reserve([(variant, quantity)], user=user)
+        except OutOfStockException as e: return ReserveStock(reservation=None, success=False, message=e.message)
+        return ReserveStock(reservation=reservation, success=True, message="Stock reserved successfully")
+
+class ReleaseStockReservation(graphene.Mutation):
+    class Arguments:
+        id = graphene.String(required=True)
+
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    def mutate(self, info, id):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise UnAuthorizedException()
+
+        if not StockReservation.objects.filter(id=id, user=user).exists():
+            raise InvalidModelIdException(model="Stock Reservation")
+        if not release([id]):
+            return ReleaseStockReservation(success=False, message="Reservation is no longer held")
+        return ReleaseStockReservation(success=True, message="Reservation released successfully")
+
+
+class PlaceOrder(graphene.Mutation):
+    class Arguments:
+        shipping_address = graphene.String(required=True)
+        billing_address = graphene.String()
+
+    order = graphene.Field(OrderObject)
+    success = graphene.Boolean()
+    message = graphene.String()
+
+    def mutate(self, info, shipping_address, billing_address=None):
+        user = info.context.user
+        if not user.is_authenticated:
+            raise UnAuthorizedException()
+
+        try: order = place_order(user, shipping_address, billing_address)
+        except (NotFoundException, OutOfStockException) as e: return PlaceOrder(order=None, success=False, message=e.message)
+        return PlaceOrder(order=order, success=True, message="Order placed successfully")
+
+
 '''********** Query **********'''
 
+def viewed_vendor(info, key):
+    """The vendor with `key`, when the signed in user is that vendor or an admin."""
+    user = info.context.user
+    if not user.is_authenticated:
+        raise UnAuthorizedException()
+    try: vendor = Vendor.objects.get(key=key)
+    except Vendor.DoesNotExist: raise InvalidModelIdException(model="Vendor")
+    if vendor.user_id != user.pk and not user.is_admin:
+        raise UnAuthorizedException()
+    return vendor
+
 class Query(graphene.ObjectType):
-    items = DjangoFilterConnectionField(ItemObject)
+    items = DjangoFilterConnectionField(ItemObject, ordering=ItemOrderingEnum)
     categories = DjangoFilterConnectionField(CategoryObject)
-    orders = DjangoFilterConnectionField(OrderObject)
+    orders = DjangoFilterConnectionField(OrderObject, ordering=OrderOrderingEnum)
     order_items = DjangoFilterConnectionField(OrderItemObject)
     inventories = DjangoFilterConnectionField(InventoryObject)
+    low_stock = DjangoFilterConnectionField(InventoryObject, vendor=graphene.String(required=True))
+    due_for_restock = DjangoFilterConnectionField(InventoryObject, vendor=graphene.String(required=True), within_days=graphene.Int())
     item_reviews = DjangoFilterConnectionField(ItemReviewObject)
     tags = DjangoFilterConnectionField(TagObject)
 
+    search_items = graphene.relay.ConnectionField(ItemObject._meta.connection, query=graphene.String(required=True))
+
+    keyset_items = KeysetConnectionField(ItemObject, ordering=ItemOrderingEnum)
+    keyset_orders = KeysetConnectionField(OrderObject, ordering=OrderOrderingEnum)
+    keyset_item_reviews = KeysetConnectionField(ItemReviewObject, ordering=ItemReviewOrderingEnum)
+
     item = graphene.Field(ItemObject, key=graphene.String())
     category = relay.Node.Field(CategoryObject)
+    category_tree = graphene.List(graphene.NonNull(CategoryObject), required=True, root=graphene.ID())
+    sales_report = graphene.Field(
+        SalesReportObject,
+        required=True,
+        vendor=graphene.String(required=True),
+        from_=graphene.Date(required=True, name='from'),
+        to=graphene.Date(required=True),
+        granularity=SalesGranularityEnum(default_value=SalesGranularityEnum.DAY.value),
+        item=graphene.String(),
+        category=graphene.ID(),
+    )
     order = relay.Node.Field(OrderObject)
     order_item = relay.Node.Field(OrderItemObject)
     inventory = relay.Node.Field(InventoryObject)
@@ -505,9 +724,71 @@ class Query(graphene.ObjectType):
     tag = relay.Node.Field(TagObject)
 
     def resolve_item(self, info, key):
-        try: return Item.objects.get(key=key)
+        try: return optimize(Item.objects.all(), info).get(key=key)
         except Item.DoesNotExist: return None
 
+    def resolve_category_tree(self, info, root=None):
+        """Top level categories, or the children of `root`; select `children` recursively for the tree."""
+        tree = get_category_tree(info.context)
+        if root:
+            return tree.children(category_pk(root))
+        return tree.roots()
+
+    def resolve_low_stock(self, info, vendor, **kwargs):
+        """Inventories of a vendor at or below their low stock threshold, lowest first."""
+        return low_stock(viewed_vendor(info, vendor))
+
+    def resolve_due_for_restock(self, info, vendor, within_days=None, **kwargs):
+        """Inventories of a vendor restocking in the next `withinDays` days or overdue, soonest first."""
+        return due_for_restock(viewed_vendor(info, vendor), within_days)
+
+    def resolve_sales_report(self, info, vendor, from_, to, granularity=SalesGranularityEnum.DAY.value, item=None, category=None):
+        """Sales of a vendor, or of one of its items (by key) or categories, read from the daily rollups."""
+        vendor = viewed_vendor(info, vendor)
+        if item:
+            try: item = Item.objects.only('pk').get(key=item, vendor=vendor)
+            except Item.DoesNotExist: raise InvalidModelIdException(model="Item")
+        return sales_report(vendor, from_, to, getattr(granularity, 'value', granularity), item=item, category=category_pk(category) if category else None)
+
+    def resolve_search_items(self, info, query, first=None, last=None, after=None, before=None, **kwargs):
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        for name, count in (('first', first), ('last', last)):
+            if count is not None and (count < 0 or count > max_limit):
+                raise GraphQLError(f'`{name}` on the `searchItems` connection must be between 0 and {max_limit}.')
+        offset, end = 0, None
+        if after:
+            offset = cursor_to_offset(after)
+            if offset is None:
+                raise GraphQLError('Invalid cursor')
+            offset += 1
+        if before:
+            end = cursor_to_offset(before)
+            if end is None:
+                raise GraphQLError('Invalid cursor')
+        if last is not None:
+            # Counting the matches is only needed to page back from the end
+            if end is None:
+                end = search_count(query)
+            offset = max(offset, end - last)
+        limit = max_limit if end is None else max(end - offset, 0)
+        if first is not None:
+            limit = min(limit, first)
+
+        pks, has_more = search(query, offset, limit)
+        items = optimize(Item.objects.all(), info).in_bulk(pks)
+        nodes = [items[pk] for pk in pks if pk in items]
+        get_loaders(info).prime(nodes)
+
+        connection = ItemObject._meta.connection
+        edges = [connection.Edge(node=node, cursor=offset_to_cursor(offset + i)) for i, node in enumerate(nodes)]
+        page_info = PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=offset > 0,
+            has_next_page=has_more,
+        )
+        return connection(edges=edges, page_info=page_info)
+
 
 class Mutation(graphene.ObjectType):
     create_item = CreateItem.Field()
@@ -524,4 +805,9 @@ class Mutation(graphene.ObjectType):
 
     create_item_review = CreateItemReview.Field()
     update_item_review = UpdateItemReview.Field()
-    delete_item_review = DeleteItemReview.Field()
\ No newline at end of file
+    delete_item_review = DeleteItemReview.Field()
+
+    reserve_stock = ReserveStock.Field()
+    release_stock_reservation = ReleaseStockReservation.Field()
+
+    place_order = PlaceOrder.Field()
\ No newline at end of file
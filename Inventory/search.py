@@ -0,0 +1,160 @@
+# Description: Inverted index and ranked full-text search over items, stored in the database.
+import math
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from Inventory.models import Item, ItemSearchPosting
+
+# Relative weight of a term found in each indexed field
+FIELD_BOOSTS = {
+    'name': 5.0,
+    'tags': 3.0,
+    'brand': 3.0,
+    'teaser': 2.0,
+    'bullet_points': 1.5,
+    'description': 1.0,
+}
+
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or', 'that',
+    'the', 'this', 'to', 'with',
+))
+
+TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# (suffix, replacement) tried longest first; a stem keeps at least 3 characters
+SUFFIXES = (
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'), ('ousness', 'ous'),
+    ('ations', 'ate'), ('ation', 'ate'), ('ments', ''), ('ment', ''), ('ingly', ''), ('edly', ''),
+    ('ness', ''), ('ings', ''), ('sses', 'ss'), ('ches', 'ch'), ('shes', 'sh'), ('xes', 'x'), ('zes', 'z'),
+    ('ies', 'y'), ('ied', 'y'), ('ing', ''), ('ers', ''), ('er', ''), ('ed', ''), ('ly', ''), ('s', ''),
+)
+KEEP_ENDINGS = ('ss', 'us', 'is')
+
+
+def stem(word):
+    """Light suffix stripping stemmer, enough to match plural and verb forms of catalog terms."""
+    if word.isdigit() or len(word) <= 3 or word.endswith(KEEP_ENDINGS):
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= 3:
+            word = word[:-len(suffix)] + replacement
+            break
+    # "charge" and "charging" share a stem, as do "running" and "run"
+    if len(word) > 3 and word.endswith('e'):
+        word = word[:-1]
+    elif len(word) > 3 and word[-1] == word[-2] and word[-1] not in 'aeiouls':
+        word = word[:-1]
+    return word
+
+
+def analyze(text):
+    """Lower cased, stemmed terms of `text` without stop words, in order."""
+    if not text:
+        return []
+    terms = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token not in STOP_WORDS:
+            terms.append(stem(token)[:ItemSearchPosting._meta.get_field('term').max_length])
+    return terms
+
+
+def _flatten(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for child in value.values():
+            yield from _flatten(child)
+    elif isinstance(value, (list, tuple)):
+        for child in value:
+            yield from _flatten(child)
+
+
+def item_documents(items):
+    """Yields `(item, {field: text})` for `items`, loading their tags and brand in bulk."""
+    for item in items:
+        yield item, {
+            'name': item.name,
+            'teaser': item.teaser,
+            'description': item.description,
+            'bullet_points': ' '.join(_flatten(item.bullet_points)),
+            'tags': ' '.join(tag.name for tag in item.tags.all()),
+            'brand': item.brand.name if item.brand else '',
+        }
+
+
+def build_postings(item, document):
+    weights = Counter()
+    for field, text in document.items():
+        for term, frequency in Counter(analyze(text)).items():
+            weights[term] += FIELD_BOOSTS[field] * (1 + math.log(frequency))
+    return [ItemSearchPosting(item=item, term=term, weight=weight) for term, weight in weights.items()]
+
+
+def indexable(queryset):
+    return queryset.select_related('brand').prefetch_related('tags')
+
+
+def index_items(items):
+    """Replaces the postings of `items`, given as model instances or primary keys."""
+    pks = [getattr(item, 'pk', item) for item in items]
+    if not pks:
+        return 0
+    postings = []
+    for item, document in item_documents(indexable(Item.objects.filter(pk__in=pks))):
+        postings.extend(build_postings(item, document))
+    with transaction.atomic():
+        ItemSearchPosting.objects.filter(item_id__in=pks).delete()
+        ItemSearchPosting.objects.bulk_create(postings, batch_size=1000)
+    return len(postings)
+
+
+def index_item(item):
+    return index_items([item])
+
+
+def ranked_items(query):
+    """
+    Primary keys of the items matching `query`, best first, as a queryset,
+    or None when no term of it is indexed. Items matching more of the query
+    terms come first, then the sum over the matched terms of posting weight
+    times inverse document frequency.
+    """
+    terms = list(dict.fromkeys(analyze(query)))
+    if not terms:
+        return None
+
+    postings = ItemSearchPosting.objects.filter(term__in=terms, item__is_active=True)
+    frequencies = dict(postings.order_by().values_list('term').annotate(Count('item_id')))
+    if not frequencies:
+        return None
+    total = Item.objects.filter(is_active=True).count()
+    idf = {term: math.log(1 + total / frequency) for term, frequency in frequencies.items()}
+
+    score = Sum(
+        Case(*[When(term=term, then=F('weight') * Value(weight)) for term, weight in idf.items()], output_field=FloatField())
+    )
+    return (
+        postings.values('item_id')
+        .annotate(matched=Count('term'), score=score)
+        .order_by('-matched', '-score', 'item_id')
+        .values_list('item_id', flat=True)
+    )
+
+
+def search(query, offset=0, limit=20):
+    """Returns `(item pks, has more)` of the `limit` items matching `query` from `offset`, see ranked_items."""
+    ranked = ranked_items(query)
+    if ranked is None:
+        return [], False
+    pks = list(ranked[offset:offset + limit + 1])
+    return pks[:limit], len(pks) > limit
+
+
+def search_count(query):
+    """Number of items matching `query`."""
+    ranked = ranked_items(query)
+    return 0 if ranked is None else ranked.count()
@@ -0,0 +1,179 @@
+# Description: Stock reservations taken with conditional decrements, released on demand or when they expire.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from nanoid import generate
+
+from Api.cache import instance_tag, response_cache
+from Common.exceptions import OutOfStockException
+from Inventory.models import Inventory, ItemVariation, StockReservation
+
+
+def get_config():
+    config = {
+        'TTL': 900,
+        'SWEEP_BATCH_SIZE': 500,
+    }
+    config.update(getattr(settings, 'STOCK_RESERVATIONS', {}))
+    return config
+
+
+def _variant_tags(variant_ids):
+    return [instance_tag(ItemVariation(pk=variant_id)) for variant_id in variant_ids]
+
+
+def _merge(lines):
+    quantities = {}
+    for variant_id, quantity in lines:
+        if quantity <= 0:
+            raise ValueError('A reservation needs a positive quantity')
+        quantities[variant_id] = quantities.get(variant_id, 0) + quantity
+    return quantities
+
+
+def _by_variant(field, quantities):
+    return Case(*[When(**{field: pk}, then=Value(quantity)) for pk, quantity in quantities.items()], output_field=IntegerField())
+
+
+def take_stock(quantities):
+    """
+    Takes `{variant id: quantity}` from the variations that have that many
+    available, in one conditional UPDATE, and tells whether all of them did;
+    the caller rolls back its transaction when they did not. Rows are locked
+    from the update to the end of the transaction only and nothing is read
+    first, so buyers of a hot SKU never oversell and do not queue behind a
+    SELECT ... FOR UPDATE.
+    """
+    taken = _by_variant('pk', quantities)
+    return ItemVariation.objects.filter(pk__in=quantities, quantity__gte=taken).update(
+        quantity=F('quantity') - taken
+    ) == len(quantities)
+
+
+def restore_stock(quantities):
+    """Gives back `{variant id: quantity}` with one UPDATE."""
+    if quantities:
+        ItemVariation.objects.filter(pk__in=quantities).update(quantity=F('quantity') + _by_variant('pk', quantities))
+
+
+def _take_inventory(quantities):
+    # Sold units leave the warehouse count as well
+    Inventory.objects.filter(variant_id__in=quantities).update(quantity=F('quantity') - _by_variant('variant_id', quantities))
+
+
+def _hold(lines, user, ttl, status):
+    quantities = _merge(lines)
+    expires_at = timezone.now() + timedelta(seconds=ttl or get_config()['TTL'])
+    reservations = [
+        StockReservation(id=generate(size=28), variant_id=variant_id, user=user, quantity=quantity, status=status, expires_at=expires_at)
+        for variant_id, quantity in quantities.items()
+    ]
+    with transaction.atomic():
+        StockReservation.objects.bulk_create(reservations)
+        if not take_stock(quantities):
+            available = dict(ItemVariation.objects.filter(pk__in=quantities).values_list('pk', 'quantity'))
+            short = [variant_id for variant_id, quantity in quantities.items() if available.get(variant_id, 0) < quantity]
+            raise OutOfStockException(f"Not enough stock for variation {', '.join(short)}")
+        if status == 'committed':
+            _take_inventory(quantities)
+        response_cache.invalidate(*_variant_tags(quantities))
+    return reservations
+
+
+def reserve(lines, user=None, ttl=None):
+    """
+    Holds `(variant id, quantity)` lines for `ttl` seconds and returns their
+    reservations, or raises OutOfStockException and holds nothing. The stock
+    is taken after the reservation rows are written, so the variation rows
+    stay locked as briefly as possible.
+    """
+    return _hold(lines, user, ttl, 'held')
+
+
+def sell(lines, user=None):
+    """Like reserve(), with the reservations committed at once, for a sale made in the current transaction."""
+    return _hold(lines, user, None, 'committed')
+
+
+def _finish(reservations, status):
+    """Moves the held ones of `reservations` (a queryset) to `status` and returns how many were moved."""
+    with transaction.atomic():
+        held = list(reservations.filter(status='held').values_list('pk', 'variant_id', 'quantity'))
+        if not held:
+            return 0
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in held]).update(status=status, updated_at=timezone.now())
+        quantities = {}
+        for _, variant_id, quantity in held:
+            quantities[variant_id] = quantities.get(variant_id, 0) + quantity
+        if status == 'committed':
+            _take_inventory(quantities)
+        else:
+            restore_stock(quantities)
+            response_cache.invalidate(*_variant_tags(quantities))
+        return len(held)
+
+
+def _locked(queryset, skip_locked=False):
+    return queryset.select_for_update(skip_locked=skip_locked).order_by('pk')
+
+
+def release(reservation_ids):
+    """Releases held reservations and gives their stock back."""
+    return _finish(_locked(StockReservation.objects.filter(pk__in=reservation_ids)), 'released')
+
+
+def commit(reservation_ids):
+    """Turns held reservations into a sale; their stock is not given back."""
+    return _finish(_locked(StockReservation.objects.filter(pk__in=reservation_ids)), 'committed')
+
+
+def sell_reserved(lines, user):
+    """
+    Sells `(variant id, quantity)` lines to `user` in the current transaction
+    out of their held reservations first, so units they reserved are not
+    taken from the stock a second time. A held reservation the lines cover in
+    full is committed; one they only cover in part is released, and the units
+    it gave back are sold again with the rest. What no reservation covers is
+    sold from the stock as by sell(), which raises OutOfStockException.
+    """
+    remaining = _merge(lines)
+    held = _locked(StockReservation.objects.filter(user=user, status='held', variant_id__in=remaining))
+    committed, released = [], []
+    for pk, variant_id, quantity in held.values_list('pk', 'variant_id', 'quantity'):
+        if quantity <= remaining[variant_id]:
+            committed.append(pk)
+            remaining[variant_id] -= quantity
+        else:
+            released.append(pk)
+    if released:
+        _finish(StockReservation.objects.filter(pk__in=released), 'released')
+    if committed:
+        _finish(StockReservation.objects.filter(pk__in=committed), 'committed')
+    rest = [(variant_id, quantity) for variant_id, quantity in remaining.items() if quantity]
+    return sell(rest, user=user) if rest else []
+
+
+def sweep_expired(batch_size=None, now=None):
+    """
+    Expires held reservations past their expiry, a batch at a time, and
+    returns how many were expired. Rows locked by another sweeper or by a
+    release in progress are skipped rather than waited for. Batches walk the
+    primary key, so a batch whose rows were all taken by someone else does
+    not end the sweep, and no row is visited twice.
+    """
+    batch_size = batch_size or get_config()['SWEEP_BATCH_SIZE']
+    now = now or timezone.now()
+    expired, last = 0, None
+    while True:
+        due = StockReservation.objects.filter(status='held', expires_at__lte=now)
+        if last is not None:
+            due = due.filter(pk__gt=last)
+        with transaction.atomic():
+            pks = list(_locked(due, skip_locked=True).values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return expired
+            expired += _finish(StockReservation.objects.filter(pk__in=pks), 'expired')
+        last = pks[-1]
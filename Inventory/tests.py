@@ -1,3 +1,768 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from graphql_relay import to_global_id
+
+from Admin.models import Brand
+from Api.cache import instance_tag, response_cache
+from Api.documents import document_cache
+from Api.loaders import LoaderRegistry
+from Api.views import GraphQLView
+from Common.exceptions import InvalidModelIdException, NotFoundException, OutOfStockException
+from Common.models import Image
+from Inventory import categories
+from Inventory.categories import get_category_tree
+from Inventory import checkout, exports, importer, stock
+from Inventory.checkout import place_order
+from Inventory.facets import item_facets
+from Inventory.importer import CatalogImport
+from Inventory.low_stock import due_for_restock, low_stock, scan_low_stock
+from Inventory.models import Category, Inventory, Item, ItemVariation, Order, OrderItem, StockReservation, Tag
+from Inventory.ratings import apply_rating
+from Inventory.sales import refresh_sales, sales_report
+from Inventory.search import index_items
+from Inventory.stock import reserve, sweep_expired
+from User.models import Address, Cart, CartItem, User
+from Vendor.models import Vendor
+
+LOCAL_RESPONSE_CACHE = {**settings.RESPONSE_CACHE, 'ALLOW_LOCAL': True}
+
+
+class InventoryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.image = Image.objects.create(url='https://example.com/item.png', provider='local')
+        cls.vendor_user = User.objects.create_user('vendor@example.com', 'vendor', 'secret', type='vendor')
+        cls.vendor = Vendor.objects.create(user=cls.vendor_user, store_name='Store')
+        cls.customer = User.objects.create_user('customer@example.com', 'customer', 'secret')
+        cls.address = Address.objects.create(
+            user=cls.customer, name='Customer', address_line_1='1 Road', city='City', state='State',
+            country='IN', zip_code='000000', phone='0000000000',
+        )
+        cls.shoes = Category.objects.create(name='Shoes', description='', image=cls.image)
+        cls.shirts = Category.objects.create(name='Shirts', description='', image=cls.image)
+
+    def setUp(self):
+        cache.clear()
+        document_cache.clear()
+        categories._tree = None
+
+    def create_item(self, name, category=None, price=100, **fields):
+        return Item.objects.create(
+            sku=name, name=name, description=fields.pop('description', ''), bullet_points=[], image=self.image, price=price,
+            category=category or self.shoes, vendor=self.vendor, **fields,
+        )
+
+    def create_variation(self, item, value, price=100, quantity=10):
+        return ItemVariation.objects.create(item=item, name='Size', value=value, price=price, quantity=quantity)
+
+    def post(self, body):
+        response = self.client.post('/api/v1/', json.dumps(body), content_type='application/json')
+        return response.json()
+
+
+class ResponseCacheTests(InventoryTestCase):
+    LISTING = 'query($category: ID) { items(category: $category) { edges { node { name } } } }'
+
+    def listing(self, category):
+        result = self.post({'query': self.LISTING, 'variables': {'category': to_global_id('CategoryObject', category.pk)}})
+        return sorted(edge['node']['name'] for edge in result['data']['items']['edges'])
+
+    def update_item(self, item, **input):
+        self.client.force_login(self.vendor_user)
+        query = 'mutation($key: String!, $input: UpdateItemInput) { updateItem(key: $key, input: $input) { success } }'
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.post({'query': query, 'variables': {'key': item.key, 'input': {'vendor': self.vendor.key, **input}}})
+        self.assertTrue(result['data']['updateItem']['success'])
+        self.client.logout()
+
+    @override_settings(RESPONSE_CACHE=LOCAL_RESPONSE_CACHE)
+    def test_item_moved_between_categories_expires_both_listings(self):
+        self.create_item('boot')
+        shirt = self.create_item('shirt', self.shirts)
+        self.assertEqual(self.listing(self.shoes), ['boot'])
+        self.assertEqual(self.listing(self.shirts), ['shirt'])
+        with self.assertNumQueries(0):
+            self.listing(self.shoes)
+
+        self.update_item(shirt, category=self.shoes.pk)
+        self.assertEqual(self.listing(self.shoes), ['boot', 'shirt'])
+        self.assertEqual(self.listing(self.shirts), [])
+
+    @override_settings(RESPONSE_CACHE=LOCAL_RESPONSE_CACHE)
+    def test_status_change_expires_filtered_listing(self):
+        boot = self.create_item('boot')
+        query = '{ items(status: AVAILABLE) { edges { node { name } } } }'
+        self.assertEqual(len(self.post({'query': query})['data']['items']['edges']), 1)
+        self.update_item(boot, status='DISCONTINUED')
+        self.assertEqual(self.post({'query': query})['data']['items']['edges'], [])
+
+    def test_update_keeps_concurrent_rating_changes(self):
+        boot = self.create_item('boot')
+        get_category = Category.objects.get
+
+        def review_lands_meanwhile(*args, **kwargs):
+            # A review is applied after the mutation loaded the item and before it saves it
+            apply_rating(boot.pk, added=4)
+            return get_category(*args, **kwargs)
+
+        with mock.patch.object(Category.objects, 'get', side_effect=review_lands_meanwhile):
+            self.update_item(boot, name='boot 2', category=self.shirts.pk)
+        boot.refresh_from_db()
+        self.assertEqual((boot.name, boot.category_id), ('boot 2', self.shirts.pk))
+        self.assertEqual((boot.rating_count, boot.rating_sum, boot.rating_4), (1, 4, 1))
+        self.assertIsNotNone(boot.updated_at)
+
+    @override_settings(RESPONSE_CACHE=LOCAL_RESPONSE_CACHE)
+    def test_rating_expires_only_listings_showing_the_item(self):
+        boot = self.create_item('boot')
+        self.create_item('shirt', self.shirts)
+        self.listing(self.shoes)
+        self.listing(self.shirts)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_rating(boot.pk, added=5)
+        with self.assertNumQueries(0):
+            self.listing(self.shirts)
+        with self.assertNumQueries(2):
+            self.listing(self.shoes)
+
+    @override_settings(RESPONSE_CACHE=LOCAL_RESPONSE_CACHE)
+    def test_edit_of_unlisted_fields_keeps_other_listings(self):
+        self.create_item('boot')
+        shirt = self.create_item('shirt', self.shirts)
+        self.listing(self.shoes)
+        self.update_item(shirt, deliveryTime=5)
+        with self.assertNumQueries(0):
+            self.listing(self.shoes)
+        self.update_item(shirt, name='shirt 2')
+        with self.assertNumQueries(2):
+            self.listing(self.shoes)
+
+    @override_settings(RESPONSE_CACHE=LOCAL_RESPONSE_CACHE)
+    def test_change_committed_during_execution_is_not_cached(self):
+        boot = self.create_item('boot')
+        execute_sync = GraphQLView.execute_sync
+
+        def renamed_meanwhile(view, *args):
+            # UpdateItem commits after the listing read the item and before it is stored
+            result = execute_sync(view, *args)
+            Item.objects.filter(pk=boot.pk).update(name='boot 2')
+            response_cache._bump({instance_tag(boot)})
+            return result
+
+        with mock.patch.object(GraphQLView, 'execute_sync', renamed_meanwhile):
+            self.assertEqual(self.listing(self.shoes), ['boot'])
+        self.assertEqual(self.listing(self.shoes), ['boot 2'])
+
+    def test_nothing_is_cached_on_a_local_cache_by_default(self):
+        self.create_item('boot')
+        self.listing(self.shoes)
+        with self.assertNumQueries(2):
+            self.listing(self.shoes)
+
+
+class CategoryTreeTests(InventoryTestCase):
+    def test_tree_follows_the_table_without_a_shared_cache(self):
+        self.assertEqual([category.name for category in get_category_tree().roots()], ['Shirts', 'Shoes'])
+        # Created as another worker would, whose invalidation this process never sees
+        Category.objects.create(name='Hats', description='', image=self.image)
+        self.assertEqual([category.name for category in get_category_tree().roots()], ['Hats', 'Shirts', 'Shoes'])
+
+    @override_settings(RESPONSE_CACHE=LOCAL_RESPONSE_CACHE)
+    def test_moved_category_expires_children_of_its_new_parent(self):
+        self.create_item('boot')
+        query = '{ items { edges { node { category { children { name } } } } } }'
+
+        def children():
+            return self.post({'query': query})['data']['items']['edges'][0]['node']['category']['children']
+
+        self.assertEqual(children(), [])
+        self.client.force_login(User.objects.create_user('admin@example.com', 'admin', 'secret', type='admin'))
+        mutation = 'mutation($id: String!, $input: CategoryUpdateInput!) { updateCategory(id: $id, input: $input) { success } }'
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.post({'query': mutation, 'variables': {'id': self.shirts.pk, 'input': {'parent': self.shoes.pk}}})
+        self.assertTrue(result['data']['updateCategory']['success'])
+        self.client.logout()
+        self.assertEqual(children(), [{'name': 'Shirts'}])
+
+    def test_tree_is_read_once_per_request(self):
+        boots = Category.objects.create(name='Boots', description='', image=self.image, parent=self.shoes)
+        query = '{ items { edges { node { category { name ancestors { name } children { name } } } } } }'
+
+        def queries(count):
+            Item.objects.all().delete()
+            for index in range(count):
+                self.create_item(f'boot {index}', category=boots)
+            categories._tree = None
+            with CaptureQueriesContext(connection) as context:
+                result = self.post({'query': query})
+            self.assertEqual(result['data']['items']['edges'][0]['node']['category']['ancestors'], [{'name': 'Shoes'}])
+            return len(context.captured_queries)
+
+        self.assertEqual(queries(2), queries(12))
+
+
+class CheckoutTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = self.create_item('boot')
+        self.variation = self.create_variation(self.item, '42', quantity=5)
+        self.cart = Cart.objects.create(user=self.customer)
+
+    def add_line(self, quantity, item=None, variant=None):
+        CartItem.objects.create(cart=self.cart, item=item or self.item, variant=variant, quantity=quantity)
+
+    def stock(self):
+        self.variation.refresh_from_db()
+        return self.variation.quantity
+
+    def test_held_reservation_is_sold_not_taken_again(self):
+        reservation, = reserve([(self.variation.pk, 5)], user=self.customer)
+        self.add_line(5, variant=self.variation)
+        place_order(self.customer, self.address.pk)
+        self.assertEqual(self.stock(), 0)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'committed')
+        self.assertFalse(StockReservation.objects.exclude(pk=reservation.pk).exists())
+
+    def test_partly_used_reservation_is_released(self):
+        reservation, = reserve([(self.variation.pk, 4)], user=self.customer)
+        self.add_line(3, variant=self.variation)
+        place_order(self.customer, self.address.pk)
+        self.assertEqual(self.stock(), 2)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'released')
+        self.assertEqual(StockReservation.objects.get(status='committed').quantity, 3)
+
+    def test_reservations_of_other_users_still_hold_stock(self):
+        reserve([(self.variation.pk, 4)], user=self.vendor_user)
+        self.add_line(2, variant=self.variation)
+        with self.assertRaises(OutOfStockException):
+            place_order(self.customer, self.address.pk)
+        self.assertEqual(self.stock(), 1)
+        self.assertTrue(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_item_with_variations_needs_one(self):
+        self.add_line(1)
+        with self.assertRaises(InvalidModelIdException):
+            place_order(self.customer, self.address.pk)
+
+    def test_item_without_variations_must_be_available(self):
+        plain = self.create_item('belt')
+        self.add_line(1, item=plain)
+        order = place_order(self.customer, self.address.pk)
+        self.assertEqual(order.total, Decimal('100'))
+
+        self.add_line(1, item=plain)
+        Item.objects.filter(pk=plain.pk).update(status='out_of_stock')
+        with self.assertRaises(OutOfStockException):
+            place_order(self.customer, self.address.pk)
+
+    def test_cart_sold_by_another_checkout_is_not_sold_again(self):
+        plain = self.create_item('belt')
+        self.add_line(1, item=plain)
+        price_lines = checkout.price_lines
+
+        def sold_meanwhile(lines):
+            # Another checkout of the same cart commits after this one read the lines
+            CartItem.objects.filter(cart=self.cart).delete()
+            return price_lines(lines)
+
+        with mock.patch.object(checkout, 'price_lines', side_effect=sold_meanwhile):
+            with self.assertRaises(NotFoundException):
+                place_order(self.customer, self.address.pk)
+        self.assertFalse(Order.objects.exists())
+
+    def test_second_checkout_finds_the_cart_empty(self):
+        self.add_line(2, variant=self.variation)
+        place_order(self.customer, self.address.pk)
+        with self.assertRaises(NotFoundException):
+            place_order(self.customer, self.address.pk)
+        self.assertEqual((Order.objects.count(), self.stock()), (1, 3))
+
+
+class ListingIndexTests(InventoryTestCase):
+    def test_category_listing_is_served_by_an_index(self):
+        for index in range(3):
+            self.create_item(f'boot {index}', price=100 - index)
+        Order.objects.create(user=self.customer, total=0, currency='INR', shipping_address=self.address, billing_address=self.address)
+        out = StringIO()
+        try:
+            call_command('explain_listings', verbose_plans=True, stdout=out)
+        except CommandError:
+            # SQLite can not seek on the bare boolean column of the featured listing
+            pass
+        self.assertIn('items in a category by price: index', out.getvalue())
+        self.assertIn('item_category_price_idx', out.getvalue())
+
+
+class OrderExportTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        other_user = User.objects.create_user('other@example.com', 'other', 'secret', type='vendor')
+        other = Vendor.objects.create(user=other_user, store_name='Other')
+        self.boot = self.create_item('boot')
+        self.other_item = Item.objects.create(
+            sku='hat', name='hat', description='', bullet_points=[], image=self.image, price=10, category=self.shoes, vendor=other,
+        )
+
+    def order(self, item, quantity=1):
+        order = Order.objects.create(user=self.customer, total=0, currency='INR', shipping_address=self.address, billing_address=self.address)
+        OrderItem.objects.create(order=order, item=item, quantity=quantity, price=item.price, total=item.price * quantity)
+        return order
+
+    def test_sparse_vendor_is_read_in_full_pages(self):
+        orders = []
+        for quantity in range(1, 6):
+            orders.append(self.order(self.boot, quantity).key)
+            for _ in range(20):
+                self.order(self.other_item)
+        with self.assertNumQueries(3):
+            rows = list(exports.iter_rows(exports.order_lines(self.vendor), chunk_size=2))
+        self.assertEqual([(row[0], row[8]) for row in rows], list(zip(orders, range(1, 6))))
+
+    def test_no_lines(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(exports.iter_rows(exports.order_lines(self.vendor))), [])
+
+
+class SalesReportTests(InventoryTestCase):
+    QUERY = '''
+        query($vendor: String!, $from: Date!, $to: Date!) {
+            salesReport(vendor: $vendor, from: $from, to: $to) { units gross shipping orders periods { period gross } }
+        }
+    '''
+
+    def order(self, lines, status='pending', shipping=Decimal('10')):
+        subtotal = sum(item.price * quantity for item, quantity in lines)
+        order = Order.objects.create(
+            user=self.customer, total=subtotal + shipping, shipping_cost=shipping, currency='INR', status=status,
+            shipping_address=self.address, billing_address=self.address,
+        )
+        for item, quantity in lines:
+            OrderItem.objects.create(order=order, item=item, quantity=quantity, price=item.price, total=item.price * quantity)
+        return order
+
+    def test_empty_range_reports_zero_totals(self):
+        self.client.force_login(self.vendor_user)
+        result = self.post({'query': self.QUERY, 'variables': {'vendor': self.vendor.key, 'from': '2020-01-01', 'to': '2020-01-31'}})
+        self.assertEqual(result['data']['salesReport'], {'units': 0, 'gross': '0', 'shipping': '0', 'orders': 0, 'periods': []})
+
+    def test_rollups_add_up_to_the_orders(self):
+        boot, belt = self.create_item('boot', price=100), self.create_item('belt', price=50)
+        self.order([(boot, 2), (belt, 1)])
+        self.order([(belt, 3)], shipping=Decimal('0'))
+        self.order([(boot, 5)], status='cancelled')
+        refresh_sales(now=timezone.now() + timedelta(days=1))
+
+        today = timezone.localdate()
+        report = sales_report(self.vendor, today, today)
+        self.assertEqual(
+            (report['units'], report['gross'], report['shipping'], report['orders']),
+            (6, Decimal('400'), Decimal('10'), 2),
+        )
+        self.assertEqual(sales_report(self.vendor, today, today, item=belt)['gross'], Decimal('200'))
+
+
+class KeysetConnectionTests(InventoryTestCase):
+    QUERY = '''
+        query($first: Int, $last: Int, $after: String, $before: String, $orderBy: ItemOrderingEnum) {
+            keysetItems(first: $first, last: $last, after: $after, before: $before, orderBy: $orderBy) {
+                edges { node { name } }
+                pageInfo { startCursor endCursor hasNextPage hasPreviousPage }
+            }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        # Prices repeat, so pages have to break ties on the primary key
+        self.items = [self.create_item(f'item {index}', price=price) for index, price in enumerate([30, 10, 20, 10, 30, 20, 10])]
+
+    def page(self, **variables):
+        result = self.post({'query': self.QUERY, 'variables': variables})
+        connection = result['data']['keysetItems']
+        return [edge['node']['name'] for edge in connection['edges']], connection['pageInfo']
+
+    def expected(self, descending=False):
+        items = sorted(self.items, key=lambda item: (item.min_price, item.pk), reverse=descending)
+        return [item.name for item in items]
+
+    def walk_forward(self, order_by):
+        names, after = [], None
+        while True:
+            page, info = self.page(first=3, after=after, orderBy=order_by)
+            names += page
+            if not info['hasNextPage']:
+                return names
+            after = info['endCursor']
+
+    def test_pages_forward_visit_every_item_once(self):
+        self.assertEqual(self.walk_forward('PRICE'), self.expected())
+        self.assertEqual(self.walk_forward('PRICE_DESC'), self.expected(descending=True))
+
+    def test_pages_backward_visit_every_item_once(self):
+        pages, before = [], None
+        while True:
+            page, info = self.page(last=3, before=before, orderBy='PRICE')
+            pages.insert(0, page)
+            if not info['hasPreviousPage']:
+                break
+            before = info['startCursor']
+        self.assertEqual([name for page in pages for name in page], self.expected())
+
+    def test_invalid_cursor(self):
+        result = self.post({'query': self.QUERY, 'variables': {'first': 3, 'after': 'bm90IGEgY3Vyc29y'}})
+        self.assertEqual(result['errors'][0]['message'], 'Invalid cursor')
+
+
+class CatalogImportTests(InventoryTestCase):
+    def row(self, sku, **fields):
+        return {
+            'sku': sku, 'name': sku, 'description': 'Imported', 'category': 'Shoes', 'price': '50',
+            'image': 'https://example.com/boot.png', **fields,
+        }
+
+    def run_import(self, rows, **options):
+        run = CatalogImport(self.vendor, derive_urls=False, **options)
+        return run, run.run(rows)
+
+    def test_valid_rows_are_created(self):
+        variations = json.dumps([{'name': 'Size', 'value': '8', 'price': 40}, {'name': 'Size', 'value': '9', 'price': 45}])
+        run, stats = self.run_import([self.row('boot', variations=variations, tags='leather|winter'), self.row('sandal')])
+        self.assertEqual((stats['created'], stats['failed']), (2, 0))
+        boot = Item.objects.get(sku='boot')
+        self.assertEqual((boot.min_price, boot.max_price), (40, 45))
+        self.assertEqual(sorted(boot.tags.values_list('name', flat=True)), ['leather', 'winter'])
+
+    def test_invalid_rows_are_reported_per_row(self):
+        rows = [
+            self.row('boot'),
+            self.row('x' * 101),
+            self.row('long name', name='x' * 251),
+            self.row('long url', image='https://example.com/' + 'x' * 250),
+            self.row('no price', price=''),
+            self.row('unknown category', category='Hats'),
+        ]
+        run, stats = self.run_import(rows)
+        self.assertEqual((stats['created'], stats['failed']), (1, 5))
+        self.assertEqual([error['row'] for error in run.errors], [2, 3, 4, 5, 6])
+        self.assertEqual(run.errors[0]['message'], '`sku` must be at most 100 characters')
+        self.assertEqual(run.errors[2]['message'], '`image` must be at most 255 characters')
+
+    def test_duplicate_variations_fail_the_row(self):
+        variations = json.dumps([{'name': 'Size', 'value': '8', 'price': 40}, {'name': 'Size', 'value': '8', 'price': 45}])
+        run, stats = self.run_import([self.row('boot', variations=variations), self.row('sandal')])
+        self.assertEqual((stats['created'], stats['failed']), (1, 1))
+        self.assertEqual(run.errors, [{'row': 1, 'message': 'variation `Size: 8` is listed twice'}])
+        self.assertFalse(Item.objects.filter(sku='boot').exists())
+
+    def test_chunk_refused_by_the_database_is_reported(self):
+        with mock.patch.object(importer, 'index_items', side_effect=[DatabaseError('refused'), None]):
+            run, stats = self.run_import([self.row('boot'), self.row('belt'), self.row('sandal')], chunk_size=2)
+        self.assertEqual((stats['created'], stats['failed']), (1, 2))
+        self.assertEqual([error['row'] for error in run.errors], [1, 2])
+        self.assertEqual(list(Item.objects.values_list('sku', flat=True)), ['sandal'])
+
+
+class ItemFacetsTests(InventoryTestCase):
+    def test_counts_per_facet_in_two_queries(self):
+        brand = Brand.objects.create(name='Acme', description='', image=self.image)
+        tag = Tag.objects.create(name='leather')
+        boot = self.create_item('boot', price=400, brand=brand)
+        boot.tags.add(tag)
+        self.create_item('sandal', price=700, brand=brand)
+        self.create_item('tee', category=self.shirts, price=7000, status='out_of_stock')
+        with self.assertNumQueries(2):
+            facets = item_facets(Item.objects.all())
+        self.assertEqual(facets['categories'], [
+            {'value': self.shoes.pk, 'label': 'Shoes', 'count': 2},
+            {'value': self.shirts.pk, 'label': 'Shirts', 'count': 1},
+        ])
+        self.assertEqual(facets['brands'], [{'value': brand.pk, 'label': 'Acme', 'count': 2}])
+        self.assertEqual(facets['tags'], [{'value': tag.pk, 'label': 'leather', 'count': 1}])
+        self.assertEqual([(entry['value'], entry['count']) for entry in facets['statuses']], [('available', 2), ('out_of_stock', 1)])
+        self.assertEqual(facets['prices'], [
+            {'min': 0, 'max': 500, 'count': 1},
+            {'min': 500, 'max': 1000, 'count': 1},
+            {'min': 5000, 'max': 10000, 'count': 1},
+        ])
+
+    def test_labels_of_equal_ids_in_different_facets(self):
+        # Ids are only unique per table
+        brand = Brand.objects.create(id=self.shoes.pk, name='Acme', description='', image=self.image)
+        tag = Tag.objects.create(id=self.shoes.pk, name='leather')
+        self.create_item('boot', brand=brand).tags.add(tag)
+        facets = item_facets(Item.objects.all())
+        self.assertEqual(facets['categories'][0]['label'], 'Shoes')
+        self.assertEqual(facets['brands'][0]['label'], 'Acme')
+        self.assertEqual(facets['tags'][0]['label'], 'leather')
+
+
+class SearchItemsTests(InventoryTestCase):
+    QUERY = '''
+        query($query: String!, $first: Int, $last: Int, $after: String, $before: String) {
+            searchItems(query: $query, first: $first, last: $last, after: $after, before: $before) {
+                edges { node { name } }
+                pageInfo { startCursor endCursor hasNextPage hasPreviousPage }
+            }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.create_item('red leather boot', description='Waterproof')
+        self.create_item('brown boot', description='Leather sole')
+        self.create_item('leather belt', description='Brown')
+        self.create_item('cotton shirt', category=self.shirts, description='Plain')
+        index_items(Item.objects.all())
+
+    def page(self, **variables):
+        result = self.post({'query': self.QUERY, 'variables': variables})
+        self.assertNotIn('errors', result)
+        connection = result['data']['searchItems']
+        return [edge['node']['name'] for edge in connection['edges']], connection['pageInfo']
+
+    def test_items_matching_more_terms_come_first(self):
+        names, _ = self.page(query='leather boots')
+        self.assertEqual(names[0], 'red leather boot')
+        self.assertEqual(set(names), {'red leather boot', 'brown boot', 'leather belt'})
+
+    def test_search_reads_a_page_in_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(4):
+            self.page(query='leather', first=1)
+        with self.assertNumQueries(4):
+            self.page(query='leather', first=3)
+
+    def test_pages_backward_visit_every_match_once(self):
+        forward, _ = self.page(query='leather')
+        pages, before = [], None
+        while True:
+            page, info = self.page(query='leather', last=2, before=before)
+            pages.insert(0, page)
+            if not info['hasPreviousPage']:
+                break
+            before = info['startCursor']
+        self.assertEqual([name for page in pages for name in page], forward)
+        self.assertEqual(len(pages), 2)
+
+    def test_description_filters_are_kept(self):
+        result = self.post({'query': '{ items(description_Icontains: "waterproof") { edges { node { name } } } }'})
+        self.assertEqual([edge['node']['name'] for edge in result['data']['items']['edges']], ['red leather boot'])
+
+
+class ReservationSweepTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.variation = self.create_variation(self.create_item('boot'), '42', quantity=10)
+        self.later = timezone.now() + timedelta(seconds=120)
+
+    def test_expired_reservations_give_their_stock_back(self):
+        expiring = [reservation for _ in range(5) for reservation in reserve([(self.variation.pk, 1)], ttl=60)]
+        reserve([(self.variation.pk, 2)], ttl=600)
+        self.assertEqual(sweep_expired(batch_size=2, now=self.later), 5)
+        self.assertEqual(StockReservation.objects.filter(pk__in=[r.pk for r in expiring], status='expired').count(), 5)
+        self.variation.refresh_from_db()
+        self.assertEqual(self.variation.quantity, 8)
+
+    def test_batch_finished_elsewhere_does_not_end_the_sweep(self):
+        for _ in range(6):
+            reserve([(self.variation.pk, 1)], ttl=60)
+        finish, calls = stock._finish, []
+
+        def released_first(reservations, status):
+            # The first batch is released by someone else before it is expired
+            calls.append(status)
+            if len(calls) == 1:
+                finish(reservations, 'released')
+                return 0
+            return finish(reservations, status)
+
+        with mock.patch.object(stock, '_finish', released_first):
+            self.assertEqual(sweep_expired(batch_size=2, now=self.later), 4)
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(StockReservation.objects.filter(status='held').exists())
+
+
+class RelatedLoaderTests(InventoryTestCase):
+    QUERY = '''{
+        items(first: 20) { edges { node {
+            name image { url } category { name } variations { value } tags { edges { node { name } } }
+        } } }
+    }'''
+
+    def create_items(self, count):
+        tag = Tag.objects.create(name='leather')
+        for index in range(count):
+            item = self.create_item(f'item {index}', category=(self.shoes, self.shirts)[index % 2])
+            item.tags.add(tag)
+            self.create_variation(item, '42')
+
+    def queries(self):
+        with CaptureQueriesContext(connection) as context:
+            result = self.post({'query': self.QUERY})
+        self.assertNotIn('errors', result)
+        return len(context.captured_queries)
+
+    def test_page_costs_the_same_queries_whatever_its_size(self):
+        self.create_items(2)
+        small = self.queries()
+        Item.objects.all().delete()
+        self.create_items(8)
+        self.assertEqual(self.queries(), small)
+
+    def test_relation_is_loaded_for_every_seen_instance_at_once(self):
+        self.create_items(4)
+        registry = LoaderRegistry()
+        items = list(Item.objects.all())
+        registry.prime(items)
+        with self.assertNumQueries(1):
+            categories = [registry.load(item, 'category') for item in items]
+        self.assertEqual([category.pk for category in categories], [item.category_id for item in items])
+        with self.assertNumQueries(1):
+            self.assertEqual([len(registry.load(item, 'variations')) for item in items], [1] * 4)
+
+    def test_rows_already_seen_are_not_queried(self):
+        self.create_items(2)
+        registry = LoaderRegistry()
+        registry.prime(Category.objects.all())
+        item = Item.objects.first()
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.load(item, 'category').pk, item.category_id)
+
+
+class QueryOptimizerTests(InventoryTestCase):
+    def item_queries(self, selection):
+        self.create_item('boot', description='Waterproof')
+        with CaptureQueriesContext(connection) as context:
+            result = self.post({'query': f'{{ items(first: 5) {{ edges {{ node {{ {selection} }} }} }} }}'})
+        self.assertNotIn('errors', result)
+        table = connection.ops.quote_name(Item._meta.db_table)
+        return [query['sql'] for query in context.captured_queries if f'FROM {table}' in query['sql'] and 'COUNT(' not in query['sql']]
+
+    def test_selected_foreign_keys_are_joined(self):
+        sql, = self.item_queries('name category { name } image { url }')
+        self.assertIn(connection.ops.quote_name(Category._meta.db_table), sql)
+        self.assertIn(connection.ops.quote_name(Image._meta.db_table), sql)
+
+    def test_text_columns_are_only_read_when_selected(self):
+        column = connection.ops.quote_name('description')
+        sql, = self.item_queries('name')
+        self.assertNotIn(column, sql)
+        Item.objects.all().delete()
+        sql, = self.item_queries('name description')
+        self.assertIn(column, sql)
+
+
+class ItemRelationWriteTests(InventoryTestCase):
+    CREATE_ITEM = 'mutation($input: NewItemInput!) { createItem(input: $input) { success item { key } } }'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.vendor_user)
+        Tag.objects.create(name='tag 0')
+
+    def create(self, sku, count):
+        image = {'url': 'https://example.com/item.png', 'provider': 'local', 'action': 'CREATE'}
+        input = {
+            'sku': sku, 'name': sku, 'description': '', 'bulletPoints': [], 'status': 'AVAILABLE', 'canReturn': True, 'price': 100, 'vendor': self.vendor.key, 'category': self.shoes.pk,
+            'image': image, 'images': [image] * count, 'tags': [f'tag {index}' for index in range(count)],
+        }
+        with CaptureQueriesContext(connection) as context:
+            result = self.post({'query': self.CREATE_ITEM, 'variables': {'input': input}})
+        self.assertTrue(result['data']['createItem']['success'])
+        return Item.objects.get(sku=sku), len(context.captured_queries)
+
+    def test_tags_and_images_are_written_in_a_fixed_number_of_queries(self):
+        few, queries = self.create('few', 2)
+        many, more_queries = self.create('many', 8)
+        self.assertEqual(more_queries, queries)
+        self.assertEqual(sorted(many.tags.values_list('name', flat=True)), [f'tag {index}' for index in range(8)])
+        self.assertEqual(many.images.count(), 8)
+        # Existing tags are linked, not created again
+        self.assertEqual(Tag.objects.count(), 8)
+        self.assertEqual(set(few.tags.all()), set(Tag.objects.filter(name__in=['tag 0', 'tag 1'])))
+
+
+class PriceRangeTests(InventoryTestCase):
+    def price_range(self, item):
+        item.refresh_from_db()
+        return item.min_price, item.max_price
+
+    def test_range_follows_the_variations(self):
+        boot = self.create_item('boot', price=100)
+        self.assertEqual(self.price_range(boot), (100, 100))
+        small = self.create_variation(boot, '40', price=80)
+        self.create_variation(boot, '46', price=120)
+        self.assertEqual(self.price_range(boot), (80, 120))
+        small.price = 90
+        small.save()
+        self.assertEqual(self.price_range(boot), (90, 120))
+        for variation in boot.variations.all():
+            variation.delete()
+        self.assertEqual(self.price_range(boot), (100, 100))
+
+    def test_price_filters_match_any_variation(self):
+        boot = self.create_item('boot', price=100)
+        self.create_variation(boot, '40', price=80)
+        self.create_variation(boot, '46', price=120)
+        self.create_item('belt', price=50)
+        query = 'query($gte: Decimal, $lte: Decimal) { items(price_Gte: $gte, price_Lte: $lte, orderBy: PRICE) { edges { node { name } } } }'
+
+        def names(**bounds):
+            result = self.post({'query': query, 'variables': bounds})
+            return [edge['node']['name'] for edge in result['data']['items']['edges']]
+
+        self.assertEqual(names(gte=110), ['boot'])
+        self.assertEqual(names(lte=90), ['belt', 'boot'])
+        self.assertEqual(names(gte=60, lte=70), [])
+
+
+class LowStockTests(InventoryTestCase):
+    def create_inventory(self, item, value, quantity, **fields):
+        return Inventory.objects.create(item=item, variant=self.create_variation(item, value), quantity=quantity, **fields)
+
+    def test_item_threshold_overrides_the_vendor_threshold(self):
+        boot = self.create_item('boot')
+        belt = self.create_item('belt', low_stock_threshold=1)
+        low = self.create_inventory(boot, '40', 5)
+        self.create_inventory(boot, '42', 6)
+        self.create_inventory(belt, '90', 2)
+        empty = self.create_inventory(belt, '100', 0)
+        self.assertEqual(list(low_stock()), [empty, low])
+        self.assertEqual(list(low_stock(vendor=Vendor(pk=0))), [])
+
+    def test_restock_dates_within_the_window(self):
+        boot = self.create_item('boot')
+        now = timezone.now()
+        soon = self.create_inventory(boot, '40', 10, restock_date=now + timedelta(days=2))
+        overdue = self.create_inventory(boot, '42', 10, restock_date=now - timedelta(days=1))
+        self.create_inventory(boot, '44', 10, restock_date=now + timedelta(days=30))
+        self.assertEqual(list(due_for_restock(within_days=7)), [overdue, soon])
+
+    def test_scan_flags_crossings_once_and_marks_emptied_items(self):
+        boot, belt = self.create_item('boot'), self.create_item('belt')
+        low = self.create_inventory(boot, '40', 3)
+        self.create_inventory(boot, '42', 20)
+        empty = self.create_inventory(belt, '90', 0)
+        self.assertEqual(scan_low_stock(batch_size=1), {'crossed': 2, 'recovered': 0, 'out_of_stock': 1})
+        self.assertEqual(scan_low_stock(), {'crossed': 0, 'recovered': 0, 'out_of_stock': 0})
+        belt.refresh_from_db()
+        self.assertEqual(belt.status, 'out_of_stock')
+
+        Inventory.objects.filter(pk=low.pk).update(quantity=50)
+        self.assertEqual(scan_low_stock(), {'crossed': 0, 'recovered': 1, 'out_of_stock': 0})
+        low.refresh_from_db()
+        empty.refresh_from_db()
+        self.assertIsNone(low.low_stock_at)
+        self.assertIsNotNone(empty.low_stock_at)
@@ -0,0 +1,55 @@
+# Description: Set-based helpers shared by the item write paths (mutations and catalog imports).
+from nanoid import generate
+
+from Api.cache import instance_tag, model_tag
+from Inventory.models import Item, Tag
+
+# Columns item listings filter, search or order by, so editing one can move the item into a listing that did not show it
+LISTED_FIELDS = frozenset(('sku', 'name', 'teaser', 'description', 'bullet_points', 'price', 'category', 'brand', 'status'))
+
+
+def get_or_create_tags(names):
+    """
+    Returns `({name: Tag}, created tags)` for `names`, finding the existing
+    tags with one query and inserting the missing ones with one bulk insert.
+    """
+    names = list(dict.fromkeys(name for name in names or [] if name))
+    if not names:
+        return {}, []
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    created = [Tag(id=generate(size=28), name=name) for name in names if name not in tags]
+    Tag.objects.bulk_create(created)
+    tags.update((tag.name, tag) for tag in created)
+    return tags, created
+
+
+def add_item_relations(item_id, tags=(), images=()):
+    """Links tags and gallery images to a saved item with one insert per relation, keeping existing links."""
+    if tags:
+        Item.tags.through.objects.bulk_create(
+            [Item.tags.through(item_id=item_id, tag_id=tag.pk) for tag in tags], ignore_conflicts=True
+        )
+    if images:
+        Item.images.through.objects.bulk_create(
+            [Item.images.through(item_id=item_id, image_id=image.pk) for image in images], ignore_conflicts=True
+        )
+
+
+def tag_dependencies(tags, created):
+    """Response cache tags expired by linking `tags` to an item, where `created` were just inserted."""
+    dependencies = [instance_tag(tag) for tag in tags.values() if tag not in created]
+    if created:
+        dependencies.append(model_tag(Tag))
+    return dependencies
+
+
+def item_dependencies(item, fields=(), tags=None):
+    """
+    Response cache tags expired by editing `fields` of `item` and linking it
+    to `tags`. Responses showing the item depend on its instance tag; every
+    list of items only when the edit can change which items it holds.
+    """
+    dependencies = [instance_tag(item)]
+    if tags or LISTED_FIELDS.intersection(fields):
+        dependencies.append(model_tag(Item))
+    return dependencies
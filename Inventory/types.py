@@ -8,6 +8,74 @@ class ItemStatusEnum(graphene.Enum):
     COMING_SOON = "comming_soon"
     DISCONTINUED = "discontinued"
 
+class ItemOrderingEnum(graphene.Enum):
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    PRICE = "min_price"
+    PRICE_DESC = "-min_price"
+    NAME = "name"
+    NAME_DESC = "-name"
+    RATING = "rating_average"
+    RATING_DESC = "-rating_average"
+    REVIEWS = "rating_count"
+    REVIEWS_DESC = "-rating_count"
+
+class OrderOrderingEnum(graphene.Enum):
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    TOTAL = "total"
+    TOTAL_DESC = "-total"
+
+class ItemReviewOrderingEnum(graphene.Enum):
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    RATING = "rating"
+    RATING_DESC = "-rating"
+
+class FacetValueObject(graphene.ObjectType):
+    value = graphene.String(required=True)
+    label = graphene.String()
+    count = graphene.Int(required=True)
+
+class PriceBucketObject(graphene.ObjectType):
+    min = graphene.Float(required=True)
+    max = graphene.Float()
+    count = graphene.Int(required=True)
+
+class RatingObject(graphene.ObjectType):
+    average = graphene.Float(required=True)
+    count = graphene.Int(required=True)
+    # Number of reviews with 1 to 5 stars, in that order
+    histogram = graphene.List(graphene.NonNull(graphene.Int), required=True)
+
+class SalesGranularityEnum(graphene.Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    YEAR = "year"
+
+class SalesPeriodObject(graphene.ObjectType):
+    # First day of the period
+    period = graphene.Date(required=True)
+    units = graphene.Int(required=True)
+    gross = graphene.Decimal(required=True)
+    shipping = graphene.Decimal(required=True)
+    orders = graphene.Int(required=True)
+
+class SalesReportObject(graphene.ObjectType):
+    periods = graphene.List(graphene.NonNull(SalesPeriodObject), required=True)
+    units = graphene.Int(required=True)
+    gross = graphene.Decimal(required=True)
+    shipping = graphene.Decimal(required=True)
+    orders = graphene.Int(required=True)
+
+class ItemFacetsObject(graphene.ObjectType):
+    categories = graphene.List(graphene.NonNull(FacetValueObject), required=True)
+    brands = graphene.List(graphene.NonNull(FacetValueObject), required=True)
+    tags = graphene.List(graphene.NonNull(FacetValueObject), required=True)
+    statuses = graphene.List(graphene.NonNull(FacetValueObject), required=True)
+    prices = graphene.List(graphene.NonNull(PriceBucketObject), required=True)
+
 class ItemExtraFieldData(graphene.InputObjectType):
     name = graphene.String()
     value = graphene.String()
@@ -39,6 +107,7 @@ class BaseItemInput(graphene.InputObjectType):
     return_time = graphene.Int()
     return_policy = graphene.String()
     brand = graphene.String()
+    low_stock_threshold = graphene.Int()
     extra_fields = graphene.List(ItemExtraField)
 
 class NewItemInput(BaseItemInput):
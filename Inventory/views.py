@@ -1,3 +1,55 @@
-from django.shortcuts import render
+from datetime import datetime, time
+
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from Inventory import exports
+from Inventory.importer import CatalogImport, guess_format, read_rows
+from Vendor.models import Vendor
 
 # Create your views here.
+
+@login_required
+def catalog_import(request):
+    """Imports the catalog file uploaded as `file` for the signed in vendor and returns the import stats."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    vendor = Vendor.objects.filter(user=request.user).first()
+    if vendor is None:
+        return HttpResponseForbidden('Only vendors can import items')
+    upload = request.FILES.get('file')
+    if upload is None:
+        return HttpResponseBadRequest('No file provided')
+    format = request.POST.get('format') or guess_format(upload.name)
+    run = CatalogImport(vendor)
+    stats = run.run(read_rows(upload, format))
+    return JsonResponse({**stats, 'errors': run.errors})
+
+
+@login_required
+def order_export(request):
+    """
+    Streams every order line of the signed in vendor's items as `format`
+    (csv or jsonl), optionally of one order `status` or `since` a date.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    vendor = Vendor.objects.filter(user=request.user).first()
+    if vendor is None:
+        return HttpResponseForbidden('Only vendors can export orders')
+    format = request.GET.get('format', 'csv')
+    if format not in exports.FORMATS:
+        return HttpResponseBadRequest(f"Format must be one of {', '.join(exports.FORMATS)}")
+    since = request.GET.get('since')
+    if since:
+        try: since = parse_date(since)
+        except ValueError: since = None
+        if since is None:
+            return HttpResponseBadRequest('`since` must be a YYYY-MM-DD date')
+        since = timezone.make_aware(datetime.combine(since, time.min))
+    lines = exports.order_lines(vendor, status=request.GET.get('status'), since=since)
+    response = StreamingHttpResponse(exports.render(exports.iter_rows(lines), format), content_type=exports.CONTENT_TYPES[format])
+    response['Content-Disposition'] = f'attachment; filename="orders-{vendor.key}.{format}"'
+    return response
@@ -50,6 +50,135 @@ GRAPHENE = {
     'RELAY_CONNECTION_ENFORCE_OFFSET': False,
 }
 
+# Persisted queries: clients may send `extensions.persistedQuery.sha256Hash`
+# instead of the document. With STRICT only the documents allowed through the
+# admin are executed. AUTO_REGISTER stores the valid documents clients send
+# with their hash (APQ), at most REGISTER_RATE per client and minute; MAX_SIZE
+# of them are kept in process. Clients are told apart by CLIENT_IP_HEADER (e.g.
+# HTTP_X_FORWARDED_FOR behind a proxy), else REMOTE_ADDR. Whether a query is
+# allowed is cached for ALLOWED_TIMEOUT seconds and dropped when it is saved.
+PERSISTED_QUERIES = {
+    'STRICT': os.environ.get('PERSISTED_QUERIES_STRICT', 'false').lower() == 'true',
+    'AUTO_REGISTER': os.environ.get('PERSISTED_QUERIES_AUTO_REGISTER', 'true').lower() == 'true',
+    'REGISTER_RATE': 30,
+    'MAX_SIZE': 1000,
+    'ALLOWED_TIMEOUT': 60,
+    'CLIENT_IP_HEADER': os.environ.get('CLIENT_IP_HEADER'),
+}
+
+# Parsed and validated GraphQL documents kept in process, keyed by query hash
+DOCUMENT_CACHE = {
+    'MAX_SIZE': 1000,
+}
+
+# Operations are costed before execution: object fields weigh 1 (or their
+# FIELD_WEIGHTS entry) times the rows they can return, taken from `first`/`last`
+# on connections and from LIST_SIZES otherwise. Relations that are small in
+# practice get a size here so clients may select them without paging.
+QUERY_COST = {
+    'MAX_COST': 10000,
+    'MAX_DEPTH': 10,
+    'DEFAULT_LIST_SIZE': 10,
+    'LIST_SIZES': {
+        'ItemObject.tags': 10,
+        'ItemObject.images': 10,
+        'ItemObject.variations': 10,
+        'ItemObject.bulletPoints': 10,
+        'ItemObject.extraFields': 10,
+        'BannerGroupObject.banners': 20,
+        'CategoryObject.ancestors': 5,
+        # A storefront tree of about 10 departments of 5 subcategories each, a whole five level tree costs 9371
+        'Query.categoryTree': 10,
+        'CategoryObject.children': 5,
+    },
+    'FIELD_WEIGHTS': {
+        'Mutation': 10,
+        'ItemObjectConnection.facets': 50,
+    },
+}
+
+# The default cache is shared by every worker through Redis when REDIS_URL is
+# set. Without it each process has its own memory cache: the response cache
+# is then off and the category tree is versioned from its table.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Anonymous queries made only of these root fields are answered from the cache
+# for up to TIMEOUT seconds, until a mutation invalidates what they rendered.
+# CACHE names an entry of CACHES shared by all workers, as invalidations have
+# to reach every one of them; ALLOW_LOCAL caches on a process-local one, which
+# is only right when a single process serves the API. Cart summaries are cached
+# under the same conditions.
+RESPONSE_CACHE = {
+    'CACHE': 'default',
+    'ALLOW_LOCAL': os.environ.get('RESPONSE_CACHE_ALLOW_LOCAL', 'false').lower() == 'true',
+    'TIMEOUT': 300,
+    'ROOT_FIELDS': [
+        'items', 'item', 'searchItems', 'categories', 'category', 'categoryTree', 'tags',
+        'banners', 'banner', 'bannerGroups', 'bannerGroup',
+    ],
+}
+
+# Responsive widths stored with every Cloudinary image. INLINE_PLACEHOLDER also
+# downloads the blur placeholder when an image is created and stores it as a
+# data URI (the backfill_image_variants command can do it with --inline).
+# URL_CACHE_SIZE delivery URLs are memoized per process, by public id and
+# transformation. Images not on Cloudinary get the blur placeholder of the
+# FALLBACK_PUBLIC_ID asset.
+IMAGE_VARIANTS = {
+    'WIDTHS': [320, 640, 960, 1280],
+    'INLINE_PLACEHOLDER': False,
+    'URL_CACHE_SIZE': 4096,
+    'FALLBACK_PUBLIC_ID': os.environ.get('IMAGE_FALLBACK_PUBLIC_ID', '74f98fbe6a8ada2db6ec26feb98f994e'),
+}
+
+# Lower bounds of the price buckets counted by the items `facets` field
+ITEM_FACETS = {
+    'PRICE_BUCKETS': [0, 500, 1000, 5000, 10000],
+}
+
+# Reserved stock is held for TTL seconds, after which sweep_reservations gives
+# it back, SWEEP_BATCH_SIZE reservations per transaction.
+STOCK_RESERVATIONS = {
+    'TTL': 900,
+    'SWEEP_BATCH_SIZE': 500,
+}
+
+# Currency of the orders placed by checkout
+CHECKOUT = {
+    'CURRENCY': 'INR',
+}
+
+# Order lines read per query by the streaming vendor order export
+ORDER_EXPORTS = {
+    'CHUNK_SIZE': 2000,
+}
+
+# Daily sales rollups, refreshed by the refresh_sales command. Orders updated
+# in the last LAG seconds are left to the next refresh.
+SALES_ROLLUPS = {
+    'LAG': 300,
+    'DAYS_PER_BATCH': 31,
+    'EXCLUDED_STATUSES': ['cancelled'],
+}
+
+# Low stock views and the scan_low_stock command, thresholds are set per vendor and item
+LOW_STOCK = {
+    'RESTOCK_WITHIN_DAYS': 7,
+    'BATCH_SIZE': 1000,
+}
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND":  "channels.layers.InMemoryChannelLayer"
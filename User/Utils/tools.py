@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -31,6 +32,11 @@ def send_verification_email_otp(email, otp):
     return sent
 
 
+async def asend_verification_email_otp(email, otp):
+    # SMTP round trips happen in a pool thread, not the request's worker thread
+    return await sync_to_async(send_verification_email_otp, thread_sensitive=False)(email, otp)
+
+
 def generate_otp():
     import random
     return random.randint(100000, 999999)
\ No newline at end of file
@@ -0,0 +1,92 @@
+# Description: Cart summary (lines, prices, shipping and totals) read with one joined query and cached per user.
+from Api.cache import instance_tag, response_cache
+from Inventory.checkout import get_config as checkout_config, price_lines
+from Inventory.models import Item, ItemVariation
+from User.models import Cart, CartItem
+
+LINE_FIELDS = [
+    'id', 'cart_id', 'quantity', 'item_id', 'variant_id',
+    'item__key', 'item__name', 'item__price', 'item__shipping_cost', 'item__delivery_time',
+    'item__image', 'item__image__url', 'item__image__alt',
+    'variant__name', 'variant__value', 'variant__price',
+]
+
+
+def summary_key(user_id):
+    return f'cart:summary:{user_id}'
+
+
+def cart_tag(cart_id):
+    """Tag of the cached summary of a cart, expired by every change to its lines."""
+    return instance_tag(Cart(pk=cart_id))
+
+
+def build_summary(user_id):
+    """
+    The summary of the cart of `user_id` and the cache tags it depends on,
+    from one query joining the lines to their items, images and variations.
+    Prices, shipping and delivery time follow checkout, so the summary totals
+    what placing the order would charge.
+    """
+    lines = list(
+        CartItem.objects.filter(cart__user_id=user_id)
+        .select_related('item', 'item__image', 'variant')
+        .only(*LINE_FIELDS)
+        .order_by('pk')
+    )
+    priced, subtotal, shipping, delivery_time = price_lines(lines)
+    summary = {
+        'lines': [
+            {
+                'id': line.pk,
+                'item_key': line.item.key,
+                'name': line.item.name,
+                'image': line.item.image.url if line.item.image_id else None,
+                'image_alt': line.item.image.alt if line.item.image_id else None,
+                'variant_id': line.variant_id,
+                'variant_name': line.variant.name if line.variant_id else None,
+                'variant_value': line.variant.value if line.variant_id else None,
+                'quantity': line.quantity,
+                'unit_price': price,
+                'total': total,
+            }
+            for line, price, total in priced
+        ],
+        'count': len(lines),
+        'units': sum(line.quantity for line in lines),
+        'subtotal': subtotal,
+        'shipping': shipping,
+        'total': subtotal + shipping,
+        'currency': checkout_config()['CURRENCY'],
+        'delivery_time': delivery_time,
+    }
+    tags = {cart_tag(lines[0].cart_id)} if lines else set()
+    tags.update(instance_tag(Item(pk=line.item_id)) for line in lines)
+    tags.update(instance_tag(ItemVariation(pk=line.variant_id)) for line in lines if line.variant_id)
+    return summary, tags
+
+
+def cart_summary(user_id):
+    """
+    The cached summary of the cart of `user_id`. It expires when a line is
+    added or removed and when one of its items or variations changes; an
+    empty cart is not cached, as it has no cart tag to expire it by.
+
+    It is kept in the response cache, so like cached responses it is built
+    on every call unless that cache is shared between workers (REDIS_URL) or
+    RESPONSE_CACHE_ALLOW_LOCAL says a single process serves the API: a
+    process-local copy would miss the expiry sent by another worker.
+    """
+    key = summary_key(user_id)
+    summary = response_cache.get(key)
+    if summary is None:
+        clock = response_cache.clock()
+        summary, tags = build_summary(user_id)
+        if tags:
+            response_cache.set(key, summary, tags, clock)
+    return summary
+
+
+def cart_changed(cart_id):
+    """Expires the cached summary of a cart once the current transaction commits."""
+    response_cache.invalidate(cart_tag(cart_id))
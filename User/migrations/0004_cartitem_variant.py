@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Inventory', '0007_stock_reservation'),
+        ('User', '0003_cart_cartitem_cart__items_wishlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='Inventory.itemvariation'),
+        ),
+    ]
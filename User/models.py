@@ -12,7 +12,7 @@ from django.db import models
 from User.Utils.config import UserManager
 from nanoid import generate
 
-from User.Utils.tools import send_verification_email_otp
+from User.Utils.tools import asend_verification_email_otp, send_verification_email_otp
 
 @deconstructible
 class UsernameValidator(validators.RegexValidator):
@@ -147,6 +147,9 @@ class EmailVerifications(models.Model):
     
     def send_verification_email_otp(self):
         return send_verification_email_otp(self.email, self.otp)
+
+    async def asend_verification_email_otp(self):
+        return await asend_verification_email_otp(self.email, self.otp)
     
     class Meta:
         db_table = 'email_verification'
@@ -157,6 +160,7 @@ class EmailVerifications(models.Model):
 class CartItem(models.Model):
     cart = models.ForeignKey('Cart', on_delete=models.CASCADE, related_name='items')
     item = models.ForeignKey('Inventory.Item', on_delete=models.CASCADE)
+    variant = models.ForeignKey('Inventory.ItemVariation', on_delete=models.CASCADE, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
 
     def __str__(self):
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
 from email import message
-from graphene_django.filter import DjangoFilterConnectionField
 import graphene
 from graphene_django.types import DjangoObjectType
 from django.contrib.auth import authenticate, login
 from nanoid import generate
 from Api import relay
+from Api.fields import DjangoFilterConnectionField
+from Common.exceptions import InvalidModelIdException
 from Common.tools import ImageHandler
+from Inventory.models import ItemVariation
 from User.Utils.tools import generate_otp
-from User.types import BaseUpdateProfileInput, CustomerInput
+from User.cart import cart_changed, cart_summary
+from User.types import BaseUpdateProfileInput, CartSummaryObject, CustomerInput
 from .models import EmailVerifications, User, Cart, Address, CartItem, Wishlist
 
 class UserObject(DjangoObjectType):
@@ -113,18 +116,18 @@ class CreateNewCustomer(graphene.Mutation):
     user = graphene.Field(UserObject)
 
     @classmethod
-    def mutate(cls, root, info, email: str):
-        user = User.objects.filter(email=email).first()
+    async def mutate(cls, root, info, email: str):
+        user = await User.objects.filter(email=email).afirst()
         if user and user.is_active:
             return CreateNewCustomer(success=False, message='A user with this email already exists')
         otp_code = generate_otp()
-        vfc = EmailVerifications.objects.create(email=email, otp=otp_code, expires_at=datetime.now() + timedelta(minutes=10))
-        sent = vfc.send_verification_email_otp()
+        vfc = await EmailVerifications.objects.acreate(email=email, otp=otp_code, expires_at=datetime.now() + timedelta(minutes=10))
+        sent = await vfc.asend_verification_email_otp()
         if not sent:
             return CreateNewCustomer(success=False, message='Failed to send verification email')
         if not user:
             _username = email[:2] + generate(alphabet="0123456789abcdefghijklmnopqrst",size=8) + email[2:2] + generate(alphabet="0123456789abcdefghijklmnopqrst",size=8)
-            user = User.objects.create(email=email, username=_username, is_active=False)
+            user = await User.objects.acreate(email=email, username=_username, is_active=False)
         return CreateNewCustomer(success=True, user=user, message='Verification email sent')
 
 class SendVerificationEmail(graphene.Mutation):
@@ -135,10 +138,10 @@ class SendVerificationEmail(graphene.Mutation):
     message = graphene.String()
 
     @classmethod
-    def mutate(cls, root, info, email):
+    async def mutate(cls, root, info, email):
         otp_code = generate_otp()
-        vfc = EmailVerifications.objects.create(email=email, otp=otp_code, expires_at=datetime.now() + timedelta(minutes=10))
-        sent = vfc.send_verification_email_otp()
+        vfc = await EmailVerifications.objects.acreate(email=email, otp=otp_code, expires_at=datetime.now() + timedelta(minutes=10))
+        sent = await vfc.asend_verification_email_otp()
         if not sent:
             return SendVerificationEmail(success=False, message='Failed to send verification email')
         return SendVerificationEmail(success=True, message='Verification email sent')
@@ -167,13 +170,13 @@ class ForgotPassword(graphene.Mutation):
     message = graphene.String()
 
     @classmethod
-    def mutate(cls, root, info, email):
-        user = User.objects.filter(email=email).first()
+    async def mutate(cls, root, info, email):
+        user = await User.objects.filter(email=email).afirst()
         if not user:
             return ForgotPassword(success=False, message='User not found')
         otp_code = generate_otp()
-        vfc = EmailVerifications.objects.create(email=email, otp=otp_code, expires_at=datetime.now() + timedelta(minutes=10))
-        sent = vfc.send_verification_email_otp()
+        vfc = await EmailVerifications.objects.acreate(email=email, otp=otp_code, expires_at=datetime.now() + timedelta(minutes=10))
+        sent = await vfc.asend_verification_email_otp()
         if not sent:
             return ForgotPassword(success=False, message='Failed to send verification email')
         return ForgotPassword(success=True, message='Verification email sent')
@@ -259,47 +262,51 @@ class AddToCart(graphene.Mutation):
     class Input:
         item_id = graphene.ID(required=True)
         quantity = graphene.Int(required=True)
+        variant_id = graphene.ID()
     
     success = graphene.Boolean()
     message = graphene.String()
     cart = graphene.Field(CartObject)
 
     @classmethod
-    def mutate(cls, root, info, item_id, quantity):
+    def mutate(cls, root, info, item_id, quantity, variant_id=None):
         user = info.context.user
         if user.is_anonymous:
             return AddToCart(success=False, message="User is not authenticated")
-        cart = user.cart
-        if not cart:
-            cart = Cart.objects.create(user=user)
-        item = CartItem.objects.filter(cart=cart, item_id=item_id).first()
+        if variant_id and not ItemVariation.objects.filter(pk=variant_id, item_id=item_id).exists():
+            raise InvalidModelIdException(model="Item Variation")
+        cart, _ = Cart.objects.get_or_create(user=user)
+        item = CartItem.objects.filter(cart=cart, item_id=item_id, variant_id=variant_id).first()
         if item:
             item.quantity += quantity
             item.save()
         else:
-            item = CartItem.objects.create(cart=cart, item_id=item_id, quantity=quantity)
+            item = CartItem.objects.create(cart=cart, item_id=item_id, variant_id=variant_id, quantity=quantity)
+        cart_changed(cart.pk)
         return AddToCart(success=True, message="Item added to cart", cart=cart)
     
 class RemoveFromCart(graphene.Mutation):
     class Input:
         item_id = graphene.ID(required=True)
+        variant_id = graphene.ID()
     
     success = graphene.Boolean()
     message = graphene.String()
     cart = graphene.Field(CartObject)
 
     @classmethod
-    def mutate(cls, root, info, item_id):
+    def mutate(cls, root, info, item_id, variant_id=None):
         user = info.context.user
         if user.is_anonymous:
             return RemoveFromCart(success=False, message="User is not authenticated")
-        cart = user.cart
+        cart = Cart.objects.filter(user=user).first()
         if not cart:
             return RemoveFromCart(success=False, message="Cart is empty")
-        item = CartItem.objects.filter(cart=cart, item_id=item_id).first()
+        item = CartItem.objects.filter(cart=cart, item_id=item_id, variant_id=variant_id).first()
         if not item:
             return RemoveFromCart(success=False, message="Item not found in cart")
         item.delete()
+        cart_changed(cart.pk)
         return RemoveFromCart(success=True, message="Item removed from cart", cart=cart)
     
 class AddToWishlist(graphene.Mutation):
@@ -403,6 +410,7 @@ class Query(graphene.ObjectType):
     users = DjangoFilterConnectionField(UserObject)
     me = graphene.Field(UserObject)
     cart = graphene.Field(CartObject)
+    cart_summary = graphene.Field(CartSummaryObject)
     wishlist = graphene.Field(WishlistObject)
     
     def resolve_me(self, info):
@@ -415,7 +423,13 @@ class Query(graphene.ObjectType):
         user = info.context.user
         if user.is_anonymous:
             return None
-        return user.cart
+        return Cart.objects.filter(user=user).first()
+
+    def resolve_cart_summary(self, info):
+        user = info.context.user
+        if user.is_anonymous:
+            return None
+        return cart_summary(user.pk)
     
     def resolve_wishlist(self, info):
         user = info.context.user
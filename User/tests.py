@@ -1,3 +1,173 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from Api import persisted
+from Api.persisted import query_hash
+from Api.views import AsyncGraphQLView, GraphQLView
+from Common.models import Image
+from Inventory.models import Category, Item, ItemVariation
+from User.cart import cart_summary
+from User.models import Cart, CartItem, EmailVerifications, User, Wishlist
+from User.schema import CartObject
+from Vendor.models import Vendor
+
+CREATE_CUSTOMER = 'mutation { createNewCustomer(email: "new@example.com") { success message } }'
+
+
+class GraphQLTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        persisted._queries.clear()
+
+    def post(self, body):
+        response = self.client.post('/api/v1/', json.dumps(body), content_type='application/json')
+        return response.json()
+
+
+class VerificationEmailTests(GraphQLTestCase):
+    def test_create_new_customer_sends_otp(self):
+        result = self.post({'query': CREATE_CUSTOMER})
+        self.assertEqual(result['data']['createNewCustomer'], {'success': True, 'message': 'Verification email sent'})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(EmailVerifications.objects.get(email='new@example.com').otp, mail.outbox[0].body)
+        self.assertFalse(User.objects.get(email='new@example.com').is_active)
+
+    def test_forgot_password_of_unknown_user(self):
+        result = self.post({'query': 'mutation { forgotPassword(email: "nobody@example.com") { success message } }'})
+        self.assertEqual(result['data']['forgotPassword'], {'success': False, 'message': 'User not found'})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_otp_mutation_skips_the_sync_view(self):
+        with mock.patch.object(GraphQLView, 'execute_graphql_request', side_effect=AssertionError('sync path')):
+            result = self.post({'query': CREATE_CUSTOMER})
+        self.assertEqual(result['data']['createNewCustomer']['success'], True)
+
+    def test_returned_user_is_completed_off_the_loop(self):
+        # The email field reads the session user through the sync ORM
+        query = 'mutation { createNewCustomer(email: "new@example.com") { success user { username email } } }'
+        result = self.post({'query': query})
+        self.assertNotIn('errors', result)
+        self.assertEqual(result['data']['createNewCustomer']['user']['email'], 'n**@example.com')
+
+    def test_otp_mutation_sent_by_hash_runs_on_the_sync_path(self):
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(CREATE_CUSTOMER)}}
+        self.post({'query': CREATE_CUSTOMER, 'extensions': extensions})
+        result = self.post({'extensions': extensions, 'variables': {}})
+        self.assertEqual(result['data']['createNewCustomer']['success'], True)
+        self.assertEqual(len(mail.outbox), 2)
+
+    async def test_otp_mutation_under_asgi(self):
+        response = await self.async_client.post('/api/v1/', json.dumps({'query': CREATE_CUSTOMER}), content_type='application/json')
+        self.assertEqual(response.json()['data']['createNewCustomer']['success'], True)
+        self.assertTrue(await EmailVerifications.objects.filter(email='new@example.com').aexists())
+
+    async def test_query_under_asgi(self):
+        body = json.dumps({'query': '{ categories(first: 1) { edges { node { id } } } }'})
+        response = await self.async_client.post('/api/v1/', body, content_type='application/json')
+        self.assertEqual(response.json()['data'], {'categories': {'edges': []}})
+
+
+class CartTests(GraphQLTestCase):
+    ADD_TO_CART = '''
+        mutation($item: ID!, $variant: ID) {
+            addToCart(itemId: $item, variantId: $variant, quantity: 1) { success }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        image = Image.objects.create(url='https://example.com/item.png', provider='local')
+        vendor = Vendor.objects.create(user=User.objects.create_user('vendor@example.com', 'vendor', 'secret', type='vendor'), store_name='Store')
+        category = Category.objects.create(name='Shoes', description='', image=image)
+        cls.customer = User.objects.create_user('customer@example.com', 'customer', 'secret')
+        cls.boot, cls.belt = (
+            Item.objects.create(sku=name, name=name, description='', bullet_points=[], image=image, price=100, category=category, vendor=vendor)
+            for name in ('boot', 'belt')
+        )
+        cls.size = ItemVariation.objects.create(item=cls.boot, name='Size', value='42', price=150, quantity=5)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.customer)
+
+    def add_to_cart(self, item, variant=None):
+        return self.post({'query': self.ADD_TO_CART, 'variables': {'item': item.pk, 'variant': variant and variant.pk}})
+
+    def test_variant_must_belong_to_the_item(self):
+        result = self.add_to_cart(self.belt, self.size)
+        self.assertEqual(result['errors'][0]['message'], 'Invalid Item Variation id')
+        self.assertFalse(CartItem.objects.exists())
+        self.assertTrue(self.add_to_cart(self.boot, self.size)['data']['addToCart']['success'])
+        self.assertEqual(CartItem.objects.get().variant, self.size)
+
+    def fill_cart(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_to_cart(self.boot, self.size)
+            self.add_to_cart(self.boot, self.size)
+            self.add_to_cart(self.belt)
+        return Cart.objects.get(user=self.customer)
+
+    def test_summary_prices_lines_like_checkout(self):
+        self.fill_cart()
+        summary = cart_summary(self.customer.pk)
+        self.assertEqual([(line['name'], line['quantity'], line['unit_price'], line['total']) for line in summary['lines']], [
+            ('boot', 2, 150, 300),
+            ('belt', 1, 100, 100),
+        ])
+        self.assertEqual((summary['count'], summary['units'], summary['subtotal'], summary['total']), (2, 3, 400, 400))
+
+    def item_flags(self):
+        query = '{ items(orderBy: PRICE) { edges { node { name inWishlist inCart cartQuantity } } } }'
+        with CaptureQueriesContext(connection) as context:
+            result = self.post({'query': query})
+        tables = [Wishlist.items.through._meta.db_table, CartItem._meta.db_table]
+        flag_queries = [query['sql'] for query in context.captured_queries if any(f'FROM {connection.ops.quote_name(table)}' in query['sql'] for table in tables)]
+        return [edge['node'] for edge in result['data']['items']['edges']], len(flag_queries)
+
+    def test_viewer_flags_cost_one_query_each_per_page(self):
+        self.fill_cart()
+        Wishlist.objects.create(user=self.customer).items.add(self.belt)
+        nodes, queries = self.item_flags()
+        self.assertEqual(nodes, [
+            {'name': 'belt', 'inWishlist': True, 'inCart': True, 'cartQuantity': 1},
+            {'name': 'boot', 'inWishlist': False, 'inCart': True, 'cartQuantity': 2},
+        ])
+        self.assertEqual(queries, 2)
+
+    def test_anonymous_viewer_flags_cost_no_query(self):
+        self.client.logout()
+        nodes, queries = self.item_flags()
+        self.assertEqual({(node['inWishlist'], node['inCart'], node['cartQuantity']) for node in nodes}, {(False, False, 0)})
+        self.assertEqual(queries, 0)
+
+    @override_settings(RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'ALLOW_LOCAL': True})
+    def test_summary_is_cached_until_the_cart_changes(self):
+        cart = self.fill_cart()
+        with self.assertNumQueries(1):
+            cart_summary(self.customer.pk)
+        with self.assertNumQueries(0):
+            cart_summary(self.customer.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post({'query': 'mutation($item: ID!) { removeFromCart(itemId: $item) { success } }', 'variables': {'item': self.belt.pk}})
+        self.assertEqual(cart_summary(self.customer.pk)['count'], 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(CartObject.resolve_count(cart, None), 1)
+
+
+class AsyncOperationTests(TestCase):
+    def async_operation(self, query):
+        request = RequestFactory().post('/api/v1/', json.dumps({'query': query}), content_type='application/json')
+        return AsyncGraphQLView().get_async_operation(request)
+
+    def test_only_coroutine_mutations_run_on_the_loop(self):
+        self.assertIsNotNone(self.async_operation(CREATE_CUSTOMER))
+        self.assertIsNone(self.async_operation('{ categories(first: 1) { edges { node { id } } } }'))
+        self.assertIsNone(self.async_operation('mutation { verifyEmail(email: "a@b.c", otp: "1") { success } }'))
+        self.assertIsNone(self.async_operation(CREATE_CUSTOMER.replace('} }', '} verifyEmail(email: "a@b.c", otp: "1") { success } }')))
@@ -18,4 +18,28 @@ class BaseUpdateProfileInput(graphene.InputObjectType):
     last_name = graphene.String()
     sex = graphene.String()
     dob = graphene.Date()
-    image = ImageInput()
\ No newline at end of file
+    image = ImageInput()
+
+class CartLineObject(graphene.ObjectType):
+    id = graphene.ID(required=True)
+    item_key = graphene.String(required=True)
+    name = graphene.String(required=True)
+    image = graphene.String()
+    image_alt = graphene.String()
+    variant_id = graphene.ID()
+    variant_name = graphene.String()
+    variant_value = graphene.String()
+    quantity = graphene.Int(required=True)
+    unit_price = graphene.Decimal(required=True)
+    total = graphene.Decimal(required=True)
+
+class CartSummaryObject(graphene.ObjectType):
+    lines = graphene.List(graphene.NonNull(CartLineObject), required=True)
+    # Number of lines, and of units over every line
+    count = graphene.Int(required=True)
+    units = graphene.Int(required=True)
+    subtotal = graphene.Decimal(required=True)
+    shipping = graphene.Decimal(required=True)
+    total = graphene.Decimal(required=True)
+    currency = graphene.String(required=True)
+    delivery_time = graphene.Int()
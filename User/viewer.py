@@ -0,0 +1,67 @@
+# Description: Request scoped lookups of whether the viewer has items in their wishlist or cart, batched over the items of the request.
+from django.db.models import Sum
+
+from Api.loaders import get_loaders
+from Inventory.models import Item
+from User.models import CartItem, Wishlist
+
+
+class ViewerItems:
+    """
+    Wishlist and cart state of the items seen in the current request for the
+    user making it. The first item asked about loads every item seen so far,
+    so a page costs one query on the wishlist items and one on the cart lines.
+    Anonymous users have neither and cost no query.
+    """
+
+    def __init__(self, registry, user):
+        self.registry = registry
+        self.user_id = user.pk if user is not None and user.is_authenticated else None
+        self._wishlist = {}
+        self._cart = {}
+
+    def _fetch(self, item_id):
+        seen = self.registry.seen(Item)
+        keys = {pk for pk in seen if pk not in self._cart}
+        keys.add(item_id)
+        wished = set(
+            Wishlist.items.through.objects
+            .filter(wishlist__user_id=self.user_id, item_id__in=keys)
+            .values_list('item_id', flat=True)
+        )
+        quantities = dict(
+            CartItem.objects
+            .filter(cart__user_id=self.user_id, item_id__in=keys)
+            .order_by().values('item_id').annotate(quantity=Sum('quantity'))
+            .values_list('item_id', 'quantity')
+        )
+        for key in keys:
+            self._wishlist[key] = key in wished
+            self._cart[key] = quantities.get(key, 0)
+
+    def in_wishlist(self, item):
+        if self.user_id is None:
+            return False
+        if item.pk not in self._wishlist:
+            self._fetch(item.pk)
+        return self._wishlist[item.pk]
+
+    def cart_quantity(self, item):
+        """Units of `item` in the viewer's cart, over all of its variations."""
+        if self.user_id is None:
+            return 0
+        if item.pk not in self._cart:
+            self._fetch(item.pk)
+        return self._cart[item.pk]
+
+
+def get_viewer_items(info) -> ViewerItems:
+    context = info.context
+    registry = get_loaders(info)
+    if context is None:
+        return ViewerItems(registry, None)
+    viewer = getattr(context, '_viewer_items', None)
+    if viewer is None:
+        viewer = ViewerItems(registry, getattr(context, 'user', None))
+        context._viewer_items = viewer
+    return viewer
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Vendor', '0002_alter_vendor_options_alter_vendor_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(default=5),
+        ),
+    ]
@@ -15,6 +15,8 @@ class Vendor(models.Model):
     store_email = models.EmailField(blank=True, null=True)
     store_website = models.URLField(blank=True)
     is_verified = models.BooleanField(default=False)
+    # Stock at or below which an inventory of the vendor is low, unless its item sets its own
+    low_stock_threshold = models.PositiveIntegerField(default=5)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(null=True, blank=True)
 
@@ -87,6 +87,8 @@ class UpdateVendor(graphene.Mutation):
             vendor.email = input.store_email
         if input.store_website:
             vendor.website = input.store_website
+        if input.low_stock_threshold is not None:
+            vendor.low_stock_threshold = max(input.low_stock_threshold, 0)
         vendor.save()
         return UpdateVendor(vendor=vendor, success=True)
 
@@ -33,3 +33,4 @@ class UpdateVendorInput(graphene.InputObjectType):
         store_phone = graphene.String()
         store_email = graphene.String()
         store_website = graphene.String()
+        low_stock_threshold = graphene.Int()